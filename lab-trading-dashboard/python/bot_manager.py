@@ -0,0 +1,81 @@
+# bot_manager.py
+
+import time
+from data_handler import DataHandler
+from core.ws_handler import WebSocketHandler
+from utils.global_store import all_pairs
+from core.position_scheduler import position_scheduler
+from utils.trade_meta import trade_meta
+from utils.logger import log_error, log_info
+from machine_id import get_machine_id
+# from utils.Final_olab_database import olab_update_single_uid_in_table
+
+class BotManager:
+    def __init__(self):
+        self.last_heartbeat = time.time()
+        self.data_handler = DataHandler()
+        self.ws_handler = WebSocketHandler()
+        self.running = True
+        self.thread_monitor_interval = 30  # Check threads every 30 seconds
+        self.last_thread_check = time.time()
+
+    def monitor_threads(self):
+        """Make sure the position scheduler is alive and every trade in all_pairs is registered"""
+        current_time = time.time()
+        if current_time - self.last_thread_check < self.thread_monitor_interval:
+            return
+
+        self.last_thread_check = current_time
+
+        if not position_scheduler.is_alive():
+            print("⚠️ Position scheduler is not running, restarting")
+            log_error("Position scheduler timer died unexpectedly", "BotManager.monitor_threads")
+            position_scheduler.start()
+
+        for uid in list(all_pairs.keys()):
+            if self.ws_handler.start_worker(uid):
+                print(f"🔄 Re-registered worker for UID: {uid}")
+                log_info(f"BotManager.monitor_threads: [RESTARTED] UID: {uid}", uid=uid)
+
+    def run(self):
+        print(f"✅ BotManager.run() executed")
+        last_known_uids = set()
+
+        while self.running:
+            try:
+                # Monitor threads for silent failures
+                self.monitor_threads()
+                
+                machine_id = get_machine_id()
+                uid_data = self.data_handler.load_running_uids(machine_id)
+                # Rows are already in hand: keep updated_at / candel_time / signalfrom current for readers
+                trade_meta.refresh(uid_data)
+                current_uids = set(uid_data.keys())
+                new_uids = current_uids - last_known_uids
+                removed_uids = last_known_uids - current_uids
+
+                for uid in new_uids:
+                    if uid not in position_scheduler:
+                        all_pairs.load(uid, uid_data[uid])
+                        print(f"✅ Processing UID that is not scheduled: {uid}")
+
+                        self.ws_handler.start_worker(uid)
+                        print(f"\U0001F195 Started worker for UID: {uid}")
+                        log_info(f"BotManager.run() 1: [NEW] UID: {uid} started | all_pairs[uid]: {all_pairs.get(uid)}", uid=uid)
+
+                for uid in removed_uids:
+                    if uid not in all_pairs:
+                        self.ws_handler.stop_worker(uid)
+                        trade_meta.invalidate(uid)
+                        print(f"\U0001F6D1 Removed UID: {uid} (worker stopped, trade data retained)")
+                        log_info(f"BotManager.run() 2: [REMOVED] UID: {uid} removed | all_pairs[uid]: {all_pairs.get(uid)}", uid=uid)
+      
+
+                last_known_uids = current_uids
+                self.last_heartbeat = time.time()
+
+            except Exception as e:
+                log_error(e, "BotManager.run")
+                time.sleep(2)
+
+            time.sleep(1)
@@ -0,0 +1,234 @@
+# core/kline_stream.py
+"""
+Kline websocket ingestion.
+
+Subscribes to Binance combined <symbol>@kline_<interval> streams for the tracked
+pairs, writes closed candles to the kline_* tables in batches and publishes a
+candle-close event to in-process subscribers, so consumers react to closes
+without spending REST weight. KlineReplaySource feeds the same pipeline from
+recorded klines for offline testing.
+"""
+import asyncio
+import json
+import threading
+
+import pandas as pd
+import websockets
+
+from utils.logger import log_info, log_error
+from utils.kline_resampler import kline_resampler
+from utils.endpoints import FUTURES_WS_URL
+
+BINANCE_STREAM_URL = f"{FUTURES_WS_URL}/stream?streams="
+MAX_STREAMS_PER_CONNECTION = 200   # Binance limit per combined connection
+FLUSH_INTERVAL_SEC = 1.0
+FLUSH_MAX_BARS = 500
+RECONNECT_DELAY_SEC = 5
+
+
+def stream_name(symbol, interval):
+    return f"{symbol.lower()}@kline_{interval}"
+
+
+def kline_from_event(k):
+    """Stream 'k' payload -> REST kline row [t, o, h, l, c, v, T, q, n, V, Q] (olab_insert_klines format)."""
+    return [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"]]
+
+
+def event_from_kline(symbol, interval, kline, closed=True):
+    """REST kline row -> combined-stream message (used by the replay source)."""
+    return {
+        "stream": stream_name(symbol, interval),
+        "data": {
+            "e": "kline", "E": int(kline[6]) + 1, "s": symbol.upper(),
+            "k": {
+                "t": int(kline[0]), "T": int(kline[6]), "s": symbol.upper(), "i": interval,
+                "o": str(kline[1]), "h": str(kline[2]), "l": str(kline[3]), "c": str(kline[4]),
+                "v": str(kline[5]), "q": str(kline[7]), "n": int(kline[8]),
+                "V": str(kline[9]), "Q": str(kline[10]), "x": closed,
+            },
+        },
+    }
+
+
+class KlineReplaySource:
+    """
+    Offline stand-in for the Binance connection. Given {(symbol, interval): [kline rows]},
+    yields an in-progress update followed by the close event for every bar, in
+    open-time order across streams. speed=0 replays as fast as possible.
+    """
+
+    def __init__(self, klines_by_stream, speed=0.0):
+        self.klines_by_stream = klines_by_stream
+        self.speed = speed
+
+    def streams(self):
+        return [stream_name(s, i) for s, i in self.klines_by_stream]
+
+    async def messages(self, streams=None):
+        events = []
+        for (symbol, interval), rows in self.klines_by_stream.items():
+            for row in rows:
+                events.append((int(row[6]), event_from_kline(symbol, interval, row, closed=False)))
+                events.append((int(row[6]) + 1, event_from_kline(symbol, interval, row, closed=True)))
+        events.sort(key=lambda e: e[0])
+        previous = None
+        for ts, message in events:
+            if self.speed and previous is not None:
+                await asyncio.sleep((ts - previous) / 1000.0 / self.speed)
+            previous = ts
+            yield json.dumps(message)
+
+
+class KlineIngestionService:
+    """
+    writer(symbol, interval, klines) persists a batch of closed klines; it defaults
+    to olab_insert_klines and runs off the event loop. Subscribers registered with
+    subscribe() are called as callback(symbol, interval, kline_row) for every close,
+    once its batch has been written.
+    """
+
+    def __init__(self, pairs, intervals, writer=None, source=None, feed_resampler=True,
+                 flush_interval=FLUSH_INTERVAL_SEC, flush_max_bars=FLUSH_MAX_BARS):
+        self.streams = [stream_name(p, i) for p in pairs for i in intervals]
+        self.writer = writer
+        self.source = source
+        self.feed_resampler = feed_resampler
+        self.flush_interval = flush_interval
+        self.flush_max_bars = flush_max_bars
+        self._pending = {}          # (symbol, interval) -> [kline rows]
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._subscribers = []      # (callback, symbol or None, interval or None)
+        self._sub_lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self.stats = {"messages": 0, "closed": 0, "written": 0, "write_errors": 0,
+                      "reconnects": 0, "last_close_ms": None}
+
+    # ---------- subscribers ----------
+
+    def subscribe(self, callback, symbol=None, interval=None):
+        with self._sub_lock:
+            self._subscribers.append((callback, symbol.upper() if symbol else None, interval))
+
+    def unsubscribe(self, callback):
+        with self._sub_lock:
+            self._subscribers = [s for s in self._subscribers if s[0] is not callback]
+
+    def _publish(self, symbol, interval, kline):
+        with self._sub_lock:
+            subscribers = list(self._subscribers)
+        for callback, want_symbol, want_interval in subscribers:
+            if (want_symbol is None or want_symbol == symbol) and (want_interval is None or want_interval == interval):
+                try:
+                    callback(symbol, interval, kline)
+                except Exception as e:
+                    log_error(e, "KlineIngestionService subscriber", symbol)
+
+    # ---------- message handling ----------
+
+    def handle_message(self, message):
+        """Process one combined-stream message. Returns True if it closed a candle."""
+        self.stats["messages"] += 1
+        data = json.loads(message) if isinstance(message, (str, bytes)) else message
+        payload = data.get("data", data)
+        k = payload.get("k") if isinstance(payload, dict) else None
+        if not k or not k.get("x"):
+            return False
+
+        symbol, interval = k["s"], k["i"]
+        kline = kline_from_event(k)
+        with self._pending_lock:
+            self._pending.setdefault((symbol, interval), []).append(kline)
+            self._pending_count += 1
+        self.stats["closed"] += 1
+        self.stats["last_close_ms"] = k["T"]
+        return True
+
+    def _default_writer(self):
+        from utils.Final_olab_database import olab_insert_klines
+        return olab_insert_klines
+
+    def flush(self):
+        """Write all pending closed candles, one batch per (symbol, interval)."""
+        with self._pending_lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+        if not pending:
+            return
+        writer = self.writer or self._default_writer()
+        for (symbol, interval), klines in pending.items():
+            try:
+                writer(symbol, interval, klines)
+                self.stats["written"] += len(klines)
+            except Exception as e:
+                self.stats["write_errors"] += len(klines)
+                log_error(e, "KlineIngestionService.flush", symbol)
+            if self.feed_resampler and kline_resampler.is_base(interval):
+                kline_resampler.ingest(symbol, interval, _klines_frame(klines))
+            # Published after the write so subscribers find the bar in the DB and resampler
+            for kline in klines:
+                self._publish(symbol, interval, kline)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending_count:
+                await loop.run_in_executor(None, self.flush)
+
+    # ---------- connections ----------
+
+    async def _consume(self, messages):
+        loop = asyncio.get_running_loop()
+        async for message in messages:
+            self.handle_message(message)
+            if self._pending_count >= self.flush_max_bars:
+                await loop.run_in_executor(None, self.flush)
+
+    async def _connection(self, streams):
+        url = BINANCE_STREAM_URL + "/".join(streams)
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=20, max_queue=None) as ws:
+                    log_info(f"✅ Kline stream connected ({len(streams)} streams)")
+                    await self._consume(ws)
+            except Exception as e:
+                log_error(e, "KlineIngestionService connection")
+            self.stats["reconnects"] += 1
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    async def run(self):
+        """Run until cancelled (live) or until the replay source is exhausted."""
+        flusher = asyncio.create_task(self._flush_loop())
+        try:
+            if self.source is not None:
+                await self._consume(self.source.messages(self.streams))
+            else:
+                shards = [self.streams[i:i + MAX_STREAMS_PER_CONNECTION]
+                          for i in range(0, len(self.streams), MAX_STREAMS_PER_CONNECTION)]
+                await asyncio.gather(*(self._connection(shard) for shard in shards))
+        finally:
+            flusher.cancel()
+            self.flush()
+
+    def start_in_thread(self):
+        """Run the service on its own event loop in a daemon thread."""
+        def target():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.run())
+            except Exception as e:
+                log_error(e, "KlineIngestionService")
+        self._thread = threading.Thread(target=target, daemon=True, name="KlineIngestion")
+        self._thread.start()
+        return self._thread
+
+
+def _klines_frame(klines):
+    df = pd.DataFrame([k[:6] + k[7:11] for k in klines], columns=[
+        'time', 'open', 'high', 'low', 'close', 'volume', 'quote_volume', 'num_trades', 'taker_base_vol', 'taker_quote_vol'
+    ])
+    df['time'] = pd.to_datetime(df['time'], unit='ms', utc=True)
+    return df
@@ -0,0 +1,175 @@
+# core/position_scheduler.py
+"""
+Event-driven scheduler for per-UID position evaluation.
+
+Instead of one sleeping thread per trade, registered UIDs are evaluated on a
+bounded pool when something happens: a mark-price update for their symbol
+(notify), or the periodic timer used for time-based exits and state changes
+that arrive without a price tick. Guarantees:
+
+- per-UID serialisation: at most one evaluation of a UID runs at a time;
+- coalescing: events arriving while a UID is queued or running collapse into one
+  follow-up evaluation;
+- fairness: each UID is queued at most once, in FIFO order, so a busy symbol
+  cannot starve the others.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import log_error, log_info
+
+# ✅ Pool size and timer cadence
+MAX_EVAL_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+TIMER_INTERVAL_SEC = 5.0
+
+_IDLE, _QUEUED, _RUNNING = 0, 1, 2
+
+
+class PositionScheduler:
+    """
+    evaluate(uid) runs one evaluation pass; returning False unregisters the UID
+    (e.g. its trade is gone from all_pairs).
+    """
+
+    def __init__(self, evaluate=None, max_workers=MAX_EVAL_WORKERS, timer_interval=TIMER_INTERVAL_SEC):
+        self._evaluate = evaluate
+        self.max_workers = max_workers
+        self.timer_interval = timer_interval
+        self._pool = None
+        self._lock = threading.Lock()
+        self._state = {}            # uid -> _IDLE / _QUEUED / _RUNNING (registered UIDs only)
+        self._rerun = set()         # UIDs notified while running
+        self._timer = None
+        self._stop = threading.Event()
+        self.stats = {"events": 0, "coalesced": 0, "evaluations": 0, "errors": 0,
+                      "timer_ticks": 0, "max_eval_sec": 0.0}
+
+    def set_evaluator(self, evaluate):
+        self._evaluate = evaluate
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="position-eval")
+            if self._timer is None or not self._timer.is_alive():
+                self._stop.clear()
+                self._timer = threading.Thread(target=self._timer_loop, daemon=True, name="PositionSchedulerTimer")
+                self._timer.start()
+        return self
+
+    def is_alive(self):
+        return self._pool is not None and self._timer is not None and self._timer.is_alive()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------- registration ----------
+
+    def add(self, uid):
+        """Register a UID and evaluate it right away. Returns False if it was already registered."""
+        if not self.is_alive():
+            self.start()
+        with self._lock:
+            if uid in self._state:
+                return False
+            self._state[uid] = _IDLE
+        log_info(f"PositionScheduler: [ADDED] UID: {uid}", uid=uid)
+        self.notify(uid)
+        return True
+
+    def remove(self, uid):
+        with self._lock:
+            self._state.pop(uid, None)
+            self._rerun.discard(uid)
+
+    def __contains__(self, uid):
+        return uid in self._state
+
+    def uids(self):
+        with self._lock:
+            return list(self._state)
+
+    # ---------- scheduling ----------
+
+    def notify(self, uid):
+        """Something changed for uid (price tick, timer): make sure it gets evaluated."""
+        with self._lock:
+            state = self._state.get(uid)
+            if state is None:
+                return
+            self.stats["events"] += 1
+            if state == _QUEUED:
+                self.stats["coalesced"] += 1
+                return
+            if state == _RUNNING:
+                self.stats["coalesced"] += 1
+                self._rerun.add(uid)
+                return
+            self._state[uid] = _QUEUED
+        self._pool.submit(self._run, uid)
+
+    def notify_many(self, uids):
+        for uid in uids:
+            self.notify(uid)
+
+    def _run(self, uid):
+        with self._lock:
+            if self._state.get(uid) != _QUEUED:
+                return
+            self._state[uid] = _RUNNING
+        started = time.monotonic()
+        keep = True
+        failed = False
+        try:
+            keep = self._evaluate(uid) is not False
+        except Exception as e:
+            failed = True
+            log_error(e, "PositionScheduler.evaluate", uid)
+        elapsed = time.monotonic() - started
+
+        with self._lock:
+            self.stats["evaluations"] += 1
+            if failed:
+                self.stats["errors"] += 1
+            if elapsed > self.stats["max_eval_sec"]:
+                self.stats["max_eval_sec"] = round(elapsed, 3)
+            if uid not in self._state:
+                return
+            if not keep:
+                self._state.pop(uid, None)
+                self._rerun.discard(uid)
+                log_info(f"PositionScheduler: [REMOVED] UID: {uid}", uid=uid)
+                return
+            if uid in self._rerun:
+                self._rerun.discard(uid)
+                self._state[uid] = _QUEUED
+                resubmit = True
+            else:
+                self._state[uid] = _IDLE
+                resubmit = False
+        if resubmit:
+            # Back of the pool queue, behind UIDs that were waiting
+            self._pool.submit(self._run, uid)
+
+    def _timer_loop(self):
+        while not self._stop.wait(self.timer_interval):
+            try:
+                self.stats["timer_ticks"] += 1
+                self.notify_many(self.uids())
+            except Exception as e:
+                log_error(e, "PositionScheduler.timer")
+
+    def snapshot(self):
+        with self._lock:
+            counts = {"registered": len(self._state),
+                      "running": sum(1 for s in self._state.values() if s == _RUNNING),
+                      "queued": sum(1 for s in self._state.values() if s == _QUEUED)}
+        counts.update(self.stats)
+        return counts
+
+
+position_scheduler = PositionScheduler()
@@ -0,0 +1,356 @@
+# core/ws_handler.py
+
+import asyncio
+import threading
+import time
+import websockets
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from core.signal_engine import Current_Analysis
+from core.setlastpairPrice import setlastpairPrice
+from core.monitor_single_position import monitor_single_position
+from core.monitor_hedge_position import monitor_hedge_position
+from core.test_simulation_handle_trade_action import test_simulation_handle_trade_action
+#from core.check_and_release_hedge import check_and_release_hedge
+
+# This for hedge data handling
+#from hedge_data_handler import DataHandler_Hedge
+
+# This is for Normal data handling
+from data_handler import DataHandler
+
+
+from utils.global_store import (
+    all_pairs_locks, all_pairs, analysis_tracker, analysis_tracker_locks,
+    last_heartbeat, last_5min_check_time
+)
+from utils.logger import log_info, log_error, utc_now
+from utils.hot_log import hot_log
+from utils.utils import get_lock, get_default_analysis_tracker
+from machine_id import get_machine_id
+from utils.main_binance import getQuantity
+from utils.price_source import mark_prices
+from utils.tick_buffer import tick_buffer, extract_ticks, loads
+from utils.endpoints import FUTURES_WS_URL
+from utils.stream_subscriptions import StreamSubscriptions
+from core.place_order import PlaceOrderFromFlatMarketSignal
+from core.position_scheduler import position_scheduler
+from utils.trade_meta import trade_meta
+from utils.Final_olab_database import olab_update_single_uid_in_table
+
+# Combined stream; <symbol>@markPrice@1s is subscribed live for the symbols in all_pairs
+BINANCE_WS_URL = f"{FUTURES_WS_URL}/stream"
+SUBSCRIPTION_SYNC_SEC = 1.0
+
+executor = ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4)
+
+hedge_thread_locks = {}
+monitor_locks = {}
+
+class WebSocketHandler:
+    def __init__(self):
+        self.ws_url = BINANCE_WS_URL
+        self.subscriptions = StreamSubscriptions()
+        # Handlers are interchangeable: evaluate() only reads the shared global store
+        position_scheduler.set_evaluator(self.evaluate)
+
+    def stop_worker(self, uid):
+        # Unregister the UID from the position scheduler
+        position_scheduler.remove(uid)
+
+    def start_worker(self, uid):
+        # Register the UID; it is evaluated on price updates for its pair and on the scheduler timer
+        return position_scheduler.add(uid)
+
+    def evaluate(self, uid):
+        """
+        One evaluation pass for uid, run by position_scheduler. Returns False when the
+        trade is gone from all_pairs so the UID is unregistered.
+        """
+        trade_type = None
+        monitor_lock = monitor_locks.setdefault(uid, threading.Lock())
+
+        step = 5
+        # Always fetch latest details and trade_type at the start of the pass
+        with get_lock(all_pairs_locks, uid):
+            details = all_pairs.get(uid)
+        trade_type = details.state().type if details else None
+        if hot_log.info_on:
+            log_info(f"[LOOP_FETCH] UID: {uid} trade_type: {trade_type} | details: {details}", uid=uid)
+
+        if not details:
+            # Closed and removed from all_pairs (deleteFromGlobalList): stop scheduling it
+            if hot_log.info_on:
+                log_info(f"step{step}: [NO_DETAILS] UID: {uid} details missing, worker stopped", uid=uid)
+            print(f"🛑 Worker stopped for UID: {uid}")
+            return False
+
+        if hot_log.info_on:
+            log_info(f"step{step}: [WORKER_LOOP] UID: {uid} is active | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+        step += 1
+        try:
+            # ✅ Get current price
+            with get_lock(analysis_tracker_locks, uid):
+                tracker = analysis_tracker.get(uid)
+                current_price = tracker.Current_Price if tracker is not None else None
+                if hot_log.info_on:
+                    log_info(f"step{step}: [PRICE_CHECK] UID: {uid}, current_price: {current_price} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+            step += 1
+
+            # For hedge_release records, process immediately without waiting for price
+            if trade_type == "hedge_release":
+                if hot_log.info_on:
+                    log_info(f"step{step}: [HEDGE_RELEASE_PROCESS] UID: {uid} processing hedge_release immediately | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                # Process hedge_release logic here (will be handled in the elif below)
+            elif not current_price or current_price <= 0:
+                if hot_log.info_on:
+                    log_info(f"step{step}: [WAIT] UID: {uid} waiting for valid price | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                return True
+
+            # Defer trade action execution to the RUNNING branch below to avoid duplicate calls per pass
+
+            # ✅ Run lightweight async tasks
+            # Only submit signal_engine if 3 minutes have passed since last check
+            now = utc_now()
+            last_signal_check = last_5min_check_time.get(uid)
+            if not last_signal_check or (now - last_signal_check).total_seconds() >= 60:
+                if hot_log.info_on:
+                    log_info(f"step{step}: [SIGNAL_ENGINE] Submitting Current_Analysis for UID: {uid} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                # executor.submit(Current_Analysis, all_pairs, current_price, uid)
+                last_5min_check_time[uid] = now
+
+            # details and trade_type already fetched at the start of the pass
+            if hot_log.info_on:
+                log_info(f"step{step}: [DETAILS_FETCHED] UID: {uid} details: {details} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+            step += 1
+
+            # Log before checking running logic
+            if hot_log.info_on:
+                log_info(f"[CHECK_RUNNING] UID: {uid} about to check running logic | trade_type: {trade_type}", uid=uid)
+
+            if trade_type == "assign":
+                if hot_log.info_on:
+                    log_info(f"step{step}: [ASSIGN] UID: {uid} about to check running logic | trade_type: {trade_type}", uid=uid)
+
+                pair = details.get("pair")
+                action = details.get("action")
+                interval = details.get("interval")
+                hedge = details.get("hedge", False)
+                stop_price = details.get("stop_price")
+                investment = details.get("investment")
+
+                if pair is not None and investment is not None:
+                    result = getQuantity(pair, investment)
+                    if result is not None and hasattr(result, '__iter__') and len(result) >= 1:
+                        quantity = result[0]
+                    else:
+                        quantity = 0
+                else:
+                    quantity = 0
+                if hot_log.info_on:
+                    log_info(f"step{step}: [ASSIGN] UID: {uid} calculated quantity: {quantity} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                if quantity == 0:
+                    details["type"] = "Close_Low_Investment"
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [ASSIGN] UID: {uid} set to Close_Low_Investment | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    step += 1
+                else:
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [ASSIGN_PlaceOrderFromFlatMarketSignal] UID: {uid} placing order | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    step += 1
+                    PlaceOrderFromFlatMarketSignal(
+                        all_pairs, uid, quantity, action,
+                        "LONG" if action == "BUY" else "SHORT",
+                        current_price, hedge,
+                        interval, stop_price, 1, 0
+                    )
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [After_PlaceOrderFromFlatMarketSignal] UID: {uid} placing order | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    step += 1
+
+            elif not details.get("hedge", False) :#trade_type == "running":
+                if hot_log.info_on:
+                    log_info(f"[ENTER_RUNNING] UID: {uid} entering running logic | trade_type: {trade_type}", uid=uid)
+                if hot_log.info_on:
+                    log_info(f"step{step}: [RUNNING] UID: {uid} entering running logic | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                # ✅ Monitor hedge/single position
+                if details.get("hedge", False):
+                    if monitor_lock.locked():
+                        if hot_log.info_on:
+                            log_info(f"step{step}: [RUNNING] UID: {uid} monitor_lock locked, waiting | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                        step += 1
+                        return True
+                    # with monitor_lock:
+                    #     if not details.get("hedge_1_1_bool", False):
+                    #         log_info(f"step{step}: [RUNNING] UID: {uid} monitoring hedge position | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    #         step += 1
+                    #         monitor_hedge_position(uid, current_price)
+                    # if details.get("hedge_1_1_bool", False):
+                    #     log_info(f"step{step}: [RUNNING] UID: {uid} checking and releasing hedge | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    #     step += 1
+                        # check_and_release_hedge(uid,current_price)  # Removed: now called from signal_engine after signal
+                else:
+                    if monitor_lock.locked():
+                        if hot_log.info_on:
+                            log_info(f"step{step}: [RUNNING] UID: {uid} monitor_lock locked, waiting | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                        step += 1
+                        return True
+                    with monitor_lock:
+                        if hot_log.info_on:
+                            log_info(f"step{step}: [RUNNING] UID: {uid} monitoring single position | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                        step += 1
+                        # monitor_single_position(uid, current_price)
+                        if not details.get("hedge", False):
+                            if hot_log.info_on:
+                                log_info(f"step{step}: [SET_LAST_PRICE] UID: {uid} updating last price | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                            step += 1
+                            executor.submit(setlastpairPrice, uid, current_price)
+
+                if hot_log.info_on:
+                    log_info(f"step{step}: [ACTION_CHECK] UID: {uid}, details: {details} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                step += 1
+                # Only run trade action if not a 1:1 hedge and details exist
+                should_run_action = bool(details) and not details.get('hedge_1_1_bool', False)
+                if should_run_action and trade_type == "running":
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [TRADE_ACTION] Executing trade action for UID: {uid} (hedge_1_1_bool is False), details: {details} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    step += 1
+                    try:
+                        test_simulation_handle_trade_action(uid, current_price)
+                    except Exception as e:
+                        log_error(e, "trade_action", uid)
+                else:
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [ACTION_SKIP] Not executing trade action for UID: {uid} (hedge_1_1_bool is True), details: {details} | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+                    step += 1
+            elif trade_type == "hedge_release":
+                with get_lock(all_pairs_locks, uid):
+                    all_pairs[uid]["type"] = "running"
+                    all_pairs[uid]["interval"] = '15m'
+                    # Update the database to reflect the status change
+                    machine_id = get_machine_id()
+                    olab_update_single_uid_in_table(uid, all_pairs, machine_id)
+                    if hot_log.info_on:
+                        log_info(f"step{step}: [HEDGE_RELEASE] Updated UID: {uid} from hedge_release to running in database- interval-update-to-15m", uid=uid)
+                step += 1
+                # Evaluate again as a running trade without waiting for the next tick
+                position_scheduler.notify(uid)
+
+        except Exception as e:
+            print(f"[{utc_now()}] ❌ Error in worker({uid}):\n{str(e)}")
+            log_error(e, "worker")
+            if hot_log.info_on:
+                log_info(f"step{step}: [EXCEPTION] UID: {uid} exception occurred | all_pairs[uid]: {all_pairs.get(uid)} | trade_type: {trade_type}", uid=uid)
+        return True
+
+    async def sync_subscriptions(self, ws):
+        """Follow all_pairs: SUBSCRIBE symbols of new trades, UNSUBSCRIBE closed ones."""
+        while True:
+            await self.subscriptions.sync(ws, all_pairs.symbols())
+            if not self.subscriptions.active:
+                # No trades, no price frames: the connection itself is the heartbeat
+                last_heartbeat["main"] = time.time()
+            await asyncio.sleep(SUBSCRIPTION_SYNC_SEC)
+
+    async def mark_price_listener(self):
+        log_info("📱 Connecting to Binance WebSocket...")
+        print("📱 Connecting to Binance WebSocket...")
+
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20) as ws:
+                    log_info("✅ WebSocket connected.")
+                    print("✅ WebSocket connected.")
+                    self.subscriptions.reset()
+                    sync_task = asyncio.ensure_future(self.sync_subscriptions(ws))
+                    try:
+                        async for message in ws:
+
+                            self.handle_price_update(message)
+                            last_heartbeat["main"] = time.time()
+                    finally:
+                        sync_task.cancel()
+
+            except Exception as e:
+                log_error(e, f" utc_now() mark_price_listener")
+                await asyncio.sleep(5)
+
+    def handle_price_update(self, message):
+        """Decode stage, on the websocket loop: keep only s/p/E and conflate into tick_buffer."""
+        try:
+            data = loads(message)
+
+            if isinstance(data, list):
+                items = data
+            elif isinstance(data, dict) and "data" in data:
+                # Combined stream: {"stream": "btcusdt@markPrice@1s", "data": {...}}
+                items = data["data"] if isinstance(data["data"], list) else [data["data"]]
+            elif self.subscriptions.handle_reply(data):
+                return
+            else:
+                print("⚠️ Unexpected format:", data)
+                return
+
+            tick_buffer.put_many(extract_ticks(items))
+
+        except Exception as e:
+            log_error(e, "handle_price_update")
+
+    def dispatch_prices(self, batch):
+        """Apply the newest price per symbol to analysis_tracker and wake the UIDs holding it."""
+        mark_prices.update_many((symbol, price) for symbol, (price, _) in batch.items())
+
+        for symbol, (mark_price, _) in batch.items():
+            # Only the UIDs trading this symbol (all_pairs keeps the index current)
+            uids = all_pairs.uids_for_symbol(symbol)
+            if not uids:
+                continue
+
+            for uid in uids:
+                with get_lock(analysis_tracker_locks, uid):
+                    if uid not in analysis_tracker:
+                        analysis_tracker[uid] = get_default_analysis_tracker()
+                    analysis_tracker[uid].Current_Price = mark_price
+                    if hot_log.info_on:
+                        log_info(f"[WS_UPDATE] Updated price for UID: {uid}, symbol: {symbol}, price: {mark_price}")
+                    # print(f"[WS_UPDATE] Updated price for UID: {uid}, symbol: {symbol}, price: {mark_price}")
+
+                if uid in position_scheduler:
+                    position_scheduler.notify(uid)
+                elif self.start_worker(uid):
+                    print(f"🔟 Started worker for UID: {uid} (from WS)")
+
+    def dispatch_loop(self):
+        while True:
+            try:
+                batch = tick_buffer.drain(timeout=1.0)
+                if batch:
+                    self.dispatch_prices(batch)
+            except Exception as e:
+                log_error(e, "dispatch_loop")
+                time.sleep(1)
+
+    def run(self):
+        handler = DataHandler()
+        machine_id = get_machine_id()
+        pair_map = handler.load_initial_data(machine_id, False)
+
+        for uid, pdata in pair_map.items():
+            with get_lock(all_pairs_locks, uid):
+                all_pairs.load(uid, pdata)
+                trade_meta.load(uid, pdata)
+
+            if self.start_worker(uid):
+                print(f"✅ Started worker for running UID: {uid}")
+
+        threading.Thread(target=self.dispatch_loop, daemon=True, name="PriceDispatcher").start()
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.mark_price_listener())
@@ -0,0 +1,34 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Modules import as utils.* / core.*, relative to lab-trading-dashboard/python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def pg_engine(tmp_path_factory):
+    """
+    Scratch PostgreSQL for SQL-level tests: OLAB_TEST_DATABASE_URL if set,
+    otherwise a throwaway local server via the pgserver package; skipped if neither.
+    """
+    url = os.environ.get("OLAB_TEST_DATABASE_URL")
+    if not url:
+        pgserver = pytest.importorskip("pgserver")
+        server = pgserver.get_server(str(tmp_path_factory.mktemp("pg")), cleanup_mode="stop")
+        url = server.get_uri()
+    from sqlalchemy import create_engine
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def olab_db(pg_engine, monkeypatch):
+    """utils.Final_olab_database.sql_helper pointed at the scratch database."""
+    from utils.Final_olab_database import sql_helper
+    monkeypatch.setattr(sql_helper, "engine", pg_engine)
+    monkeypatch.setattr(sql_helper, "_pid", os.getpid())
+    return sql_helper
@@ -0,0 +1,88 @@
+# tests/test_account_state.py
+import asyncio
+
+import pytest
+
+import utils.account_state as account_state_module
+from utils.account_state import AccountStateCache
+
+REST_POSITIONS = [
+    {"symbol": "BTCUSDT", "positionSide": "LONG", "positionAmt": "0.010", "entryPrice": "60000",
+     "breakEvenPrice": "60030", "unRealizedProfit": "0", "markPrice": "60000", "notional": "600",
+     "leverage": "20", "liquidationPrice": "55000", "updateTime": 1},
+    {"symbol": "ETHUSDT", "positionSide": "SHORT", "positionAmt": "0", "entryPrice": "0",
+     "breakEvenPrice": "0", "unRealizedProfit": "0", "leverage": "10", "liquidationPrice": "0", "updateTime": 0},
+]
+
+
+@pytest.fixture
+def cache():
+    marks = {"BTCUSDT": 61000.0, "ETHUSDT": 2900.0}
+    state = AccountStateCache(
+        fetch_positions=lambda: [dict(p) for p in REST_POSITIONS],
+        fetch_balances=lambda: [{"asset": "USDT", "balance": "1000", "availableBalance": "800"}],
+        new_listen_key=lambda: {"listenKey": "k"},
+        renew_listen_key=lambda key: None,
+        mark_price=marks.get,
+    )
+    state.reconcile()
+    state.marks = marks
+    return state
+
+
+def account_update(symbol, side, amount, entry, event_ms=1_700_000_000_000):
+    return {"e": "ACCOUNT_UPDATE", "T": event_ms, "a": {"B": [], "P": [
+        {"s": symbol, "ps": side, "pa": amount, "ep": entry, "bep": entry, "up": "0", "mt": "cross", "iw": "0"}]}}
+
+
+def test_unrealized_profit_follows_the_mark_price_between_account_updates(cache):
+    [position] = cache.open_positions("BTCUSDT")
+    assert float(position["unRealizedProfit"]) == pytest.approx(10.0)   # (61000 - 60000) * 0.01
+    assert float(position["notional"]) == pytest.approx(610.0)
+    cache.marks["BTCUSDT"] = 59000.0
+    assert float(cache.open_positions("BTCUSDT")[0]["unRealizedProfit"]) == pytest.approx(-10.0)
+
+
+def test_no_fresh_mark_price_means_rest(cache):
+    del cache.marks["BTCUSDT"]
+    assert cache.open_positions("BTCUSDT") is None
+    assert cache.open_positions() is None
+
+
+def test_streamed_positions_carry_leverage_and_update_time(cache):
+    cache.handle_event(account_update("ETHUSDT", "SHORT", "-1", "3000"))
+    [position] = cache.open_positions("ETHUSDT")
+    assert position["leverage"] == "10" and position["updateTime"] == 1_700_000_000_000
+    assert float(position["unRealizedProfit"]) == pytest.approx(100.0)  # short, mark below entry
+
+    cache.handle_event({"e": "ACCOUNT_CONFIG_UPDATE", "ac": {"s": "ETHUSDT", "l": 25}})
+    assert cache.open_positions("ETHUSDT")[0]["leverage"] == "25"
+
+
+def test_position_unknown_to_the_snapshot_falls_back_and_requests_a_reconcile(cache):
+    cache.marks["SOLUSDT"] = 150.0
+    cache.handle_event(account_update("SOLUSDT", "BOTH", "2", "140"))
+    assert cache.open_positions("SOLUSDT") is None
+    assert cache._reconcile_requested
+    cache.reconcile()
+    assert not cache._reconcile_requested
+
+
+def test_keepalive_logs_and_retries_failed_renewals(cache, monkeypatch):
+    monkeypatch.setattr(account_state_module, "LISTEN_KEY_RENEW_SEC", 0)
+    monkeypatch.setattr(account_state_module, "LISTEN_KEY_RETRY_SEC", 0)
+    calls = []
+
+    def renew(key):
+        calls.append(key)
+        if len(calls) < 3:
+            raise ConnectionError("timeout")
+    cache._renew_listen_key = renew
+
+    async def run():
+        task = asyncio.create_task(cache._keepalive("k"))
+        while len(calls) < 4:
+            await asyncio.sleep(0)
+        task.cancel()
+    asyncio.run(run())
+    assert cache.stats["renew_errors"] == 2
@@ -0,0 +1,92 @@
+# tests/test_api_key_pool.py
+import time
+import types
+from email.utils import formatdate
+
+import pytest
+
+from utils.api_key_pool import ApiKeyPool, NoHealthyKeyError
+from utils.weight_limiter import SharedWeightLimiter, klines_weight
+
+
+class ClientError(Exception):
+    def __init__(self, status_code, header=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.header = header or {}
+
+
+class FakeIP:
+    """Binance's per-IP weight counter, shared by every key (and other processes)."""
+
+    def __init__(self, used=0):
+        self.used = used
+
+
+class FakeClient:
+    def __init__(self, name, ip, errors):
+        self.name = name
+        self.ip = ip
+        self.errors = errors
+        self.session = types.SimpleNamespace(request=self._request)
+
+    def _request(self, method, path, weight):
+        self.ip.used += weight
+        return types.SimpleNamespace(headers={"X-MBX-USED-WEIGHT-1M": str(self.ip.used)})
+
+    def klines(self, **kwargs):
+        error = self.errors.pop(self.name, None)
+        if error is not None:
+            raise error
+        self.session.request("GET", "/fapi/v1/klines", klines_weight(kwargs["limit"]))
+        return self.name
+
+
+@pytest.fixture
+def make_pool(tmp_path):
+    def make(names, errors=None, ip=None):
+        errors = {} if errors is None else errors
+        ip = FakeIP() if ip is None else ip
+        limiter = SharedWeightLimiter(path=str(tmp_path / "weight.bin"), max_requests_per_sec=1000)
+        keys = [{"api_key": name, "api_secret": "-"} for name in names]
+        return ApiKeyPool(keys, client_factory=lambda key, secret: FakeClient(key, ip, errors),
+                          limiter=limiter)
+    return make
+
+
+def test_requests_are_balanced_by_each_key_share_not_the_ip_weight(make_pool):
+    ip = FakeIP(used=900)                                   # weight used by other processes on this IP
+    pool = make_pool(["a", "b", "c"], ip=ip)
+    assert [pool.klines("BTCUSDT", "15m", 500) for _ in range(6)] == ["a", "b", "c"] * 2
+    weight = klines_weight(500)
+    assert [s["weight_share"] for s in pool.snapshot()] == [2 * weight] * 3
+    assert pool.ip_used_weight() == ip.used == 900 + 6 * weight
+
+
+def test_an_extra_large_request_moves_the_next_ones_elsewhere(make_pool):
+    pool = make_pool(["a", "b"])
+    assert pool.klines("BTCUSDT", "15m", 1500) == "a"
+    assert [pool.klines("BTCUSDT", "15m", 100) for _ in range(3)] == ["b", "b", "b"]
+    assert [s["requests"] for s in pool.snapshot()] == [1, 3]
+
+
+@pytest.mark.parametrize("header, cooldown", [
+    (lambda: {"Retry-After": "7"}, 7),
+    (lambda: {"Retry-After": formatdate(time.time() + 30, usegmt=True)}, 30),   # built at call time
+    (lambda: {"Retry-After": "soon"}, 60),                      # unparseable: 429 default, no crash
+    (lambda: {}, 60),
+])
+def test_throttled_key_cools_down_and_the_request_moves_on(make_pool, header, cooldown):
+    header = header()
+    pool = make_pool(["a", "b"], errors={"a": ClientError(429, header)})
+    assert pool.klines("BTCUSDT", "15m", 500) == "b"
+    snapshot = pool.snapshot()
+    assert snapshot[0]["throttled"] == 1
+    assert cooldown - 2 < snapshot[0]["cooldown_sec"] <= cooldown
+
+
+def test_every_key_throttled_raises(make_pool):
+    pool = make_pool(["a"], errors={"a": ClientError(418)})
+    with pytest.raises(NoHealthyKeyError):
+        pool.klines("BTCUSDT", "15m", 500)
+    assert pool.next_ready_in() > 250                        # 418 ban default
@@ -0,0 +1,168 @@
+# tests/test_bulk_update.py
+import re
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+import utils.bulk_update as bulk_update
+from utils.bulk_update import (
+    olab_bulk_update_table_from_all_pairs, KEY_COLUMNS, ALL_PAIRS_UPDATE_COLUMNS,
+    UPDATED, NOT_FOUND, SKIPPED, ERROR,
+)
+from utils.trade_state import TradeStore
+
+COLUMNS = KEY_COLUMNS + ALL_PAIRS_UPDATE_COLUMNS
+
+
+class _Result:
+    def __init__(self, rows=()):
+        self._rows = [(r,) for r in rows]
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    """
+    Just enough of a SQLAlchemy connection for the bulk update: remembers staged
+    rows and answers UPDATE ... RETURNING / the NOT EXISTS probe from `table`
+    ({unique_id: (pair, type)}).
+    """
+
+    def __init__(self, table, fail_on=None):
+        self.table = table
+        self.fail_on = fail_on
+        self.staged = {}
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield
+
+    def execute(self, clause, params=None):
+        sql = " ".join(str(clause).split())
+        params = params or {}
+        self.statements.append((sql, params))
+        if self.fail_on and sql.startswith(self.fail_on):
+            raise RuntimeError("connection lost")
+        if sql.startswith("INSERT INTO _all_pairs_staging"):
+            rows = {}
+            for key, value in params.items():
+                i, j = map(int, re.match(r"p(\d+)_(\d+)", key).groups())
+                rows.setdefault(i, {})[COLUMNS[j]] = value
+            for row in rows.values():
+                self.staged[row["unique_id"]] = row
+        elif sql.startswith("UPDATE"):
+            uids = params.get("uids", list(self.staged))
+            return _Result(uid for uid in uids
+                           if uid in self.table and self.table[uid][0] == self.staged[uid]["pair"]
+                           and self.table[uid][1] not in ("close", "hedge_close"))
+        elif sql.startswith("SELECT s.unique_id"):
+            return _Result(uid for uid in self.staged if uid not in self.table)
+        return _Result()
+
+
+@pytest.fixture
+def fake_db(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # updatedb-error.txt goes under log_event/
+    errors = []
+    monkeypatch.setattr(bulk_update, "olab_log_db_error", lambda e, *args: errors.append(e))
+
+    def install(table, fail_on=None):
+        conn = FakeConnection(table, fail_on)
+
+        @contextmanager
+        def connect():
+            yield conn
+        monkeypatch.setattr(bulk_update.sql_helper, "connection_lock", threading.Lock())
+        monkeypatch.setattr(bulk_update.sql_helper, "_get_connection_with_retry", connect)
+        conn.errors = errors
+        return conn
+    return install
+
+
+def trades():
+    store = TradeStore()
+    store.load("a", {"unique_id": "a", "pair": "BTCUSDT", "investment": 10, "hedge_1_1_bool": True})
+    store.load("b", {"unique_id": "b", "pair": "ETHUSDT", "investment": 20})
+    store.load("c", {"unique_id": "c", "pair": "SOLUSDT", "stop_price": 1.5})
+    store.load("d", {"unique_id": "d", "pair": "XRPUSDT", "stop_price": 0.5})
+    store.load("e", {"unique_id": "e", "pair": "BNBUSDT", "investment": 30})
+    return store
+
+
+def updates(conn):
+    return [(sql, params) for sql, params in conn.statements if sql.startswith("UPDATE")]
+
+
+def test_one_update_per_dirty_column_set(fake_db):
+    conn = fake_db({uid: (pair, "running") for uid, pair in
+                    [("a", "BTCUSDT"), ("b", "ETHUSDT"), ("c", "SOLUSDT"), ("d", "XRPUSDT")]})
+    dirty = {"a": {"investment"}, "b": {"investment"}, "c": {"stop_price", "hedge"},
+             "d": {"not_a_column"}, "gone": {"investment"}}
+    outcomes = olab_bulk_update_table_from_all_pairs(trades(), "M1", dirty_columns=dirty)
+
+    assert outcomes == {"a": UPDATED, "b": UPDATED, "c": UPDATED}
+    assert sorted(conn.staged) == ["a", "b", "c"]
+    statements = {tuple(sorted(params["uids"])): sql for sql, params in updates(conn)}
+    assert set(statements) == {("a", "b"), ("c",)}
+    assert "SET investment = s.investment FROM" in statements[("a", "b")]
+    assert "SET stop_price = s.stop_price, hedge = s.hedge FROM" in statements[("c",)]
+    assert conn.statements[0][0].startswith("CREATE TEMP TABLE _all_pairs_staging ON COMMIT DROP")
+    assert "FROM m1 WITH NO DATA" in conn.statements[0][0]
+
+
+def test_staged_values_are_cleaned(fake_db):
+    conn = fake_db({"a": ("BTCUSDT", "running")})
+    olab_bulk_update_table_from_all_pairs(trades(), "M1", dirty_columns={"a": {"hedge_1_1_bool"}})
+    assert conn.staged["a"]["hedge_1_1_bool"] == 1
+    assert conn.staged["a"]["investment"] == 10
+
+
+def test_full_write_updates_every_column_in_one_statement(fake_db):
+    conn = fake_db({uid: ("BTCUSDT" if uid == "a" else "x", "running") for uid in "abcde"})
+    outcomes = olab_bulk_update_table_from_all_pairs(trades(), "M1")
+    (sql, params), = updates(conn)
+    assert params == {}
+    assert all(f"{col} = s.{col}" in sql for col in ALL_PAIRS_UPDATE_COLUMNS)
+    assert outcomes == {"a": UPDATED, "b": SKIPPED, "c": SKIPPED, "d": SKIPPED, "e": SKIPPED}
+
+
+def test_missing_closed_and_mismatched_rows_are_classified(fake_db, tmp_path):
+    conn = fake_db({"a": ("BTCUSDT", "running"), "b": ("ETHUSDT", "close"),
+                    "c": ("BTCUSDT", "running"), "d": ("XRPUSDT", "hedge_close")})
+    dirty = {uid: {"investment"} for uid in "abcde"}
+    outcomes = olab_bulk_update_table_from_all_pairs(trades(), "M1", dirty_columns=dirty)
+
+    assert outcomes == {"a": UPDATED, "b": SKIPPED, "c": SKIPPED, "d": SKIPPED, "e": NOT_FOUND}
+    log = (tmp_path / "log_event" / "updatedb-error.txt").read_text()
+    assert "UID: e (not_found)" in log and "UID: a " not in log
+    assert conn.errors == []
+
+
+def test_database_error_marks_every_row_as_error(fake_db):
+    conn = fake_db({"a": ("BTCUSDT", "running")}, fail_on="UPDATE")
+    outcomes = olab_bulk_update_table_from_all_pairs(trades(), "M1", dirty_columns={"a": {"investment"}, "b": {"hedge"}})
+    assert outcomes == {"a": ERROR, "b": ERROR}
+    assert len(conn.errors) == 1
+
+
+def test_nothing_dirty_opens_no_connection(fake_db):
+    conn = fake_db({})
+    assert olab_bulk_update_table_from_all_pairs(trades(), "M1", dirty_columns={"a": {"not_a_column"}}) == {}
+    assert olab_bulk_update_table_from_all_pairs({}, "M1") == {}
+    assert conn.statements == []
+
+
+def test_flush_dirty_requeues_only_errored_uids(monkeypatch):
+    import utils.db_updater as db_updater
+
+    store = trades()
+    store["a"]["investment"] = 11
+    store["b"]["investment"] = 21
+    monkeypatch.setattr(db_updater, "all_pairs", store)
+    monkeypatch.setattr(db_updater, "olab_bulk_update_table_from_all_pairs",
+                        lambda pairs, machine_id, dirty_columns: {"a": UPDATED, "b": ERROR})
+    assert db_updater.DBUpdater().flush_dirty("M1") == {"a": UPDATED, "b": ERROR}
+    assert store.drain_dirty() == {"b": {"investment"}}
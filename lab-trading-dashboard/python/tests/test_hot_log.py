@@ -0,0 +1,61 @@
+# tests/test_hot_log.py
+import utils.hot_log as hot_log_module
+from utils.hot_log import HotLogger, INFO, WARNING
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def make_logger(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(hot_log_module.time, "monotonic", clock.monotonic)
+    lines = []
+    logger = HotLogger(level=INFO, sink=lambda path, content: lines.append((path, content)), **kwargs)
+    return logger, lines, clock
+
+
+def test_disabled_level_emits_nothing():
+    lines = []
+    logger = HotLogger(level=WARNING, sink=lambda path, content: lines.append(content))
+    logger.info("price %s", 1.0, uid="u1")
+    assert not logger.info_on and lines == [] and logger.stats["emitted"] == 0
+
+
+def test_lazy_format_and_per_uid_file(monkeypatch):
+    logger, lines, _ = make_logger(monkeypatch)
+    logger.info("price %s", 1.5, uid="BTC:1", side="BUY")
+    path, content = lines[0]
+    assert path.endswith("info_BTC_1.log")
+    assert content.rstrip().endswith("INFO price 1.5 | side=BUY")
+
+
+def test_sampling_keeps_every_nth_line(monkeypatch):
+    logger, lines, _ = make_logger(monkeypatch, sample_every=3)
+    for i in range(9):
+        logger.info("tick %s", i)
+    assert len(lines) == 3 and logger.stats["sampled_out"] == 6
+
+
+def test_uid_rate_limit_resets_each_window(monkeypatch):
+    logger, lines, clock = make_logger(monkeypatch, uid_limit=2)
+    for _ in range(5):
+        logger.info("tick", uid="u1")
+    assert len(lines) == 2 and logger.stats["rate_limited"] == 3
+    clock.now += hot_log_module.UID_WINDOW_SEC
+    logger.info("tick", uid="u1")
+    assert len(lines) == 3
+
+
+def test_expired_uid_windows_are_pruned(monkeypatch):
+    logger, _, clock = make_logger(monkeypatch, uid_limit=1)
+    for i in range(100):
+        logger.info("tick", uid=f"u{i}")
+    assert len(logger._uid_windows) == 100
+    clock.now += hot_log_module.UID_PRUNE_SEC
+    logger.info("tick", uid="live")
+    assert list(logger._uid_windows) == ["live"]
@@ -0,0 +1,103 @@
+# tests/test_kline_archive.py
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.kline_archive as kline_archive
+from utils.kline_archive import (
+    KLINE_DTYPE, append_klines, archive_path, load_klines, load_klines_df, last_archived_time, sync_symbol,
+)
+
+START = pd.Timestamp("2024-01-01")
+STEP = pd.Timedelta(minutes=15)
+
+
+def db_rows(first, count):
+    """kline_* rows (DB column names, naive UTC times) for bars first..first+count-1."""
+    index = np.arange(first, first + count)
+    return pd.DataFrame({
+        "time": [START + i * STEP for i in index],
+        "open": index + 0.1, "high": index + 0.5, "low": index - 0.5, "close": index + 0.2,
+        "volume": index * 10.0, "quotevolume": index * 100.0, "numtrades": index * 3,
+        "takerbuybasevolume": index * 4.0, "takerbuyquotevolume": index * 40.0,
+    })
+
+
+def ms(i):
+    return int((START + i * STEP).tz_localize("UTC").timestamp() * 1000)
+
+
+class FakeSQL:
+    """fetch_dataframe over an in-memory kline table, honouring `time > :since` and LIMIT."""
+
+    def __init__(self, table):
+        self.table = table
+        self.queries = []
+
+    def fetch_dataframe(self, query, params=None):
+        self.queries.append(params["since"])
+        limit = int(re.search(r"LIMIT (\d+)", query).group(1))
+        rows = self.table[self.table["time"] > params["since"]].sort_values("time")
+        return rows.head(limit).reset_index(drop=True)
+
+
+def test_append_and_read_back_round_trip(tmp_path):
+    root = str(tmp_path)
+    shuffled = db_rows(0, 10).sample(frac=1, random_state=1)
+    assert append_klines("btcusdt", "15m", pd.concat([shuffled, shuffled.head(3)]), root=root) == 10
+
+    path = archive_path("BTCUSDT", "15m", root)
+    assert path.endswith("BTCUSDT_15m.bin")
+    reopened = np.memmap(path, dtype=KLINE_DTYPE, mode="r")
+    assert reopened.dtype == KLINE_DTYPE and len(reopened) == 10
+    assert reopened["time"].tolist() == [ms(i) for i in range(10)]
+    assert reopened["num_trades"][4] == 12 and reopened["quote_volume"][4] == 400.0
+    assert reopened["close"][9] == pytest.approx(9.2)
+
+    window = load_klines("BTCUSDT", "15m", start=START + 2 * STEP, end=ms(5), root=root)
+    assert isinstance(window, np.memmap) and window["time"].tolist() == [ms(2), ms(3), ms(4)]
+    df = load_klines_df("BTCUSDT", "15m", start=START + 8 * STEP, root=root)
+    assert list(df.columns) == list(KLINE_DTYPE.names)
+    assert df["time"].tolist() == [pd.Timestamp(START + i * STEP, tz="UTC") for i in (8, 9)]
+
+
+def test_append_only_adds_bars_newer_than_the_tail(tmp_path):
+    root = str(tmp_path)
+    append_klines("BTCUSDT", "15m", db_rows(0, 5), root=root)
+    assert append_klines("BTCUSDT", "15m", db_rows(3, 4), root=root) == 2
+    assert append_klines("BTCUSDT", "15m", db_rows(0, 7), root=root) == 0
+    assert load_klines("BTCUSDT", "15m", root=root)["time"].tolist() == [ms(i) for i in range(7)]
+
+
+def test_torn_trailing_record_is_ignored_and_overwritten(tmp_path):
+    root = str(tmp_path)
+    append_klines("BTCUSDT", "15m", db_rows(0, 3), root=root)
+    with open(archive_path("BTCUSDT", "15m", root), "ab") as f:
+        f.write(b"\x01" * (KLINE_DTYPE.itemsize // 2))
+    assert last_archived_time("BTCUSDT", "15m", root) == ms(2)
+    append_klines("BTCUSDT", "15m", db_rows(3, 1), root=root)
+    assert load_klines("BTCUSDT", "15m", root=root)["time"].tolist() == [ms(i) for i in range(4)]
+
+
+def test_missing_archive_reads_empty(tmp_path):
+    records = load_klines("ETHUSDT", "1h", root=str(tmp_path))
+    assert records.dtype == KLINE_DTYPE and len(records) == 0
+    assert last_archived_time("ETHUSDT", "1h", root=str(tmp_path)) is None
+
+
+def test_sync_pages_through_the_table_and_resumes_from_the_tail(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    sql = FakeSQL(db_rows(0, 25))
+    monkeypatch.setattr(kline_archive, "sql_helper", sql)
+
+    assert sync_symbol("BTCUSDT", "15m", batch_rows=10, root=root) == 25
+    assert len(sql.queries) == 3
+    assert sql.queries[1] == START + 9 * STEP
+
+    sql.table = db_rows(0, 30)
+    sql.queries.clear()
+    assert sync_symbol("BTCUSDT", "15m", batch_rows=10, root=root) == 5
+    assert sql.queries == [START + 24 * STEP]
+    assert load_klines("BTCUSDT", "15m", root=root)["time"].tolist() == [ms(i) for i in range(30)]
@@ -0,0 +1,169 @@
+# tests/test_kline_resampler.py
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.kline_resampler as kr
+from utils.Final_olab_database import INTERVAL_MS
+
+NOW_MS = 1_767_225_600_000 + 37_000   # 2026-01-01 00:00:37 UTC
+
+
+@pytest.fixture(autouse=True)
+def frozen(monkeypatch):
+    clock = types.SimpleNamespace(now=NOW_MS / 1000)
+    monkeypatch.setattr(kr, "time", types.SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(kr, "kline_resampler", kr.KlineResampler())
+    monkeypatch.setattr(kr, "_fallback_until", {})
+    return clock
+
+
+def closed_bars(interval, n, now_ms=NOW_MS):
+    """The n most recently closed bars (fetch_data_safe format) with a deterministic walk."""
+    ms = INTERVAL_MS[interval]
+    last = now_ms - now_ms % ms - ms
+    t = np.arange(last - (n - 1) * ms, last + 1, ms)
+    close = 100 + np.sin(t / 7e6)
+    return pd.DataFrame({
+        "time": pd.to_datetime(t, unit="ms", utc=True),
+        "open": close - 0.1, "high": close + 0.5, "low": close - 0.5, "close": close,
+        "volume": 1.0, "quote_volume": close, "num_trades": 2,
+        "taker_base_vol": 0.5, "taker_quote_vol": close / 2,
+    })
+
+
+class FakeFetcher:
+    """
+    fetch_data_safe stand-in: enforces the Binance 1500-kline cap and, like the
+    API path, drops the still-open candle (limit - 1 closed bars).
+    """
+
+    def __init__(self, frozen):
+        self.frozen = frozen
+        self.calls = []
+
+    def __call__(self, symbol, interval, limit):
+        self.calls.append((interval, limit))
+        if limit > kr.MAX_KLINES_PER_REQUEST:
+            raise ValueError("APIError(code=-1130): Data sent for parameter 'limit' is not valid.")
+        return closed_bars(interval, limit - 1, int(self.frozen.now * 1000))
+
+
+class FakeHistory:
+    """fetch_history_db_range stand-in over a kline table holding `depth` closed bars."""
+
+    def __init__(self, frozen, depth=20000):
+        self.frozen = frozen
+        self.depth = depth
+        self.calls = []
+
+    def __call__(self, symbol, interval, start_time, end_time):
+        self.calls.append((interval, start_time, end_time))
+        bars = closed_bars(interval, self.depth, int(self.frozen.now * 1000))
+        return bars[(bars["time"] >= start_time) & (bars["time"] < end_time)].reset_index(drop=True)
+
+
+def test_resample_matches_manual_aggregation_and_drops_partial_buckets():
+    base = closed_bars("1m", 23)          # 4 full 5m buckets plus a partial leading one
+    out = kr.resample_klines(base, "1m", "5m")
+    assert len(out) == 4
+    first = base[base["time"] >= out["time"].iloc[0]].head(5)
+    row = out.iloc[0]
+    assert row["open"] == first["open"].iloc[0] and row["close"] == first["close"].iloc[-1]
+    assert row["high"] == first["high"].max() and row["low"] == first["low"].min()
+    assert row["volume"] == 5 and row["num_trades"] == 10
+    assert (kr._to_ms(out["time"]) % INTERVAL_MS["5m"] == 0).all()
+
+
+def test_derived_interval_fetches_one_capped_base_window(frozen):
+    fetch = FakeFetcher(frozen)
+    df = kr.fetch_data_resampled("BTCUSDT", "30m", 500, fetch)
+    assert fetch.calls == [("15m", 1002)]
+    assert len(df) == 500
+    expected = kr.resample_klines(closed_bars("15m", 1001), "15m", "30m").tail(500).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+    # Served from memory on the next call
+    assert kr.fetch_data_resampled("BTCUSDT", "30m", 500, fetch).equals(df)
+    assert len(fetch.calls) == 1
+
+
+def test_derived_interval_is_served_at_every_bucket_alignment(frozen):
+    for step in range(4):                  # 00:00, 00:15, 00:30, 00:45 -> both 30m alignments
+        frozen.now = NOW_MS / 1000 + step * 15 * 60
+        kr.kline_resampler = kr.KlineResampler()
+        fetch = FakeFetcher(frozen)
+        assert len(kr.fetch_data_resampled("BTCUSDT", "30m", 500, fetch)) == 500
+        assert [interval for interval, _ in fetch.calls] == ["15m"]
+
+
+def test_retention_covers_the_widest_derived_window():
+    for target, base in kr.RESAMPLE_BASE.items():
+        ratio = INTERVAL_MS[target] // INTERVAL_MS[base]
+        assert kr.BASE_RETENTION[base] >= kr.RESAMPLED_LIMIT * ratio + ratio
+
+
+@pytest.mark.parametrize("interval", ["1h", "2h", "4h"])
+def test_deep_windows_are_completed_from_the_kline_tables(frozen, interval):
+    fetch, history = FakeFetcher(frozen), FakeHistory(frozen)
+    df = kr.fetch_data_resampled("BTCUSDT", interval, 500, fetch, history=history)
+    assert fetch.calls == [("15m", kr.MAX_KLINES_PER_REQUEST)]
+    assert len(history.calls) == 1
+    expected = kr.resample_klines(closed_bars("15m", 8016), "15m", interval).tail(500).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+    assert kr.fetch_data_resampled("BTCUSDT", interval, 500, fetch, history=history).equals(df)
+    frozen.now += INTERVAL_MS[interval] / 1000
+    assert len(kr.fetch_data_resampled("BTCUSDT", interval, 500, fetch, history=history)) == 500
+    assert fetch.calls[1:] == [("15m", INTERVAL_MS[interval] // INTERVAL_MS["15m"] + 1)]
+    assert len(history.calls) == 1
+
+
+def test_shallow_history_falls_back_to_the_native_interval(frozen):
+    fetch, history = FakeFetcher(frozen), FakeHistory(frozen, depth=3000)
+    assert len(kr.fetch_data_resampled("BTCUSDT", "4h", 500, fetch, history=history)) == 499
+    assert fetch.calls == [("15m", kr.MAX_KLINES_PER_REQUEST), ("4h", 500)]
+
+
+def test_window_over_the_cap_falls_back_without_a_base_read(frozen):
+    fetch = FakeFetcher(frozen)
+    kr.fetch_data_resampled("BTCUSDT", "4h", 500, fetch)
+    kr.fetch_data_resampled("BTCUSDT", "4h", 500, fetch)
+    assert fetch.calls == [("4h", 500), ("4h", 500)]
+
+
+def test_base_reads_fill_the_cache_and_top_ups_fetch_only_the_gap(frozen):
+    fetch = FakeFetcher(frozen)
+    kr.fetch_data_resampled("BTCUSDT", "1m", 1500, fetch)
+    kr.fetch_data_resampled("BTCUSDT", "1m", 1500, fetch)  # overlapping read, same cache
+    frozen.now -= 1500 * 60
+    kr.fetch_data_resampled("BTCUSDT", "1m", 1500, fetch)
+    frozen.now += 1500 * 60
+    fetch.calls.clear()
+
+    assert len(kr.fetch_data_resampled("BTCUSDT", "5m", 500, fetch)) == 500
+    assert fetch.calls == []
+
+    frozen.now += 3 * 60                   # 1m bars close, the 5m bar is still open
+    kr.fetch_data_resampled("BTCUSDT", "5m", 500, fetch)
+    assert fetch.calls == []
+
+    frozen.now += 2 * 60                   # next 5m bar closed: five 1m bars missing
+    df = kr.fetch_data_resampled("BTCUSDT", "5m", 500, fetch)
+    assert fetch.calls == [("1m", 6)]
+    assert df["time"].iloc[-1] == closed_bars("5m", 1, int(frozen.now * 1000))["time"].iloc[0]
+
+
+def test_fetch_failure_falls_back_and_backs_off(frozen):
+    calls = []
+
+    def flaky(symbol, interval, limit):
+        calls.append((interval, limit))
+        return None if interval == "15m" else closed_bars(interval, limit - 1)
+
+    assert len(kr.fetch_data_resampled("ETHUSDT", "1h", 300, flaky)) == 299
+    assert calls == [("15m", 1204), ("1h", 300)]
+    kr.fetch_data_resampled("ETHUSDT", "1h", 300, flaky)
+    assert calls[2:] == [("1h", 300)]      # no base retry within the same 1h bar
@@ -0,0 +1,42 @@
+# tests/test_kline_stream.py
+import asyncio
+
+from core.kline_stream import KlineIngestionService, KlineReplaySource
+
+
+def rest_rows(start_ms, interval_ms, n):
+    return [[start_ms + i * interval_ms, "1.0", "2.0", "0.5", str(1 + i), "10", start_ms + (i + 1) * interval_ms - 1,
+             "100", 3, "4", "40"] for i in range(n)]
+
+
+def test_replay_writes_closed_bars_in_batches_and_publishes_after_the_write():
+    btc = rest_rows(0, 60_000, 5)
+    eth = rest_rows(0, 180_000, 2)
+    written, seen = [], []
+
+    def writer(symbol, interval, klines):
+        written.append((symbol, interval, len(klines)))
+
+    service = KlineIngestionService(["BTCUSDT", "ETHUSDT"], ["1m", "3m"], writer=writer,
+                                    source=KlineReplaySource({("BTCUSDT", "1m"): btc, ("ETHUSDT", "3m"): eth}),
+                                    feed_resampler=False, flush_max_bars=3)
+    service.subscribe(lambda symbol, interval, k: seen.append((symbol, interval, k[0], len(written))),
+                      symbol="BTCUSDT")
+    asyncio.run(service.run())
+
+    assert service.stats["closed"] == 7 and service.stats["written"] == 7
+    assert service.stats["messages"] == 14            # in-progress updates are ignored
+    assert sum(n for s, i, n in written if s == "BTCUSDT") == 5
+    assert [k for _, _, k, _ in seen] == [row[0] for row in btc]
+    assert all(write_count > 0 for *_, write_count in seen)
+    assert all(interval == "1m" for _, interval, _, _ in seen)
+
+
+def test_stream_rows_round_trip_to_the_rest_format():
+    rows = rest_rows(1_700_000_000_000, 60_000, 1)
+    captured = []
+    service = KlineIngestionService(["BTCUSDT"], ["1m"], writer=lambda s, i, klines: captured.extend(klines),
+                                    source=KlineReplaySource({("BTCUSDT", "1m"): rows}), feed_resampler=False)
+    asyncio.run(service.run())
+
+    assert [float(v) for v in captured[0]] == [float(v) for v in rows[0]]
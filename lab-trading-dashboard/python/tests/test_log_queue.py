@@ -0,0 +1,46 @@
+# tests/test_log_queue.py
+import threading
+
+from utils.log_queue import FILE_TARGET, LogWriteBehind
+
+
+def test_counters_are_exact_under_concurrent_producers(tmp_path):
+    queue = LogWriteBehind(max_size=1000, flush_interval_ms=60_000, max_batch_rows=10**9)
+    path = str(tmp_path / "events.log")
+    threads, per_thread = 8, 500
+
+    def produce():
+        for _ in range(per_thread):
+            queue.enqueue(FILE_TARGET, {"path": path, "content": "x\n"})
+
+    workers = [threading.Thread(target=produce) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    stats = queue.snapshot()
+    assert stats["enqueued"] + stats["dropped"] == threads * per_thread
+    assert stats["enqueued"] == stats["depth"] <= 1000
+    assert stats["max_depth"] == stats["depth"]
+
+    queue.stop()
+    stats = queue.snapshot()
+    assert stats["written"] == stats["enqueued"] and stats["depth"] == 0
+    with open(path) as f:
+        assert len(f.readlines()) == stats["written"]
+
+
+def test_failed_prepare_is_counted(tmp_path):
+    queue = LogWriteBehind(flush_interval_ms=60_000)
+    path = str(tmp_path / "events.log")
+
+    def broken(row):
+        raise ValueError("bad row")
+
+    queue.enqueue(FILE_TARGET, {"path": path, "content": "ok\n"})
+    queue.enqueue(FILE_TARGET, {"path": path, "content": "no\n"}, prepare=broken)
+    queue.flush()
+    stats = queue.snapshot()
+    assert stats["written"] == 1 and stats["failed"] == 1 and stats["flushes"] == 1
+    queue.stop()
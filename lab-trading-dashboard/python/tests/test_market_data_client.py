@@ -0,0 +1,42 @@
+# tests/test_market_data_client.py
+import asyncio
+
+from utils.market_data_client import AsyncMarketDataClient, BinanceHTTPError, closed_klines
+
+
+def kline(open_ms, close):
+    return [open_ms, str(close), str(close + 1), str(close - 1), str(close), "10", open_ms + 59_999,
+            "100", 5, "4", "40", "0"]
+
+
+class FakeClient(AsyncMarketDataClient):
+    def __init__(self, rows_by_symbol):
+        super().__init__()
+        self.rows_by_symbol = rows_by_symbol
+
+    async def klines(self, symbol, interval, limit=500):
+        rows = self.rows_by_symbol[symbol]
+        if isinstance(rows, Exception):
+            raise rows
+        return rows
+
+
+def test_fetch_many_klines_stores_closed_rows_and_survives_failures():
+    rows = [kline(60_000 * i, 100 + i) for i in range(4)]
+    md = FakeClient({"BTCUSDT": rows, "ETHUSDT": BinanceHTTPError(429, "Too many requests")})
+    stored = []
+
+    frames = asyncio.run(md.fetch_many_klines(
+        ["BTCUSDT", "ETHUSDT"], "1m", 4, store=lambda *args: stored.append(args)))
+
+    assert frames["ETHUSDT"] is None
+    assert len(frames["BTCUSDT"]) == 3               # open bar dropped
+    assert stored == [("BTCUSDT", "1m", closed_klines(rows))]
+    assert all(len(k) == 11 for k in stored[0][2])
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert BinanceHTTPError(429, "slow down", {"Retry-After": "7"}).retry_after == 7.0
+    err = BinanceHTTPError(429, "slow down", {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert err.retry_after is None or err.retry_after >= 0
+    assert BinanceHTTPError(418, "banned").retry_after == 300
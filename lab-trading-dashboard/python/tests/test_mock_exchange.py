@@ -0,0 +1,32 @@
+# tests/test_mock_exchange.py
+import pytest
+
+from utils.mock_exchange import MockExchange
+
+
+@pytest.fixture
+def exchange():
+    return MockExchange(symbols={"BTCUSDT": 60000.0, "ETHUSDT": 3000.0})
+
+
+def open_positions(exchange, symbol=None):
+    return {(p["symbol"], p["positionSide"]): float(p["positionAmt"])
+            for p in exchange.position_risk(symbol) if float(p["positionAmt"]) != 0}
+
+
+def test_one_way_orders_are_reported_as_both_positions(exchange):
+    exchange.new_order({"symbol": "ETHUSDT", "side": "SELL", "positionSide": "SHORT", "type": "MARKET", "quantity": "1"})
+    status, order = exchange.new_order({"symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": "0.01"})
+    assert status == 200 and order["positionSide"] == "BOTH"
+
+    assert open_positions(exchange) == {("BTCUSDT", "BOTH"): 0.01, ("ETHUSDT", "SHORT"): -1.0}
+    assert open_positions(exchange, "BTCUSDT") == {("BTCUSDT", "BOTH"): 0.01}
+    # The margin balance() charges matches the positions positionRisk reports
+    margin = exchange.wallet_balance - float(exchange.balance()[0]["maxWithdrawAmount"])
+    assert margin == pytest.approx((0.01 * 60000 + 1 * 3000) / 10, rel=1e-3)
+
+
+def test_hedge_mode_symbols_keep_the_long_short_shape(exchange):
+    exchange.new_order({"symbol": "BTCUSDT", "side": "BUY", "positionSide": "LONG", "type": "MARKET", "quantity": "0.02"})
+    sides = [p["positionSide"] for p in exchange.position_risk("BTCUSDT")]
+    assert sides == ["LONG", "SHORT"]
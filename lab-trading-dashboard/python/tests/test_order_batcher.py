@@ -0,0 +1,95 @@
+# tests/test_order_batcher.py
+import threading
+
+from utils.order_batcher import OrderBatcher
+
+
+def market(symbol, side="BUY", qty=0.01, **extra):
+    return {"symbol": symbol, "side": side, "type": "MARKET", "quantity": qty, **extra}
+
+
+class FakeExchange:
+    def __init__(self, fail_batches=0, fill_despite_failure=True):
+        self.fail_batches = fail_batches
+        self.fill_despite_failure = fill_despite_failure
+        self.batches = []
+        self.orders = {}            # clientOrderId -> order dict
+        self.lock = threading.Lock()
+
+    def submit_batch(self, orders):
+        with self.lock:
+            self.batches.append(orders)
+            placed = []
+            for i, o in enumerate(orders):
+                order = {"orderId": len(self.orders) + 1, "clientOrderId": o["newClientOrderId"],
+                         "symbol": o["symbol"], "status": "FILLED"}
+                if o["symbol"] == "BADUSDT":
+                    placed.append({"code": -1111, "msg": "Precision is over the maximum defined for this asset."})
+                    continue
+                if not self.fail_batches or self.fill_despite_failure:
+                    self.orders[o["newClientOrderId"]] = order
+                placed.append(order)
+            if self.fail_batches:
+                self.fail_batches -= 1
+                raise TimeoutError("Read timed out")
+            return placed
+
+    def query_order(self, symbol, client_order_id):
+        order = self.orders.get(client_order_id)
+        return dict(order) if order else {"ok": False, "message": "Order does not exist.", "code": -2013}
+
+
+def test_concurrent_submits_share_one_batch_and_get_their_own_entry():
+    exchange = FakeExchange()
+    batcher = OrderBatcher(exchange.submit_batch, window=0.2)
+    results = {}
+    threads = [threading.Thread(target=lambda s=s: results.__setitem__(s, batcher.submit(market(s))))
+               for s in ("BTCUSDT", "ETHUSDT", "BADUSDT")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert len(exchange.batches) == 1
+    assert results["BTCUSDT"]["symbol"] == "BTCUSDT" and results["ETHUSDT"]["symbol"] == "ETHUSDT"
+    assert results["BADUSDT"] == {"ok": False, "code": -1111,
+                                  "message": "Precision is over the maximum defined for this asset."}
+
+
+def test_every_leg_gets_a_string_encoded_client_order_id():
+    exchange = FakeExchange()
+    batcher = OrderBatcher(exchange.submit_batch)
+    caller_order = market("BTCUSDT", reduceOnly=False, price=None)
+    batcher.submit_many([caller_order, market("BTCUSDT", "SELL", newClientOrderId="mine")])
+
+    sent = exchange.batches[0]
+    assert sent[0]["newClientOrderId"].startswith("olab_") and len(sent[0]["newClientOrderId"]) <= 36
+    assert sent[1]["newClientOrderId"] == "mine"
+    assert sent[0]["quantity"] == "0.01" and sent[0]["reduceOnly"] == "false" and "price" not in sent[0]
+    assert "newClientOrderId" not in caller_order
+
+
+def test_failed_batch_is_resolved_by_client_order_id():
+    exchange = FakeExchange(fail_batches=1, fill_despite_failure=True)
+    batcher = OrderBatcher(exchange.submit_batch, query_order=exchange.query_order)
+    entry, hedge = batcher.submit_many([market("BTCUSDT", positionSide="LONG"),
+                                        market("BTCUSDT", "SELL", positionSide="SHORT")])
+    # The request timed out but both legs filled: callers must see the orders, not a failure
+    assert entry["status"] == "FILLED" and hedge["status"] == "FILLED"
+    assert batcher.stats["recovered"] == 2
+
+
+def test_failed_batch_that_never_reached_the_exchange_reports_failure():
+    exchange = FakeExchange(fail_batches=1, fill_despite_failure=False)
+    batcher = OrderBatcher(exchange.submit_batch, query_order=exchange.query_order)
+    result = batcher.submit(market("BTCUSDT"))
+    assert result["ok"] is False and "Read timed out" in result["message"]
+    assert result["clientOrderId"] == exchange.batches[0][0]["newClientOrderId"]
+
+
+def test_more_than_five_orders_are_split_into_batches():
+    exchange = FakeExchange()
+    batcher = OrderBatcher(exchange.submit_batch)
+    results = batcher.submit_many([market(f"S{i}USDT") for i in range(7)])
+    assert [len(b) for b in exchange.batches] == [5, 2]
+    assert [r["symbol"] for r in results] == [f"S{i}USDT" for i in range(7)]
@@ -0,0 +1,120 @@
+# tests/test_position_scheduler.py
+import threading
+import time
+
+import pytest
+
+from core.position_scheduler import PositionScheduler
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def make_scheduler():
+    created = []
+
+    def make(evaluate, **kwargs):
+        scheduler = PositionScheduler(evaluate, max_workers=4, timer_interval=60, **kwargs)
+        created.append(scheduler)
+        return scheduler.start()
+    yield make
+    for scheduler in created:
+        scheduler.stop()
+
+
+def test_events_during_an_evaluation_coalesce_into_one_follow_up(make_scheduler):
+    release = threading.Event()
+    runs = []
+
+    def evaluate(uid):
+        runs.append(uid)
+        if len(runs) == 1:
+            release.wait(5)
+
+    scheduler = make_scheduler(evaluate)
+    scheduler.add("A")
+    wait_until(lambda: len(runs) == 1)
+    for _ in range(10):
+        scheduler.notify("A")
+    release.set()
+    wait_until(lambda: scheduler.snapshot()["running"] == 0 and scheduler.snapshot()["queued"] == 0)
+    time.sleep(0.05)
+
+    assert runs == ["A", "A"]
+    assert scheduler.stats["coalesced"] == 10
+
+
+def test_a_uid_never_runs_concurrently_with_itself(make_scheduler):
+    active, overlaps, lock = set(), [], threading.Lock()
+
+    def evaluate(uid):
+        with lock:
+            if uid in active:
+                overlaps.append(uid)
+            active.add(uid)
+        time.sleep(0.002)
+        with lock:
+            active.discard(uid)
+
+    scheduler = make_scheduler(evaluate)
+    for uid in ("A", "B", "C"):
+        scheduler.add(uid)
+    for _ in range(200):
+        scheduler.notify_many(["A", "B", "C"])
+    wait_until(lambda: scheduler.snapshot()["running"] == 0 and scheduler.snapshot()["queued"] == 0)
+    assert overlaps == []
+    assert scheduler.stats["evaluations"] >= 3
+
+
+def test_returning_false_or_remove_unregisters(make_scheduler):
+    runs = []
+
+    def evaluate(uid):
+        runs.append(uid)
+        return uid != "gone"
+
+    scheduler = make_scheduler(evaluate)
+    scheduler.add("gone")
+    scheduler.add("kept")
+    wait_until(lambda: len(runs) == 2)
+    wait_until(lambda: "gone" not in scheduler)
+    assert "kept" in scheduler
+    assert scheduler.add("kept") is False
+
+    scheduler.remove("kept")
+    scheduler.notify("kept")
+    time.sleep(0.05)
+    assert sorted(runs) == ["gone", "kept"]
+
+
+def test_evaluation_errors_are_counted_and_the_uid_stays_registered(make_scheduler):
+    def evaluate(uid):
+        raise RuntimeError("boom")
+
+    scheduler = make_scheduler(evaluate)
+    scheduler.add("A")
+    wait_until(lambda: scheduler.stats["errors"] == 1)
+    assert "A" in scheduler
+
+
+def test_counters_match_the_evaluations_that_ran(make_scheduler):
+    runs, lock = [], threading.Lock()
+
+    def evaluate(uid):
+        with lock:
+            runs.append(uid)
+        if uid % 2:
+            raise RuntimeError("odd")
+
+    scheduler = make_scheduler(evaluate)
+    for uid in range(200):
+        scheduler.add(uid)
+    wait_until(lambda: scheduler.snapshot()["running"] == 0 and scheduler.snapshot()["queued"] == 0)
+    assert scheduler.stats["evaluations"] == len(runs) == 200
+    assert scheduler.stats["errors"] == 100
@@ -0,0 +1,105 @@
+# tests/test_price_source.py
+import os
+import sys
+
+import pytest
+
+import utils.price_source as price_source
+from utils.price_source import PriceSource
+from utils.trade_state import TradeStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(price_source.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_fresh_stream_price_is_served_without_rest(clock):
+    prices = PriceSource(max_age=5)
+    prices.update_many([("BTCUSDT", "64000.5"), ("ETHUSDT", "bad"), ("XRPUSDT", 0), ("", 1)])
+    clock.now += 5
+    assert prices.get("BTCUSDT", fallback=lambda s: pytest.fail("REST called")) == 64000.5
+    assert prices.latest("ETHUSDT") is None and prices.latest("XRPUSDT") is None
+    assert prices.stats == {"stream_hits": 1, "rest_fallbacks": 0}
+
+
+def test_stale_or_missing_stream_price_falls_back_to_rest(clock):
+    prices = PriceSource(max_age=5)
+    rest_calls = []
+
+    def rest(symbol):
+        rest_calls.append(symbol)
+        return "3000.25"
+
+    prices.update("BTCUSDT", 64000)
+    clock.now += 5.1
+    assert prices.latest("BTCUSDT") is None
+    assert prices.get("BTCUSDT", fallback=lambda s: "64100") == 64100.0
+    assert prices.get("ETHUSDT", fallback=rest) == 3000.25
+    # The REST answer is cached like a streamed one
+    assert prices.get("ETHUSDT", fallback=rest) == 3000.25
+    assert rest_calls == ["ETHUSDT"]
+    assert prices.get("SOLUSDT") is None
+    assert prices.stats == {"stream_hits": 1, "rest_fallbacks": 2}
+
+
+def test_symbol_index_fans_a_tick_out_to_its_uids_only():
+    store = TradeStore()
+    store.load("a", {"pair": "BTCUSDT"})
+    store.load("b", {"pair": "BTCUSDT"})
+    store.load("c", {"pair": "ETHUSDT"})
+    assert sorted(store.uids_for_symbol("BTCUSDT")) == ["a", "b"]
+    assert store.uids_for_symbol("XRPUSDT") == ()
+    store["b"]["pair"] = "ETHUSDT"
+    store.pop("c")
+    assert store.uids_for_symbol("BTCUSDT") == ("a",) and store.uids_for_symbol("ETHUSDT") == ("b",)
+
+
+class FakeScheduler:
+    def __init__(self, registered):
+        self.registered = set(registered)
+        self.notified = []
+
+    def __contains__(self, uid):
+        return uid in self.registered
+
+    def notify(self, uid):
+        self.notified.append(uid)
+
+
+def test_dispatch_prices_wakes_only_the_uids_holding_the_symbol(monkeypatch):
+    # ws_handler pulls in the strategy modules (TA-Lib) and main_binance, which
+    # imports keys1 from utils/ (appended so the utils package is not shadowed)
+    pytest.importorskip("talib")
+    monkeypatch.setattr(sys, "path", sys.path + [os.path.join(os.path.dirname(os.path.dirname(__file__)), "utils")])
+    import core.ws_handler as ws_handler
+
+    store = TradeStore()
+    store.load("a", {"pair": "BTCUSDT"})
+    store.load("b", {"pair": "BTCUSDT"})
+    store.load("c", {"pair": "ETHUSDT"})
+    store.load("d", {"pair": "SOLUSDT"})
+    tracker, scheduler, started = {}, FakeScheduler({"a", "c", "d"}), []
+    monkeypatch.setattr(ws_handler, "all_pairs", store)
+    monkeypatch.setattr(ws_handler, "analysis_tracker", tracker)
+    monkeypatch.setattr(ws_handler, "position_scheduler", scheduler)
+    monkeypatch.setattr(ws_handler, "mark_prices", PriceSource())
+
+    handler = object.__new__(ws_handler.WebSocketHandler)
+    handler.start_worker = lambda uid: started.append(uid) or True
+    handler.dispatch_prices({"BTCUSDT": (64000.0, 0), "XRPUSDT": (0.5, 0)})
+
+    assert scheduler.notified == ["a"] and started == ["b"]
+    assert sorted(tracker) == ["a", "b"]
+    assert tracker["a"].Current_Price == 64000.0
+    assert ws_handler.mark_prices.latest("XRPUSDT") == 0.5
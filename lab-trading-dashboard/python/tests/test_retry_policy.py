@@ -0,0 +1,136 @@
+# tests/test_retry_policy.py
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+from utils.retry_policy import RetryPolicy, CircuitOpenError, retry_after_seconds, is_retryable
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, header=None, error_code=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.header = header or {}
+        self.error_code = error_code
+
+
+def flaky(*errors, result="ok"):
+    """Raise each error in turn, then return result."""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(time.time())
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def policy(sleeps):
+    return RetryPolicy("test", max_attempts=3, base_delay=1.0, max_delay=10.0, breaker_threshold=2,
+                       breaker_reset=30.0, sleep=sleeps.append)
+
+
+def test_transient_errors_are_retried_with_bounded_jitter(policy, sleeps):
+    fn = flaky(HTTPError(503), ConnectionError("reset"))
+    assert policy.call(fn) == "ok"
+    assert len(fn.calls) == 3 and len(sleeps) == 2
+    assert all(1.0 <= s <= 10.0 for s in sleeps)
+    assert policy.stats["retries"] == 2 and policy.stats["successes"] == 1
+
+
+def test_bad_requests_are_not_retried_and_do_not_trip_the_breaker(policy):
+    for _ in range(3):
+        with pytest.raises(HTTPError):
+            policy.call(flaky(HTTPError(400, error_code=-1111)))
+    assert policy.stats["rejected"] == 3 and not policy.circuit_open()
+    assert is_retryable(HTTPError(400, error_code=-1021))
+
+
+def test_retry_after_is_honoured_and_a_long_ban_opens_the_circuit(policy, sleeps):
+    assert policy.call(flaky(HTTPError(429, {"Retry-After": "4"}))) == "ok"
+    assert sleeps == [4.0]
+
+    ban = flaky(HTTPError(418, {"Retry-After": "120"}))
+    with pytest.raises(HTTPError):
+        policy.call(ban)
+    assert len(ban.calls) == 1 and sleeps == [4.0]
+    assert policy.circuit_open()
+    with pytest.raises(CircuitOpenError) as info:
+        policy.call(flaky())
+    assert info.value.retry_in > 100
+
+
+def test_retry_after_accepts_http_dates():
+    in_a_minute = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= retry_after_seconds(HTTPError(429, {"Retry-After": in_a_minute})) <= 60
+    assert retry_after_seconds(HTTPError(429, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(HTTPError(418)) == 300
+
+
+def test_budget_limits_retries_during_an_outage(sleeps):
+    policy = RetryPolicy("budget", max_attempts=5, budget_cap=2.0, budget_ratio=0.5,
+                         breaker_threshold=100, sleep=sleeps.append)
+    with pytest.raises(HTTPError):
+        policy.call(flaky(*[HTTPError(500)] * 5))
+    assert policy.stats["retries"] == 2 and policy.stats["budget_exhausted"] == 1
+    # Successes earn retry tokens back
+    for _ in range(2):
+        policy.call(flaky())
+    assert policy.call(flaky(HTTPError(500))) == "ok"
+
+
+def test_breaker_opens_then_lets_one_probe_through(policy, monkeypatch):
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            policy.call(flaky(*[HTTPError(502)] * 3))
+    assert policy.circuit_open() and policy.stats["circuit_opens"] == 1
+    probe = flaky()
+    with pytest.raises(CircuitOpenError):
+        policy.call(probe)
+    assert probe.calls == []
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 31)
+    assert policy.call(probe) == "ok"
+    assert not policy.circuit_open()
+
+
+def test_no_retry_failures_count_against_the_breaker_without_retrying(sleeps):
+    class OrderFailed(HTTPError):
+        pass
+    policy = RetryPolicy("orders", breaker_threshold=2, no_retry=(OrderFailed,), sleep=sleeps.append)
+    for _ in range(2):
+        fn = flaky(OrderFailed(503))
+        with pytest.raises(OrderFailed):
+            policy.call(fn)
+        assert len(fn.calls) == 1
+    assert sleeps == [] and policy.circuit_open()
+
+
+def test_counters_are_consistent_under_concurrent_calls():
+    policy = RetryPolicy("concurrent", max_attempts=2, base_delay=0.0, breaker_threshold=10_000,
+                         budget_cap=10_000, sleep=lambda delay: None)
+    policy._tokens = 10_000
+
+    def worker():
+        for _ in range(200):
+            policy.call(flaky(HTTPError(429, {"Retry-After": "0"})))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = policy.snapshot()
+    assert snap["calls"] == snap["successes"] == snap["retries"] == snap["retry_after_waits"] == 1600
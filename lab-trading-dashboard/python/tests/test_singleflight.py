@@ -0,0 +1,115 @@
+# tests/test_singleflight.py
+import threading
+import time
+
+import pandas as pd
+
+from utils.singleflight import SingleFlight, coalesced
+
+
+def run_concurrently(n, target):
+    """Start n threads on target(i) and return their results, in thread order."""
+    results = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def blocking_fetch(release, started, calls, result=None, error=None):
+    def fetch(*args):
+        calls.append(args)
+        started.set()
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return fetch
+
+
+def wait_for_waiters(group, n):
+    # Waiters are counted as soon as they join the in-flight call
+    for _ in range(500):
+        if group.stats["shared"] == n:
+            return
+        time.sleep(0.005)
+    raise AssertionError("waiters did not join")
+
+
+def test_waiters_share_the_leader_result(tmp_path):
+    group = SingleFlight(lock_dir=str(tmp_path))
+    release, started, calls = threading.Event(), threading.Event(), []
+    fetch = blocking_fetch(release, started, calls, result="klines")
+
+    leader, leader_result = run_concurrently(1, lambda i: group.do("k", fetch))
+    assert started.wait(5)
+    waiters, results = run_concurrently(4, lambda i: group.do("k", fetch))
+    wait_for_waiters(group, 4)
+    release.set()
+    for t in leader + waiters:
+        t.join(5)
+
+    assert calls == [()]
+    assert leader_result == [("klines", False)]
+    assert results == [("klines", True)] * 4
+    assert group.stats == {"leaders": 1, "shared": 4}
+    assert group.do("k", lambda: "fresh") == ("fresh", False)
+
+
+def test_leader_error_is_raised_in_every_waiter(tmp_path):
+    group = SingleFlight(lock_dir=str(tmp_path))
+    release, started, calls = threading.Event(), threading.Event(), []
+    fetch = blocking_fetch(release, started, calls, error=ConnectionError("down"))
+
+    leader, leader_result = run_concurrently(1, lambda i: group.do("k", fetch))
+    assert started.wait(5)
+    waiters, results = run_concurrently(3, lambda i: group.do("k", fetch))
+    wait_for_waiters(group, 3)
+    release.set()
+    for t in leader + waiters:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert all(isinstance(r, ConnectionError) for r in leader_result + results)
+
+
+def test_process_shared_leader_runs_under_the_file_lock(tmp_path):
+    group = SingleFlight(lock_dir=str(tmp_path))
+    assert group.do(("fetch", "BTCUSDT"), lambda: 1, process_shared=True) == (1, False)
+    assert len(list(tmp_path.glob("olab_sf_*.lock"))) == 1
+
+
+def test_coalesced_gives_waiters_their_own_dataframe(tmp_path):
+    group = SingleFlight(lock_dir=str(tmp_path))
+    release, started, calls = threading.Event(), threading.Event(), []
+    frame = pd.DataFrame({"close": [1.0, 2.0]})
+    fetch_data = coalesced(blocking_fetch(release, started, calls, result=frame), group=group)
+
+    leader, leader_result = run_concurrently(1, lambda i: fetch_data("BTCUSDT", "15m"))
+    assert started.wait(5)
+    waiters, results = run_concurrently(2, lambda i: fetch_data("BTCUSDT", "15m"))
+    wait_for_waiters(group, 2)
+    release.set()
+    for t in leader + waiters:
+        t.join(5)
+
+    assert calls == [("BTCUSDT", "15m")]
+    assert leader_result[0] is frame
+    results[0]["ema"] = 0.0
+    assert "ema" not in frame and "ema" not in results[1]
+    assert results[0] is not results[1]
+    pd.testing.assert_frame_equal(results[1], frame)
+
+
+def test_different_arguments_are_not_coalesced(tmp_path):
+    group = SingleFlight(lock_dir=str(tmp_path))
+    fetch = coalesced(lambda symbol: symbol.lower(), group=group)
+    assert [fetch("BTCUSDT"), fetch("ETHUSDT")] == ["btcusdt", "ethusdt"]
+    assert group.stats == {"leaders": 2, "shared": 0}
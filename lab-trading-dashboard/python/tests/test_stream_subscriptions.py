@@ -0,0 +1,54 @@
+# tests/test_stream_subscriptions.py
+import asyncio
+import json
+
+import utils.stream_subscriptions as stream_subscriptions
+from utils.stream_subscriptions import StreamSubscriptions, MAX_PARAMS_PER_FRAME
+
+
+def decode(frames):
+    return [(f["method"], f["params"], f["id"]) for f in map(json.loads, frames)]
+
+
+def test_frames_send_only_the_difference_unsubscribe_first():
+    subs = StreamSubscriptions()
+    assert decode(subs.frames(["BTCUSDT", "ETHUSDT"])) == [
+        ("SUBSCRIBE", ["btcusdt@markPrice@1s", "ethusdt@markPrice@1s"], 1)]
+    assert subs.frames(["ETHUSDT", "BTCUSDT", None]) == []
+    assert decode(subs.frames(["ETHUSDT", "XRPUSDT"])) == [
+        ("UNSUBSCRIBE", ["btcusdt@markPrice@1s"], 2),
+        ("SUBSCRIBE", ["xrpusdt@markPrice@1s"], 3)]
+    assert subs.stats["subscribed"] == 3 and subs.stats["unsubscribed"] == 1
+
+
+def test_frames_are_split_and_the_set_is_capped():
+    subs = StreamSubscriptions(max_streams=120)
+    frames = decode(subs.frames([f"S{i:03d}USDT" for i in range(150)]))
+    assert [len(params) for _, params, _ in frames] == [MAX_PARAMS_PER_FRAME, MAX_PARAMS_PER_FRAME, 20]
+    assert len(subs.active) == 120 and subs.stats["dropped"] == 30
+
+
+def test_error_reply_resends_the_full_set_on_the_next_sync():
+    subs = StreamSubscriptions()
+    subs.frames(["BTCUSDT"])
+    assert subs.handle_reply({"result": None, "id": 1}) is True
+    assert subs.handle_reply({"e": "markPriceUpdate", "s": "BTCUSDT"}) is False
+    assert subs.handle_reply({"error": {"code": 2, "msg": "Invalid request"}, "id": 2}) is True
+    assert decode(subs.frames(["BTCUSDT"])) == [("SUBSCRIBE", ["btcusdt@markPrice@1s"], 2)]
+
+
+def test_sync_sends_frames_over_the_socket(monkeypatch):
+    monkeypatch.setattr(stream_subscriptions, "FRAME_INTERVAL_SEC", 0)
+
+    class FakeSocket:
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, frame):
+            self.sent.append(frame)
+
+    ws, subs = FakeSocket(), StreamSubscriptions()
+    subs.frames([f"S{i:03d}USDT" for i in range(60)])
+    assert asyncio.run(subs.sync(ws, ["BTCUSDT"])) == 3
+    assert [json.loads(f)["method"] for f in ws.sent] == ["UNSUBSCRIBE", "UNSUBSCRIBE", "SUBSCRIBE"]
+    assert subs.stats["frames"] == 3
@@ -0,0 +1,66 @@
+# tests/test_symbol_metadata.py
+import threading
+
+from utils.symbol_metadata import SymbolMetadataCache
+
+
+def payload(*symbols, precision=2):
+    return {"symbols": [{
+        "symbol": s, "pricePrecision": precision, "quantityPrecision": 3, "status": "TRADING",
+        "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.10"},
+                    {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": "5"}],
+    } for s in symbols]}
+
+
+def test_lookups_parse_filters_and_fall_back_to_the_db():
+    cache = SymbolMetadataCache(loader=lambda: payload("BTCUSDT"))
+    meta = cache.get("btcusdt")
+    assert (meta["tick_size"], meta["step_size"], meta["min_notional"]) == (0.1, 0.001, 5.0)
+    assert cache.price_precision("BTCUSDT") == 2
+    assert cache.qty_precision("NEWUSDT", db_fetch=lambda s: 1) == 1
+    assert cache.stats["refreshes"] == 1          # the miss reload is rate-limited
+
+
+def test_reload_runs_outside_the_lock_and_swaps_the_payload_in():
+    release = threading.Event()
+    loads = [payload("BTCUSDT", precision=2)]
+    cache = SymbolMetadataCache(loader=lambda: loads.pop(0), miss_refresh_interval=0)
+    assert cache.price_precision("BTCUSDT") == 2
+
+    def slow_exchange_info():
+        release.wait(5)
+        return payload("BTCUSDT", precision=4)
+
+    cache.set_loader(slow_exchange_info)
+    cache.invalidate()
+    reloader = threading.Thread(target=cache.refresh)
+    reloader.start()
+    try:
+        while not cache._loading:
+            pass
+        # Lookups during the download are served from the previous payload without blocking
+        assert cache.price_precision("BTCUSDT") == 2
+    finally:
+        release.set()
+        reloader.join(5)
+    assert cache.price_precision("BTCUSDT") == 4
+
+
+def test_first_lookups_wait_for_the_initial_load():
+    release = threading.Event()
+
+    def slow_exchange_info():
+        release.wait(5)
+        return payload("ETHUSDT")
+
+    cache = SymbolMetadataCache(loader=slow_exchange_info)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.price_precision("ETHUSDT"))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == [2, 2, 2]
+    assert cache.stats["refreshes"] == 1
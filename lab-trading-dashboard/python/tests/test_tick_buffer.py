@@ -0,0 +1,42 @@
+# tests/test_tick_buffer.py
+import threading
+import time
+
+from utils.tick_buffer import TickBuffer, extract_ticks
+
+
+def test_extract_ticks_keeps_only_price_updates():
+    items = [{"e": "markPriceUpdate", "s": "BTCUSDT", "p": "64000.1", "E": 1700000000000},
+             {"s": "ETHUSDT", "p": "3000"},
+             {"e": "markPriceUpdate", "s": "XRPUSDT"},
+             {"result": None, "id": 1}]
+    assert extract_ticks(items) == [("BTCUSDT", "64000.1", 1700000000000), ("ETHUSDT", "3000", 0)]
+
+
+def test_drain_returns_newest_tick_per_symbol():
+    buffer = TickBuffer()
+    buffer.put_many([("BTCUSDT", "1", 0), ("ETHUSDT", "2", 0)])
+    buffer.put_many([("BTCUSDT", "3", 0), ("XRPUSDT", "bad", 0)])
+    assert buffer.drain(timeout=0) == {"BTCUSDT": (3.0, 0), "ETHUSDT": (2.0, 0)}
+    assert buffer.stats["messages"] == 2 and buffer.stats["ticks"] == 4
+    assert buffer.stats["coalesced"] == 1 and buffer.stats["dispatched"] == 2
+    assert buffer.latest("BTCUSDT") == 3.0 and buffer.latest("XRPUSDT") is None
+    assert buffer.snapshot()["pending"] == 0
+
+
+def test_drain_times_out_empty_and_wakes_on_put():
+    buffer = TickBuffer()
+    assert buffer.drain(timeout=0.01) == {}
+    threading.Timer(0.05, buffer.put_many, args=([("BTCUSDT", "1", 0)],)).start()
+    assert buffer.drain(timeout=5) == {"BTCUSDT": (1.0, 0)}
+
+
+def test_lag_is_measured_from_the_oldest_event():
+    buffer = TickBuffer()
+    now_ms = int(time.time() * 1000)
+    buffer.put_many([("BTCUSDT", "1", now_ms - 500), ("ETHUSDT", "2", now_ms - 100)])
+    buffer.drain(timeout=0)
+    assert 500 <= buffer.stats["last_lag_ms"] < 5000
+    buffer.put_many([("BTCUSDT", "1", now_ms)])
+    buffer.drain(timeout=0)
+    assert buffer.stats["last_lag_ms"] < 500 <= buffer.stats["max_lag_ms"]
@@ -0,0 +1,81 @@
+# tests/test_trade_assign.py
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import utils.trade_assign as trade_assign
+from utils.trade_assign import ASSIGN_COLUMNS, olab_assign_trade_to_machine_atomic
+
+NUMERIC_COLUMNS = {"hedge", "investment", "stop_price", "min_profit", "swing1", "swing2", "swing3"}
+TIME_COLUMNS = {"candel_time", "fetcher_trade_time", "operator_trade_time", "operator_close_time"}
+
+
+def _column_sql():
+    types = []
+    for col in ASSIGN_COLUMNS:
+        if col in NUMERIC_COLUMNS:
+            types.append(f"{col} NUMERIC")
+        elif col in TIME_COLUMNS:
+            types.append(f"{col} TIMESTAMP")
+        else:
+            types.append(f"{col} TEXT")
+    return ", ".join(types)
+
+
+@pytest.fixture(params=["INTEGER", "BOOLEAN"])
+def assign_schema(request, olab_db, pg_engine, monkeypatch):
+    """machines.active is an integer (0/1) column; also run against a boolean one."""
+    monkeypatch.setattr(trade_assign, "_function_ready", False)
+    active, inactive = ("1", "0") if request.param == "INTEGER" else ("true", "false")
+    with pg_engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS m1, m2, machines, machinetradecount, alltraderecords"))
+        conn.execute(text(f"CREATE TABLE machines (machineid TEXT PRIMARY KEY, active {request.param})"))
+        conn.execute(text(f"INSERT INTO machines VALUES ('M1', {active}), ('M2', {inactive})"))
+        conn.execute(text("CREATE TABLE machinetradecount (machineid TEXT PRIMARY KEY, totaltradecounter BIGINT, declinecounter INTEGER)"))
+        conn.execute(text("INSERT INTO machinetradecount VALUES ('M1', 5, 0), ('M2', 0, 0)"))
+        for table in ("m1", "m2", "alltraderecords"):
+            conn.execute(text(f"CREATE TABLE {table} ({_column_sql()}, UNIQUE (unique_id))"))
+    return pg_engine
+
+
+def _candles():
+    index = pd.date_range("2026-01-01 00:00", periods=3, freq="15min", tz="UTC")
+    return pd.DataFrame({"close": [100.0, 101.0, 102.0]}, index=index)
+
+
+def _scalar(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).scalar()
+
+
+def test_assigns_to_least_loaded_active_machine(assign_schema):
+    uid, error = olab_assign_trade_to_machine_atomic(
+        _candles(), "BTCUSDT", "15m", 95.0, "BUY", "SIG", [101, 102, 103], 20, 100)
+
+    assert error is None
+    assert uid.startswith("BTCUSDTBUY")
+    # M2 has the lower counter but is inactive
+    assert _scalar(assign_schema, "SELECT machineid FROM m1 WHERE unique_id IS NOT NULL") == "M1"
+    assert _scalar(assign_schema, "SELECT COUNT(*) FROM m2") == 0
+    assert _scalar(assign_schema, "SELECT machineid FROM alltraderecords") == "M1"
+    assert _scalar(assign_schema, "SELECT totaltradecounter FROM machinetradecount WHERE machineid = 'M1'") == 6
+
+
+def test_duplicate_signal_is_not_inserted_twice(assign_schema):
+    args = (_candles(), "ETHUSDT", "15m", 95.0, "SELL", "SIG", None, 20, 100)
+    uid, error = olab_assign_trade_to_machine_atomic(*args)
+    assert error is None
+
+    again, error = olab_assign_trade_to_machine_atomic(*args)
+    assert (again, error) == (uid, "Already exists")
+    assert _scalar(assign_schema, "SELECT COUNT(*) FROM alltraderecords") == 1
+    assert _scalar(assign_schema, "SELECT totaltradecounter FROM machinetradecount WHERE machineid = 'M1'") == 6
+
+
+def test_no_active_machine(assign_schema):
+    with assign_schema.begin() as conn:
+        conn.execute(text("UPDATE machinetradecount SET declinecounter = 5 WHERE machineid = 'M1'"))
+    uid, error = olab_assign_trade_to_machine_atomic(
+        _candles(), "SOLUSDT", "15m", 95.0, "BUY", "SIG", None, 20, 100)
+    assert (uid, error) == (None, "No active machine available")
+    assert _scalar(assign_schema, "SELECT COUNT(*) FROM alltraderecords") == 0
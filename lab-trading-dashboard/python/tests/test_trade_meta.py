@@ -0,0 +1,78 @@
+# tests/test_trade_meta.py
+import threading
+import time
+
+from utils.trade_meta import AggregateCache, TradeMetaCache
+
+
+def test_meta_cache_hits_and_fetches_on_miss():
+    cache = TradeMetaCache()
+    cache.refresh({"u1": {"updated_at": "t1", "signalfrom": "ProGap", "other": 1}})
+    assert cache.get("u1", "signalfrom") == "ProGap"
+    assert cache.get("u2", "updated_at") is None
+    assert cache.get("u2", "updated_at", fetch=lambda uid: {"updated_at": "t2"}) == "t2"
+    assert cache.get("u2", "updated_at") == "t2"
+    cache.set("u1", updated_at="t3")
+    cache.invalidate("u2")
+    assert cache.get("u1", "updated_at") == "t3" and cache.get("u2", "updated_at") is None
+
+
+def test_aggregate_cache_refetches_after_ttl_and_invalidate():
+    cache = AggregateCache(ttl=0.05)
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert cache.get("k", fetch) == 1
+    assert cache.get("k", fetch) == 1
+    time.sleep(0.06)
+    assert cache.get("k", fetch) == 2
+    cache.invalidate("k")
+    assert cache.get("k", fetch) == 3
+    assert cache.stats == {"hits": 1, "fetches": 3}
+
+
+def test_slow_fetch_does_not_block_other_keys():
+    cache = AggregateCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    worker = threading.Thread(target=cache.get, args=("slow", slow))
+    worker.start()
+    assert started.wait(5)
+    done = []
+    other = threading.Thread(target=lambda: done.append(cache.get("fast", lambda: "fast")))
+    other.start()
+    other.join(1)
+    try:
+        assert done == ["fast"]
+    finally:
+        release.set()
+        worker.join(5)
+    assert cache.get("slow", lambda: "refetched") == "slow"
+
+
+def test_concurrent_misses_on_one_key_fetch_once():
+    cache = AggregateCache()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return 42
+
+    results = []
+
+    def reader():
+        barrier.wait()
+        results.append(cache.get("running", fetch))
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert results == [42] * 8 and len(calls) == 1
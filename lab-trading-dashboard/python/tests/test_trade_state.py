@@ -0,0 +1,137 @@
+# tests/test_trade_state.py
+import pickle
+
+from utils.trade_state import TradeStore, TrackedTrade
+
+
+def make_store():
+    store = TradeStore()
+    store.load("u1", {"unique_id": "u1", "pair": "BTCUSDT", "investment": 100})
+    store.load("u2", {"unique_id": "u2", "pair": "ETHUSDT", "investment": 50})
+    return store
+
+
+def test_load_is_clean_and_writes_are_dirty():
+    store = make_store()
+    assert store.drain_dirty() == {}
+
+    store["u1"]["investment"] = 100      # unchanged value
+    assert store.drain_dirty() == {}
+
+    store["u1"]["investment"] = 150
+    store["u1"].update({"stop_price": 1.5})
+    store["u2"].setdefault("hedge", 0)
+    assert store.drain_dirty() == {"u1": {"investment", "stop_price"}, "u2": {"hedge"}}
+    assert store.drain_dirty() == {}
+
+
+def test_whole_row_assignment_marks_every_field():
+    store = make_store()
+    store["u3"] = {"unique_id": "u3", "pair": "SOLUSDT"}
+    assert isinstance(store["u3"], TrackedTrade)
+    assert store.drain_dirty() == {"u3": {"unique_id", "pair"}}
+
+
+def test_row_removals_are_dirty():
+    store = make_store()
+    row = store["u1"]
+    assert row.pop("investment") == 100
+    assert row.pop("missing", None) is None
+    del store["u2"]["investment"]
+    assert store.drain_dirty() == {"u1": {"investment"}, "u2": {"investment"}}
+
+    row.popitem()
+    assert store.dirty_count() == 1
+    row.clear()
+    assert store.drain_dirty() == {"u1": {"unique_id", "pair"}}
+    assert store.uids_for_symbol("BTCUSDT") == ()
+
+
+def test_cached_state_is_rebuilt_after_every_mutation():
+    store = make_store()
+    row = store["u1"]
+    assert row.state() is row.state()
+    row["investment"] = 150
+    assert row.state().investment == 150.0
+    row.pop("investment")
+    assert row.state().investment == 0.0
+    row.state()
+    row.popitem()
+    row.state()
+    row.clear()
+    assert row.state().pair is None
+    stale = store["u2"]
+    stale.state()
+    store["u2"] = {"unique_id": "u2", "pair": "SOLUSDT"}
+    stale.pop("pair")
+    assert stale.state().pair is None
+
+
+def test_restore_dirty_requeues_failed_fields():
+    store = make_store()
+    store["u1"]["investment"] = 1
+    failed = store.drain_dirty()
+    store.restore_dirty(failed)
+    store.restore_dirty({"gone": {"x"}})
+    assert store.drain_dirty() == {"u1": {"investment"}}
+
+
+def test_symbol_index_follows_pair_changes():
+    store = make_store()
+    assert store.uids_for_symbol("BTCUSDT") == ("u1",)
+    store["u1"]["pair"] = "ETHUSDT"
+    assert store.uids_for_symbol("BTCUSDT") == ()
+    assert set(store.uids_for_symbol("ETHUSDT")) == {"u1", "u2"}
+    del store["u2"]
+    assert store.uids_for_symbol("ETHUSDT") == ("u1",)
+    assert sorted(store.symbols()) == ["ETHUSDT"]
+
+
+def test_dict_bulk_methods_wrap_and_index():
+    store = make_store()
+    store.update({"u3": {"pair": "SOLUSDT"}}, u4={"pair": "SOLUSDT"})
+    store |= {"u5": {"pair": "XRPUSDT"}}
+    assert store.setdefault("u6", {"pair": "ADAUSDT"})["pair"] == "ADAUSDT"
+    assert store.setdefault("u6", {"pair": "DOGEUSDT"})["pair"] == "ADAUSDT"
+    for uid in ("u3", "u4", "u5", "u6"):
+        assert isinstance(store[uid], TrackedTrade)
+    assert set(store.uids_for_symbol("SOLUSDT")) == {"u3", "u4"}
+    assert set(store.drain_dirty()) == {"u3", "u4", "u5", "u6"}
+
+    uid, row = store.popitem()
+    assert uid not in store.uids_for_symbol(row["pair"])
+    store["u1"]["investment"] = 1
+    store.clear()
+    assert store.symbols() == [] and store.drain_dirty() == {}
+
+
+def test_stale_row_does_not_reindex_or_dirty():
+    store = make_store()
+    stale = store.pop("u1")
+    stale["pair"] = "DOGEUSDT"
+    assert store.uids_for_symbol("DOGEUSDT") == ()
+    assert store.drain_dirty() == {}
+
+    store.load("u2", {"unique_id": "u2", "pair": "ETHUSDT"})
+    replaced = store["u2"]
+    store["u2"] = {"unique_id": "u2", "pair": "BNBUSDT"}
+    store.drain_dirty()
+    replaced["pair"] = "ETHUSDT"
+    assert store.uids_for_symbol("ETHUSDT") == ()
+    assert store.uids_for_symbol("BNBUSDT") == ("u2",)
+    assert store.drain_dirty() == {}
+
+
+def test_rows_copy_and_pickle_as_plain_dicts():
+    store = make_store()
+    assert type(pickle.loads(pickle.dumps(store["u1"]))) is dict
+    assert {**store["u1"]} == {"unique_id": "u1", "pair": "BTCUSDT", "investment": 100}
+
+
+def test_state_flags_parse_db_strings():
+    store = TradeStore()
+    store.load("u1", {"hedge_1_1_bool": "0", "profit_journey": "false", "commision_journey": "True"})
+    store.load("u2", {"hedge_1_1_bool": 1, "profit_journey": True})
+    first, second = store["u1"].state(), store["u2"].state()
+    assert (first.hedge_1_1_bool, first.profit_journey, first.commision_journey) == (False, False, True)
+    assert (second.hedge_1_1_bool, second.profit_journey, second.commision_journey) == (True, True, False)
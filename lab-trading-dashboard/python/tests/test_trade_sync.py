@@ -0,0 +1,102 @@
+# tests/test_trade_sync.py
+from sqlalchemy import text
+
+from utils.trade_sync import ALL_TRADE_SYNC_COLUMNS, CHANGE_LOG_TABLE, TradeSync, sync_stats
+
+
+def _reset_schema(engine):
+    columns = ", ".join(f"{col} TEXT" for col in ALL_TRADE_SYNC_COLUMNS)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS m1, m2, machines, alltraderecords, {CHANGE_LOG_TABLE}"))
+        conn.execute(text("CREATE TABLE machines (machineid TEXT, active INTEGER)"))
+        conn.execute(text("INSERT INTO machines VALUES ('M1', 1), ('M2', 0)"))
+        for table in ("m1", "m2", "alltraderecords"):
+            conn.execute(text(f"CREATE TABLE {table} (unique_id TEXT PRIMARY KEY, {columns})"))
+
+
+def _rows(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).fetchall()
+
+
+def test_trade_sync_copies_only_changed_rows(olab_db, pg_engine):
+    _reset_schema(pg_engine)
+    sync = TradeSync(machine_id="M1")
+    assert sync.sync_once() == 0
+    assert sync.ready
+
+    with pg_engine.begin() as conn:
+        for uid in ("a", "b"):
+            conn.execute(text("INSERT INTO alltraderecords (unique_id, type) VALUES (:u, 'running')"), {"u": uid})
+            conn.execute(text("INSERT INTO m1 (unique_id, type, investment) VALUES (:u, 'running', '10')"), {"u": uid})
+        conn.execute(text("UPDATE m1 SET investment = '20' WHERE unique_id = 'a'"))
+        conn.execute(text("UPDATE m1 SET investment = '10' WHERE unique_id = 'b'"))  # no-op, not logged
+
+    assert _rows(pg_engine, f"SELECT COUNT(*) FROM {CHANGE_LOG_TABLE}")[0][0] == 3
+    assert sync.sync_once() == 2
+    assert sync_stats["backlog"] == 0 and sync_stats["last_batch_size"] == 3
+    assert _rows(pg_engine, "SELECT unique_id, investment FROM alltraderecords ORDER BY 1") == [("a", "20"), ("b", "10")]
+
+    # Inactive machine tables get no trigger
+    with pg_engine.begin() as conn:
+        conn.execute(text("INSERT INTO m2 (unique_id, type) VALUES ('c', 'running')"))
+    assert _rows(pg_engine, f"SELECT COUNT(*) FROM {CHANGE_LOG_TABLE}")[0][0] == 0
+
+
+def test_trade_sync_drains_backlog_in_batches(olab_db, pg_engine):
+    _reset_schema(pg_engine)
+    sync = TradeSync(batch_size=2, machine_id="M1")
+    sync.sync_once()
+    with pg_engine.begin() as conn:
+        for i in range(5):
+            conn.execute(text("INSERT INTO alltraderecords (unique_id) VALUES (:u)"), {"u": f"t{i}"})
+            conn.execute(text("INSERT INTO m1 (unique_id, type) VALUES (:u, 'running')"), {"u": f"t{i}"})
+
+    assert sync.sync_once() == 5
+    assert _rows(pg_engine, "SELECT COUNT(*) FROM alltraderecords WHERE type = 'running'")[0][0] == 5
+    assert _rows(pg_engine, f"SELECT COUNT(*) FROM {CHANGE_LOG_TABLE}")[0][0] == 0
+
+
+def _triggers(engine):
+    return _rows(engine, "SELECT tgname, oid FROM pg_trigger WHERE tgname LIKE 'trg_%_change_%' ORDER BY 1")
+
+
+def test_trade_sync_picks_up_machines_activated_later(olab_db, pg_engine, capsys):
+    _reset_schema(pg_engine)
+    sync = TradeSync(machine_id="M1", trigger_check_sec=0)
+    sync.sync_once()
+    installed = _triggers(pg_engine)
+    assert [name for name, _ in installed] == ["trg_m1_change_insert", "trg_m1_change_update"]
+
+    # Re-checks leave existing triggers alone
+    sync.sync_once()
+    assert _triggers(pg_engine) == installed
+
+    with pg_engine.begin() as conn:
+        conn.execute(text("UPDATE machines SET active = 1 WHERE machineid = 'M2'"))
+        conn.execute(text("INSERT INTO machines VALUES ('M3', 1)"))
+    sync.sync_once()
+    names = [name for name, _ in _triggers(pg_engine)]
+    assert names == ["trg_m1_change_insert", "trg_m1_change_update", "trg_m2_change_insert", "trg_m2_change_update"]
+    assert sync.missing_tables == {"m3"}
+    sync.sync_once()
+    assert capsys.readouterr().out.count("not captured: m3") == 1
+
+    with pg_engine.begin() as conn:
+        conn.execute(text("INSERT INTO alltraderecords (unique_id) VALUES ('c')"))
+        conn.execute(text("INSERT INTO m2 (unique_id, type) VALUES ('c', 'running')"))
+    assert sync.sync_once() == 1
+    assert _rows(pg_engine, "SELECT type FROM alltraderecords WHERE unique_id = 'c'") == [("running",)]
+
+
+def test_trigger_checks_are_throttled(olab_db, pg_engine, monkeypatch):
+    _reset_schema(pg_engine)
+    sync = TradeSync(machine_id="M1")
+    sync.sync_once()
+    checks = []
+    monkeypatch.setattr(sync, "check_triggers", lambda: checks.append(1) or True)
+    sync.sync_once()
+    assert checks == []
+    sync._next_trigger_check = 0.0
+    sync.sync_once()
+    assert checks == [1]
@@ -0,0 +1,52 @@
+# tests/test_weight_limiter.py
+import os
+import types
+
+import pytest
+
+from utils.weight_limiter import SharedWeightLimiter, capture_headers, klines_weight, endpoint_weight
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return SharedWeightLimiter(path=str(tmp_path / "weight.bin"), max_weight=100, headroom=1.0,
+                               max_requests_per_sec=1000)
+
+
+def test_endpoint_weights():
+    assert [klines_weight(n) for n in (50, 200, 500, 1000, 1500)] == [1, 2, 5, 5, 10]
+    assert endpoint_weight("mark_price") == 10 and endpoint_weight("mark_price", symbol="BTCUSDT") == 1
+
+
+def test_budget_is_shared_between_instances_and_reconciled_upwards(limiter, tmp_path):
+    other = SharedWeightLimiter(path=limiter.path, max_weight=100, headroom=1.0, max_requests_per_sec=1000)
+    assert limiter.try_acquire(60) == 0
+    assert other.try_acquire(60) > 0          # would exceed the minute's budget
+    other.reconcile(80)
+    assert limiter.used_weight() == 80
+    other.reconcile(10)                        # headers never lower the local count
+    assert limiter.used_weight() == 80
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork only")
+def test_forked_child_reopens_state_and_charges_the_same_budget(limiter):
+    limiter.try_acquire(5)
+    parent_map = limiter._map
+    pid = os.fork()
+    if pid == 0:
+        ok = limiter.try_acquire(7) == 0 and limiter._map is not parent_map and limiter._pid == os.getpid()
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert limiter.used_weight() == 12
+    assert limiter._map is parent_map
+
+
+def test_capture_headers_reconciles_every_response(limiter):
+    response = types.SimpleNamespace(headers={"X-MBX-USED-WEIGHT-1M": "42"})
+    session = types.SimpleNamespace(request=lambda *a, **k: response)
+    client = capture_headers(types.SimpleNamespace(session=session), limiter=limiter)
+
+    assert client.session.request("GET", "/fapi/v1/klines") is response
+    assert client._last_response is response
+    assert limiter.used_weight() == 42
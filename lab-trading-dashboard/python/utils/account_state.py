@@ -0,0 +1,258 @@
+# utils/account_state.py
+"""
+Account-state cache fed by the USDT-M futures user-data stream.
+
+ACCOUNT_UPDATE events keep positions and wallet balances current and
+ORDER_TRADE_UPDATE events keep open orders current. The listen key is renewed
+every 30 minutes and a full REST snapshot is reconciled periodically. Reads are
+dict lookups and fall back to REST (via the callers) whenever the stream is not live.
+
+ACCOUNT_UPDATE only arrives when a position or balance changes, so markPrice,
+unRealizedProfit and notional are recomputed from the streamed mark price on
+every read. Fields the stream never carries (leverage, liquidationPrice) come
+from the REST snapshot; a position the snapshot has not seen yet makes the read
+return None so the caller uses REST, and triggers an early reconcile.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from utils.endpoints import FUTURES_WS_URL
+
+USER_STREAM_URL = f"{FUTURES_WS_URL}/ws/"
+LISTEN_KEY_RENEW_SEC = 30 * 60
+RECONCILE_INTERVAL_SEC = 300       # full REST snapshot of positions and balances
+BALANCE_MAX_AGE_SEC = 30           # availableBalance is not streamed; refresh after fills
+RECONNECT_DELAY_SEC = 5
+LISTEN_KEY_RETRY_SEC = 60          # retry a failed renewal well before the 60-minute expiry
+RECONCILE_CHECK_SEC = 5            # how often the reconcile loop looks for an early-reconcile request
+
+_TERMINAL_ORDER_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+
+class AccountStateCache:
+    """
+    fetch_positions() -> client.get_position_risk() payload
+    fetch_balances()  -> client.balance() payload
+    new_listen_key() / renew_listen_key(key) -> listen key helpers
+    mark_price(symbol) -> fresh streamed mark price, or None (e.g. mark_prices.latest)
+    """
+
+    def __init__(self, fetch_positions, fetch_balances, new_listen_key, renew_listen_key, mark_price=None):
+        self._fetch_positions = fetch_positions
+        self._fetch_balances = fetch_balances
+        self._new_listen_key = new_listen_key
+        self._renew_listen_key = renew_listen_key
+        self._mark_price = mark_price or (lambda symbol: None)
+        self._positions = {}          # symbol -> {positionSide: REST-shaped position dict}
+        self._leverage = {}           # symbol -> leverage (REST snapshot, ACCOUNT_CONFIG_UPDATE)
+        self._reconcile_requested = False
+        self._balances = {}           # asset -> REST-shaped balance dict
+        self._orders = {}             # orderId -> last ORDER_TRADE_UPDATE 'o' payload
+        self._balance_dirty = False
+        self._balance_at = 0.0
+        self._lock = threading.Lock()
+        self._connected = False
+        self._last_event = 0.0
+        self._last_reconcile = 0.0
+        self._thread = None
+        self.stats = {"events": 0, "account_updates": 0, "order_updates": 0, "reconciles": 0,
+                      "reconnects": 0, "balance_refreshes": 0, "renew_errors": 0, "rest_fallbacks": 0}
+
+    # ---------- snapshots ----------
+
+    def reconcile(self):
+        """Replace cached positions and balances with a REST snapshot."""
+        positions = self._fetch_positions()
+        balances = self._fetch_balances()
+        by_symbol, leverage = {}, {}
+        for entry in positions or []:
+            by_symbol.setdefault(entry["symbol"], {})[entry.get("positionSide", "BOTH")] = dict(entry)
+            if entry.get("leverage") is not None:
+                leverage[entry["symbol"]] = entry["leverage"]
+        with self._lock:
+            self._positions = by_symbol
+            self._leverage.update(leverage)
+            self._reconcile_requested = False
+            self._balances = {b["asset"]: dict(b) for b in balances or []}
+            self._balance_dirty = False
+            self._balance_at = time.time()
+            self._last_reconcile = time.time()
+        self.stats["reconciles"] += 1
+
+    def _refresh_balances(self):
+        balances = self._fetch_balances()
+        with self._lock:
+            self._balances = {b["asset"]: dict(b) for b in balances or []}
+            self._balance_dirty = False
+            self._balance_at = time.time()
+        self.stats["balance_refreshes"] += 1
+
+    # ---------- event handling ----------
+
+    def handle_event(self, event):
+        self.stats["events"] += 1
+        self._last_event = time.time()
+        kind = event.get("e")
+        if kind == "ACCOUNT_UPDATE":
+            self._apply_account_update(event.get("a", {}), event.get("T") or event.get("E"))
+        elif kind == "ACCOUNT_CONFIG_UPDATE":
+            config = event.get("ac") or {}
+            if config.get("s") and config.get("l") is not None:
+                with self._lock:
+                    self._leverage[config["s"]] = str(config["l"])
+                    for position in self._positions.get(config["s"], {}).values():
+                        position["leverage"] = str(config["l"])
+        elif kind == "ORDER_TRADE_UPDATE":
+            self._apply_order_update(event.get("o", {}))
+        elif kind == "listenKeyExpired":
+            raise ConnectionResetError("listenKeyExpired")
+
+    def _apply_account_update(self, update, event_ms=None):
+        self.stats["account_updates"] += 1
+        with self._lock:
+            for b in update.get("B", []):
+                balance = self._balances.setdefault(b["a"], {"asset": b["a"]})
+                balance["balance"] = b.get("wb", balance.get("balance"))
+                balance["crossWalletBalance"] = b.get("cw", balance.get("crossWalletBalance"))
+            for p in update.get("P", []):
+                side = p.get("ps", "BOTH")
+                position = self._positions.setdefault(p["s"], {}).setdefault(side, {"symbol": p["s"], "positionSide": side})
+                position["positionAmt"] = p.get("pa", position.get("positionAmt", "0"))
+                position["entryPrice"] = p.get("ep", position.get("entryPrice", "0"))
+                position["breakEvenPrice"] = p.get("bep", position.get("breakEvenPrice", "0"))
+                position["unRealizedProfit"] = p.get("up", position.get("unRealizedProfit", "0"))
+                position["marginType"] = p.get("mt", position.get("marginType"))
+                position["isolatedWallet"] = p.get("iw", position.get("isolatedWallet"))
+                if event_ms:
+                    position["updateTime"] = int(event_ms)
+                if position.get("leverage") is None and p["s"] in self._leverage:
+                    position["leverage"] = self._leverage[p["s"]]
+            # availableBalance depends on margin in use; re-read it lazily
+            self._balance_dirty = True
+
+    def _apply_order_update(self, order):
+        self.stats["order_updates"] += 1
+        order_id = order.get("i")
+        with self._lock:
+            if order.get("X") in _TERMINAL_ORDER_STATUSES:
+                self._orders.pop(order_id, None)
+            else:
+                self._orders[order_id] = dict(order)
+            if order.get("x") == "TRADE":
+                self._balance_dirty = True
+
+    # ---------- reads ----------
+
+    def is_live(self):
+        """True while the stream is connected and a snapshot has been loaded."""
+        return self._connected and self._last_reconcile > 0
+
+    def open_positions(self, symbol=None):
+        """
+        Positions with positionAmt != 0, shaped like get_position_risk() entries,
+        or None when the cache cannot answer (no fresh mark price, or a position
+        the REST snapshot has not filled in yet) and the caller should use REST.
+        """
+        with self._lock:
+            if symbol is not None:
+                sides = self._positions.get(symbol, {}).values()
+            else:
+                sides = [p for by_side in self._positions.values() for p in by_side.values()]
+            positions = [dict(p) for p in sides if float(p.get("positionAmt") or 0) != 0.0]
+
+        for position in positions:
+            mark = self._mark_price(position["symbol"])
+            if mark is None:
+                self.stats["rest_fallbacks"] += 1
+                return None
+            if position.get("leverage") is None or position.get("liquidationPrice") is None:
+                self._reconcile_requested = True
+                self.stats["rest_fallbacks"] += 1
+                return None
+            amount = float(position["positionAmt"])
+            position["markPrice"] = str(mark)
+            position["unRealizedProfit"] = str((mark - float(position.get("entryPrice") or 0)) * amount)
+            position["notional"] = str(mark * amount)
+        return positions
+
+    def open_orders(self, symbol=None):
+        with self._lock:
+            return [dict(o) for o in self._orders.values() if symbol is None or o.get("s") == symbol]
+
+    def available_balance(self, asset="USDT"):
+        if self._balance_dirty or time.time() - self._balance_at > BALANCE_MAX_AGE_SEC:
+            self._refresh_balances()
+        with self._lock:
+            balance = self._balances.get(asset)
+            return float(balance.get("availableBalance", 0.0)) if balance else 0.0
+
+    # ---------- stream ----------
+
+    async def _keepalive(self, listen_key):
+        delay = LISTEN_KEY_RENEW_SEC
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.to_thread(self._renew_listen_key, listen_key)
+                delay = LISTEN_KEY_RENEW_SEC
+            except Exception as e:
+                self.stats["renew_errors"] += 1
+                print(f"⚠️ Listen key renewal failed, retrying in {LISTEN_KEY_RETRY_SEC}s: {e}")
+                delay = LISTEN_KEY_RETRY_SEC
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(RECONCILE_CHECK_SEC)
+            if not self._reconcile_requested and time.time() - self._last_reconcile < RECONCILE_INTERVAL_SEC:
+                continue
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                print(f"⚠️ Account state reconcile failed: {e}")
+
+    async def _stream_once(self):
+        response = await asyncio.to_thread(self._new_listen_key)
+        listen_key = response.get("listenKey") if isinstance(response, dict) else None
+        if not listen_key:
+            raise ConnectionError(f"No listen key: {response}")
+        keepalive = asyncio.create_task(self._keepalive(listen_key))
+        try:
+            async with websockets.connect(USER_STREAM_URL + listen_key, ping_interval=20) as ws:
+                # Snapshot after subscribing so no event between the two is missed
+                await asyncio.to_thread(self.reconcile)
+                self._connected = True
+                self._last_event = time.time()
+                async for message in ws:
+                    self.handle_event(json.loads(message))
+        finally:
+            self._connected = False
+            keepalive.cancel()
+
+    async def run(self):
+        reconciler = asyncio.create_task(self._reconcile_loop())
+        try:
+            while True:
+                try:
+                    await self._stream_once()
+                except Exception as e:
+                    print(f"⚠️ User data stream disconnected: {e}")
+                self.stats["reconnects"] += 1
+                await asyncio.sleep(RECONNECT_DELAY_SEC)
+        finally:
+            reconciler.cancel()
+
+    def start_in_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def target():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.run())
+        self._thread = threading.Thread(target=target, daemon=True, name="AccountStateStream")
+        self._thread.start()
+        return self._thread
@@ -0,0 +1,191 @@
+# utils/api_key_pool.py
+"""
+Weight-balanced scheduler over the configured API keys.
+
+One persistent UMFutures client per key (never rebuilt on errors). Binance counts
+X-MBX-USED-WEIGHT-1M per IP, not per key, so the header only updates the pool-wide
+IP weight (and the shared limiter); each key carries its own share, the weight of
+the requests sent through it this minute. A 429/418 puts the key in cool-down for
+Retry-After seconds. Each request goes to the healthy key with the smallest share,
+and is retried once on another key if throttled.
+"""
+import time
+import threading
+
+from utils.weight_limiter import binance_weight_limiter, klines_weight, endpoint_weight
+from utils.retry_policy import retry_after_seconds
+from utils.endpoints import FUTURES_REST_URL
+
+KEY_WEIGHT_BUDGET = 2040           # per-key request share per minute before the key is skipped
+DEFAULT_COOLDOWN_SEC = 60          # 429 without Retry-After
+BAN_COOLDOWN_SEC = 300             # 418 without Retry-After
+THROTTLE_STATUSES = (418, 429)
+
+
+class _KeySlot:
+    __slots__ = ("index", "client", "weight_share", "window_minute", "cooldown_until",
+                 "in_flight", "last_headers", "requests", "throttled")
+
+    def __init__(self, index, client):
+        self.index = index
+        self.client = client
+        self.weight_share = 0           # weight sent through this key in window_minute
+        self.window_minute = 0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.last_headers = None
+        self.requests = 0
+        self.throttled = 0
+
+    def load(self, now):
+        if self.window_minute != int(now // 60):
+            return self.in_flight
+        return self.weight_share + self.in_flight
+
+
+def _capture_headers(slot):
+    """Record response headers per key (the same hook as setup_header_capture, but per slot)."""
+    session = getattr(slot.client, "session", None)
+    if session is None:
+        return
+    original_request = session.request
+
+    def request_with_headers(*args, **kwargs):
+        response = original_request(*args, **kwargs)
+        slot.last_headers = response.headers
+        return response
+    session.request = request_with_headers
+
+
+class NoHealthyKeyError(Exception):
+    pass
+
+
+class ApiKeyPool:
+    def __init__(self, api_keys, client_factory=None, limiter=binance_weight_limiter,
+                 key_weight_budget=KEY_WEIGHT_BUDGET):
+        if client_factory is None:
+            from binance.um_futures import UMFutures
+            client_factory = lambda key, secret: UMFutures(key=key, secret=secret, base_url=FUTURES_REST_URL)
+        self.limiter = limiter
+        self.key_weight_budget = key_weight_budget
+        self._lock = threading.Lock()
+        self._ip_used_weight = 0        # X-MBX-USED-WEIGHT-1M, shared by every key on this IP
+        self._ip_minute = 0
+        self._slots = []
+        for i, creds in enumerate(api_keys):
+            slot = _KeySlot(i, client_factory(creds["api_key"], creds["api_secret"]))
+            _capture_headers(slot)
+            self._slots.append(slot)
+
+    def _pick(self, weight, exclude=()):
+        now = time.time()
+        with self._lock:
+            healthy = [s for s in self._slots
+                       if s.index not in exclude and s.cooldown_until <= now
+                       and s.load(now) + weight <= self.key_weight_budget]
+            if not healthy:
+                return None
+            slot = min(healthy, key=lambda s: s.load(now))
+            slot.in_flight += weight
+            return slot
+
+    def _record(self, slot, weight, headers):
+        now = time.time()
+        with self._lock:
+            slot.in_flight -= weight
+            slot.requests += 1
+            minute = int(now // 60)
+            if slot.window_minute != minute:
+                slot.window_minute, slot.weight_share = minute, 0
+            slot.weight_share += weight
+            if self._ip_minute != minute:
+                self._ip_minute, self._ip_used_weight = minute, 0
+            used = headers.get("X-MBX-USED-WEIGHT-1M") if headers else None
+            self._ip_used_weight = int(used) if used else self._ip_used_weight + weight
+
+    def _cool_down(self, slot, status, error):
+        seconds = retry_after_seconds(error)
+        if seconds is None:
+            seconds = BAN_COOLDOWN_SEC if status == 418 else DEFAULT_COOLDOWN_SEC
+        with self._lock:
+            slot.cooldown_until = max(slot.cooldown_until, time.time() + seconds)
+            slot.throttled += 1
+        print(f"⏸️ API key {slot.index} throttled (HTTP {status}), cooling down {seconds}s")
+
+    def next_ready_in(self):
+        """Seconds until some key leaves cool-down (0 if one is usable now)."""
+        now = time.time()
+        with self._lock:
+            return max(0.0, min((s.cooldown_until for s in self._slots), default=0.0) - now)
+
+    def call(self, method, *args, weight=1, **kwargs):
+        """
+        Dispatch client.<method>(*args, **kwargs) to the least-loaded healthy key.
+        Raises NoHealthyKeyError if every key is cooling down or over budget.
+        """
+        tried = set()
+        last_error = None
+        for _ in range(len(self._slots)):
+            slot = self._pick(weight, tried)
+            if slot is None:
+                break
+            tried.add(slot.index)
+            self.limiter.acquire(weight)
+            slot.last_headers = None
+            try:
+                result = getattr(slot.client, method)(*args, **kwargs)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                headers = getattr(e, "header", None) or slot.last_headers
+                self._record(slot, weight, headers)
+                self.limiter.reconcile_headers(headers)
+                if status in THROTTLE_STATUSES:
+                    self._cool_down(slot, status, e)
+                    last_error = e
+                    continue
+                raise
+            self._record(slot, weight, slot.last_headers)
+            self.limiter.reconcile_headers(slot.last_headers)
+            return result
+        raise NoHealthyKeyError(f"No healthy API key for {method}") from last_error
+
+    # ---------- market-data shortcuts ----------
+
+    def klines(self, symbol, interval, limit=500):
+        return self.call("klines", symbol=symbol, interval=interval, limit=limit, weight=klines_weight(limit))
+
+    def ticker_price(self, symbol=None):
+        kwargs = {"symbol": symbol} if symbol else {}
+        return self.call("ticker_price", weight=endpoint_weight("ticker_price", symbol), **kwargs)
+
+    def exchange_info(self):
+        return self.call("exchange_info", weight=endpoint_weight("exchange_info"))
+
+    def ip_used_weight(self):
+        """Last X-MBX-USED-WEIGHT-1M seen this minute (all keys and processes on this IP)."""
+        with self._lock:
+            return self._ip_used_weight if self._ip_minute == int(time.time() // 60) else 0
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            return [{
+                "index": s.index, "weight_share": s.load(now), "requests": s.requests,
+                "throttled": s.throttled, "cooldown_sec": max(0.0, s.cooldown_until - now),
+            } for s in self._slots]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """Process-wide pool over Final_olab_database.API_KEYS, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from utils.Final_olab_database import API_KEYS
+                _pool = ApiKeyPool(API_KEYS)
+    return _pool
@@ -0,0 +1,168 @@
+# utils/bulk_update.py
+
+import os
+import time
+from sqlalchemy import text
+
+from utils.Final_olab_database import (
+    sql_helper,
+    olab_log_db_error,
+    olab_convert_boolean_to_int,
+    olab_clean_timestamp_values,
+)
+
+# ✅ Columns written back from all_pairs (same set as olab_update_table_from_all_pairs)
+ALL_PAIRS_UPDATE_COLUMNS = (
+    "operator_trade_time", "investment", "interval", "stop_price", "save_price",
+    "min_comm", "hedge", "action", "buy_qty", "buy_price", "buy_pl", "sell_qty",
+    "sell_price", "sell_pl", "commission", "pl_after_comm", "commision_journey",
+    "profit_journey", "min_profit", "hedge_order_size", "hedge_1_1_bool", "added_qty",
+    "min_comm_after_hedge", "type", "signalfrom", "operator_close_time", "min_close",
+    "close_price", "hedge_swing_high_point", "hedge_swing_low_point", "hedge_buy_pl",
+    "hedge_sell_pl", "temp_high_point", "temp_low_point", "updated_at",
+)
+
+# Key columns used to match staging rows against the machine table
+KEY_COLUMNS = ("unique_id", "pair")
+
+STAGING_TABLE = "_all_pairs_staging"
+VALUES_CHUNK_SIZE = 500  # rows per multi-row INSERT into the staging table
+
+# Per-UID outcomes returned by olab_bulk_update_table_from_all_pairs
+UPDATED = "updated"
+NOT_FOUND = "not_found"
+SKIPPED = "skipped"      # row exists but is closed or the pair does not match
+ERROR = "error"
+
+
+def _prepare_rows(all_pairs):
+    """Snapshot all_pairs into cleaned parameter dicts keyed by unique_id."""
+    rows = {}
+    for uid, item in list(all_pairs.items()):
+        if not item or not item.get("unique_id"):
+            continue
+        converted = olab_clean_timestamp_values(olab_convert_boolean_to_int(item))
+        rows[converted["unique_id"]] = {
+            col: converted.get(col) for col in KEY_COLUMNS + ALL_PAIRS_UPDATE_COLUMNS
+        }
+    return rows
+
+
+def _insert_staging_rows(conn, rows, columns):
+    """Load rows into the staging table with multi-row VALUES statements."""
+    column_sql = ", ".join(columns)
+    for start in range(0, len(rows), VALUES_CHUNK_SIZE):
+        chunk = rows[start:start + VALUES_CHUNK_SIZE]
+        params = {}
+        values_sql = []
+        for i, row in enumerate(chunk):
+            placeholders = []
+            for j, col in enumerate(columns):
+                key = f"p{i}_{j}"
+                params[key] = row.get(col)
+                placeholders.append(f":{key}")
+            values_sql.append(f"({', '.join(placeholders)})")
+        conn.execute(
+            text(f"INSERT INTO {STAGING_TABLE} ({column_sql}) VALUES {', '.join(values_sql)}"),
+            params,
+        )
+
+
+def _group_by_columns(rows, dirty_columns):
+    """Group UIDs sharing the same set of dirty columns: {frozenset(cols): [uid, ...]}."""
+    if dirty_columns is None:
+        return {frozenset(ALL_PAIRS_UPDATE_COLUMNS): list(rows)}
+    groups = {}
+    for uid in rows:
+        cols = frozenset(dirty_columns.get(uid, ())) & frozenset(ALL_PAIRS_UPDATE_COLUMNS)
+        if cols:
+            groups.setdefault(cols, []).append(uid)
+    return groups
+
+
+def olab_bulk_update_table_from_all_pairs(all_pairs, machine_id, dirty_columns=None):
+    """
+    Set-based replacement for olab_update_table_from_all_pairs.
+    Stages rows in a temp table and applies UPDATE ... FROM per machine table,
+    all inside a single transaction. Returns {unique_id: outcome}.
+
+    dirty_columns: optional {uid: iterable of fields}; when given, only those UIDs
+    are written and each UPDATE sets only the columns that changed.
+    """
+    outcomes = {}
+    rows = {}
+    try:
+        if not all_pairs:
+            return outcomes
+
+        if dirty_columns is not None:
+            all_pairs = {uid: all_pairs.get(uid) for uid in dirty_columns}
+
+        rows = _prepare_rows(all_pairs)
+        if dirty_columns is not None:
+            dirty_columns = {uid: cols for uid, cols in dirty_columns.items() if uid in rows}
+        groups = _group_by_columns(rows, dirty_columns)
+        if not groups:
+            return outcomes
+
+        grouped_uids = [uid for uids in groups.values() for uid in uids]
+        table = machine_id.lower()
+        columns = KEY_COLUMNS + ALL_PAIRS_UPDATE_COLUMNS
+        start_time = time.time()
+
+        with sql_helper.connection_lock:
+            with sql_helper._get_connection_with_retry() as conn:
+                with conn.begin():
+                    conn.execute(text(
+                        f"CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+                        f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+                    ))
+                    _insert_staging_rows(conn, [rows[uid] for uid in grouped_uids], columns)
+
+                    updated_uids = set()
+                    for cols, uids in groups.items():
+                        set_sql = ", ".join(f"{col} = s.{col}" for col in ALL_PAIRS_UPDATE_COLUMNS if col in cols)
+                        uid_filter, params = "", {}
+                        if dirty_columns is not None:
+                            uid_filter, params = "AND s.unique_id = ANY(:uids)", {"uids": uids}
+                        updated = conn.execute(text(f"""
+                            UPDATE {table} AS m SET {set_sql}
+                            FROM {STAGING_TABLE} AS s
+                            WHERE m.unique_id = s.unique_id AND m.pair = s.pair
+                                  AND m.type NOT IN ('close', 'hedge_close') {uid_filter}
+                            RETURNING m.unique_id
+                        """), params).fetchall()
+                        updated_uids.update(r[0] for r in updated)
+
+                    missing = conn.execute(text(f"""
+                        SELECT s.unique_id FROM {STAGING_TABLE} AS s
+                        WHERE NOT EXISTS (SELECT 1 FROM {table} AS m WHERE m.unique_id = s.unique_id)
+                    """)).fetchall()
+
+        missing_uids = {r[0] for r in missing}
+        for uid in grouped_uids:
+            if uid in updated_uids:
+                outcomes[uid] = UPDATED
+            elif uid in missing_uids:
+                outcomes[uid] = NOT_FOUND
+            else:
+                outcomes[uid] = SKIPPED
+
+        not_updated = [uid for uid, outcome in outcomes.items() if outcome != UPDATED]
+        if not_updated:
+            os.makedirs("log_event", exist_ok=True)
+            with open("log_event/updatedb-error.txt", "a", encoding="utf-8") as f:
+                for uid in not_updated:
+                    f.write(f"No update occurred for UID: {uid} ({outcomes[uid]})\n")
+
+        elapsed = time.time() - start_time
+        if elapsed > 10:
+            olab_log_db_error(Exception(f"Bulk update slow: {elapsed:.2f}s for {len(grouped_uids)} rows"),
+                              "olab_bulk_update_table_from_all_pairs", machine_id)
+
+    except Exception as e:
+        olab_log_db_error(e, "olab_bulk_update_table_from_all_pairs", machine_id)
+        print(f"❌ olab_bulk_update_table_from_all_pairs Error for {machine_id}: {e}")
+        outcomes = {uid: ERROR for uid in rows}
+
+    return outcomes
@@ -0,0 +1,8 @@
+# utils/endpoints.py
+
+import os
+
+# ✅ Binance USDT-M futures endpoints. Override both to run against utils/mock_exchange.py,
+# e.g. BINANCE_FUTURES_REST_URL=http://127.0.0.1:8900 BINANCE_FUTURES_WS_URL=ws://127.0.0.1:8900
+FUTURES_REST_URL = os.environ.get("BINANCE_FUTURES_REST_URL", "https://fapi.binance.com").rstrip("/")
+FUTURES_WS_URL = os.environ.get("BINANCE_FUTURES_WS_URL", "wss://fstream.binance.com").rstrip("/")
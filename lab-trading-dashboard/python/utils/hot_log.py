@@ -0,0 +1,160 @@
+# utils/hot_log.py
+"""
+Level-gated info/debug logging for per-tick and per-UID code paths.
+
+Hot paths guard on a plain attribute so a disabled log costs one lookup and
+builds no string:
+
+    if hot_log.info_on:
+        log_info(f"... {details} ...", uid=uid)
+
+or pass lazy %-style arguments, formatted only when the line is emitted:
+
+    hot_log.info("[WS_UPDATE] UID: %s price: %s", uid, price, uid=uid)
+
+Enabled lines can be sampled (every Nth) and rate-limited per UID, and are
+written through the log write-behind queue (utils/log_queue.py).
+
+Environment: OLAB_LOG_LEVEL (DEBUG/INFO/WARNING, default WARNING, i.e. info
+off as before), OLAB_LOG_SAMPLE (default 1), OLAB_LOG_UID_LIMIT (lines per UID
+per second, 0 = unlimited).
+"""
+import os
+import re
+import threading
+import time
+
+# ✅ Levels (same numbers as the logging module)
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+LOG_DIR = "logs_error"
+# ✅ Rate-limit window per UID, and how often expired windows are dropped
+UID_WINDOW_SEC = 1.0
+UID_PRUNE_SEC = 60.0
+
+
+def _queue_sink(path, content):
+    from utils.log_queue import log_queue, FILE_TARGET
+    log_queue.enqueue(FILE_TARGET, {"path": path, "content": content})
+
+
+class HotLogger:
+    def __init__(self, level=None, sample_every=None, uid_limit=None, sink=None):
+        self.sample_every = max(1, int(sample_every if sample_every is not None else os.environ.get("OLAB_LOG_SAMPLE", 1)))
+        self.uid_limit = int(uid_limit if uid_limit is not None else os.environ.get("OLAB_LOG_UID_LIMIT", 0))
+        self._sink = sink or _queue_sink
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._uid_windows = {}      # uid -> [window_start, count]
+        self._next_prune = time.monotonic() + UID_PRUNE_SEC
+        self.stats = {"emitted": 0, "sampled_out": 0, "rate_limited": 0}
+        self.setLevel(level if level is not None else os.environ.get("OLAB_LOG_LEVEL", "WARNING"))
+
+    def setLevel(self, level):
+        if isinstance(level, str):
+            level = LEVELS.get(level.upper(), WARNING)
+        self.level = level
+        # The guards hot paths check
+        self.debug_on = level <= DEBUG
+        self.info_on = level <= INFO
+
+    def isEnabledFor(self, level):
+        return level >= self.level
+
+    def debug(self, msg, *args, uid=None, filename="info", **fields):
+        if self.debug_on:
+            self._emit("DEBUG", msg, args, uid, filename, fields)
+
+    def info(self, msg, *args, uid=None, filename="info", **fields):
+        if self.info_on:
+            self._emit("INFO", msg, args, uid, filename, fields)
+
+    def _admit(self, uid):
+        with self._lock:
+            self._seen += 1
+            if self.sample_every > 1 and self._seen % self.sample_every:
+                self.stats["sampled_out"] += 1
+                return False
+            if self.uid_limit and uid is not None:
+                now = time.monotonic()
+                if now >= self._next_prune:
+                    self._prune(now)
+                window = self._uid_windows.get(uid)
+                if window is None or now - window[0] >= UID_WINDOW_SEC:
+                    self._uid_windows[uid] = [now, 1]
+                elif window[1] >= self.uid_limit:
+                    self.stats["rate_limited"] += 1
+                    return False
+                else:
+                    window[1] += 1
+            self.stats["emitted"] += 1
+            return True
+
+    def _prune(self, now):
+        # Closed trades never log again; drop their expired windows so the map
+        # only holds UIDs that logged within the last window.
+        self._uid_windows = {uid: window for uid, window in self._uid_windows.items()
+                             if now - window[0] < UID_WINDOW_SEC}
+        self._next_prune = now + UID_PRUNE_SEC
+
+    def _emit(self, level_name, msg, args, uid, filename, fields):
+        if not self._admit(uid):
+            return
+        try:
+            text = msg % args if args else str(msg)
+        except (TypeError, ValueError):
+            text = f"{msg} {args}"
+        if fields:
+            text += " | " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if uid is not None:
+            filename = "info_" + re.sub(r'[:\\/*?"<>|]', '_', str(uid))
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        self._sink(os.path.join(LOG_DIR, f"{filename}.log"), f"[{timestamp}] {level_name} {text}\n")
+
+
+hot_log = HotLogger()
+
+
+def benchmark(ticks=200_000):
+    """
+    Per-tick cost of one ws_handler-style log line: the old unguarded call
+    (f-string + timestamp formatting, nothing written) vs. the guarded call
+    disabled, vs. lazy hot_log.info disabled and enabled with a no-op sink.
+    Run: python -m utils.hot_log
+    """
+    import timeit
+    from datetime import datetime, timezone
+
+    uid, price = "BTCUSDT_1700000000_abcd", 64123.5
+    details = {"pair": "BTCUSDT", "type": "running", "action": "BUY", "investment": 1000.0,
+               "buy_price": 63000.0, "stop_price": 62000.0, "interval": "15m", "hedge": False}
+    off = HotLogger(level=WARNING, sink=lambda path, content: None)
+    on = HotLogger(level=INFO, sink=lambda path, content: None)
+
+    def old_log_info(message, filename="info", uid=None):
+        # What log_info -> log_to_file did per call before: build, sanitize, format time
+        message = f"ℹ️ {message}"
+        filename = "info_" + re.sub(r'[:\\/*?"<>|]', '_', str(uid))
+        os.path.join(LOG_DIR, f"{filename}.log")
+        datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+    cases = {
+        "unguarded f-string (before)": lambda: old_log_info(
+            f"step7: [PRICE_CHECK] UID: {uid}, current_price: {price} | all_pairs[uid]: {details} | trade_type: running", uid=uid),
+        "guarded, disabled": lambda: off.info_on and old_log_info(
+            f"step7: [PRICE_CHECK] UID: {uid}, current_price: {price} | all_pairs[uid]: {details} | trade_type: running", uid=uid),
+        "lazy info(), disabled": lambda: off.info(
+            "step7: [PRICE_CHECK] UID: %s, current_price: %s | all_pairs[uid]: %s", uid, price, details, uid=uid),
+        "lazy info(), enabled": lambda: on.info(
+            "step7: [PRICE_CHECK] UID: %s, current_price: %s | all_pairs[uid]: %s", uid, price, details, uid=uid),
+    }
+    results = {}
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=ticks, repeat=3))
+        results[name] = seconds / ticks * 1e9
+        print(f"{name:32s} {results[name]:9.1f} ns/call")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
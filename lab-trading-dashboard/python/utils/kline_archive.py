@@ -0,0 +1,193 @@
+# utils/kline_archive.py
+"""
+Local columnar kline archive for research and backtests.
+
+One fixed-width binary file per (symbol, interval) holding KLINE_DTYPE records
+sorted by open time (ms). Files are appended incrementally from the kline_*
+tables and read back through numpy.memmap, so range reads are a binary search
+plus a zero-copy slice instead of a SELECT * against production PostgreSQL.
+
+Usage: python -m utils.kline_archive sync [interval ...] [--symbol BTCUSDT]
+"""
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+from utils.FinalVersionTradingDB_PostgreSQL import sql_helper, log_db_error
+
+ARCHIVE_DIR = os.environ.get("KLINE_ARCHIVE_DIR", "kline_archive")
+SYNC_BATCH_ROWS = 50000  # rows per DB round trip during sync
+
+KLINE_DTYPE = np.dtype([
+    ('time', '<i8'),            # open time, ms since epoch (UTC)
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('quote_volume', '<f8'),
+    ('num_trades', '<i8'),
+    ('taker_base_vol', '<f8'),
+    ('taker_quote_vol', '<f8'),
+])
+
+# DB column -> archive field (same mapping as fetch_history_db)
+_DB_COLUMNS = {
+    'time': 'time', 'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close',
+    'volume': 'volume', 'quotevolume': 'quote_volume', 'numtrades': 'num_trades',
+    'takerbuybasevolume': 'taker_base_vol', 'takerbuyquotevolume': 'taker_quote_vol',
+}
+
+_KLINE_TABLE_RE = re.compile(r"^kline_([a-z0-9]+)_(\d+[mhdw])$")
+_EPOCH = pd.Timestamp(0, tz='UTC')
+
+
+def archive_path(symbol, interval, root=None):
+    return os.path.join(root or ARCHIVE_DIR, f"{symbol.upper()}_{interval}.bin")
+
+
+def _to_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return int((ts - _EPOCH) // pd.Timedelta(milliseconds=1))
+
+
+def _record_count(path):
+    # A torn trailing record (crash mid-append) is ignored and overwritten on the next append
+    try:
+        return os.path.getsize(path) // KLINE_DTYPE.itemsize
+    except FileNotFoundError:
+        return 0
+
+
+def load_klines(symbol, interval, start=None, end=None, root=None):
+    """
+    Zero-copy read: returns a read-only memmap slice of KLINE_DTYPE records with
+    start <= time < end (datetimes, pandas Timestamps or ms). Empty array if absent.
+    """
+    path = archive_path(symbol, interval, root)
+    count = _record_count(path)
+    if count == 0:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    data = np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(count,))
+    times = data['time']
+    lo = 0 if start is None else int(np.searchsorted(times, _to_ms(start), side='left'))
+    hi = count if end is None else int(np.searchsorted(times, _to_ms(end), side='left'))
+    return data[lo:hi]
+
+
+def load_klines_df(symbol, interval, start=None, end=None, root=None):
+    """Same range as load_klines, as a DataFrame in fetch_history_db_range format (copies)."""
+    records = load_klines(symbol, interval, start, end, root)
+    df = pd.DataFrame({name: records[name] for name in KLINE_DTYPE.names})
+    df['time'] = pd.to_datetime(df['time'], unit='ms', utc=True)
+    return df
+
+
+def last_archived_time(symbol, interval, root=None):
+    """Open time (ms) of the newest archived bar, or None."""
+    records = load_klines(symbol, interval, root=root)
+    return int(records['time'][-1]) if len(records) else None
+
+
+def append_klines(symbol, interval, df, root=None):
+    """
+    Append bars newer than the archive tail. df may use DB column names or the
+    fetch_data_safe names. Returns the number of records written.
+    """
+    if df is None or df.empty:
+        return 0
+    df = df.rename(columns=_DB_COLUMNS)
+    times = (pd.to_datetime(df['time'], utc=True) - _EPOCH) // pd.Timedelta(milliseconds=1)
+
+    records = np.empty(len(df), dtype=KLINE_DTYPE)
+    records['time'] = times.to_numpy(dtype='int64')
+    for name in KLINE_DTYPE.names[1:]:
+        records[name] = pd.to_numeric(df[name], errors='coerce').fillna(0).to_numpy(dtype=KLINE_DTYPE[name])
+
+    records = np.sort(records, order='time')
+    _, first = np.unique(records['time'], return_index=True)
+    records = records[first]
+
+    path = archive_path(symbol, interval, root)
+    last = last_archived_time(symbol, interval, root)
+    if last is not None:
+        records = records[records['time'] > last]
+    if len(records) == 0:
+        return 0
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as f:
+        f.truncate(_record_count(path) * KLINE_DTYPE.itemsize)
+        f.write(records.tobytes())
+    return len(records)
+
+
+def sync_symbol(symbol, interval, batch_rows=SYNC_BATCH_ROWS, root=None):
+    """Copy bars newer than the archive tail from kline_{symbol}_{interval}. Returns rows added."""
+    table_name = f"kline_{symbol.lower()}_{interval}"
+    columns = ", ".join(_DB_COLUMNS)
+    added = 0
+    try:
+        while True:
+            last = last_archived_time(symbol, interval, root)
+            since = pd.Timestamp(-1 if last is None else last, unit='ms', tz='UTC').tz_convert(None)
+            df = sql_helper.fetch_dataframe(
+                f"SELECT {columns} FROM {table_name} WHERE time > :since ORDER BY time ASC LIMIT {int(batch_rows)}",
+                params={"since": since},
+            )
+            written = append_klines(symbol, interval, df, root)
+            added += written
+            if df is None or len(df) < batch_rows or written == 0:
+                break
+    except Exception as e:
+        log_db_error(e, "❌  sync_symbol Error for", symbol)
+        print(f"❌ kline archive sync Error for {symbol}-{interval}: {e}")
+    return added
+
+
+def list_kline_tables(intervals=None):
+    """[(symbol, interval)] for every kline_* table, optionally filtered by interval."""
+    rows = sql_helper.fetch_dataframe(
+        "SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'kline\\_%'"
+    )
+    pairs = []
+    for name in rows['table_name'] if not rows.empty else []:
+        match = _KLINE_TABLE_RE.match(name)
+        if match and (not intervals or match.group(2) in intervals):
+            pairs.append((match.group(1).upper(), match.group(2)))
+    return sorted(pairs)
+
+
+def sync_all(intervals=None, symbols=None, root=None):
+    """Incrementally sync every matching kline table. Returns {(symbol, interval): rows added}."""
+    wanted = {s.upper() for s in symbols} if symbols else None
+    results = {}
+    for symbol, interval in list_kline_tables(intervals):
+        if wanted and symbol not in wanted:
+            continue
+        results[(symbol, interval)] = sync_symbol(symbol, interval, root=root)
+    return results
+
+
+def main(argv):
+    if not argv or argv[0] != "sync":
+        print(__doc__)
+        return 1
+    args = argv[1:]
+    symbols = [args[i + 1] for i, a in enumerate(args) if a == "--symbol" and i + 1 < len(args)]
+    intervals = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or args[i - 1] != "--symbol")]
+    results = sync_all(intervals or None, symbols or None)
+    total = sum(results.values())
+    print(f"✅ kline archive synced {len(results)} tables, {total} new bars -> {ARCHIVE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,280 @@
+# utils/kline_resampler.py
+
+import time
+import threading
+import pandas as pd
+
+from utils.Final_olab_database import INTERVAL_MS
+
+# ✅ Higher timeframes derived locally from a cached base interval
+RESAMPLE_BASE = {
+    '3m': '1m',
+    '5m': '1m',
+    '30m': '15m',
+    '1h': '15m',
+    '2h': '15m',
+    '4h': '15m',
+}
+
+# ✅ Bars per derived timeframe the scanner asks for (fetch_data_resampled(..., 500, ...))
+RESAMPLED_LIMIT = 500
+
+# Max base bars kept per symbol: RESAMPLED_LIMIT bars of the widest derived
+# timeframe plus one bucket of alignment slack (2505 x 1m for 5m, 8016 x 15m for 4h)
+BASE_RETENTION = {
+    base: max((RESAMPLED_LIMIT + 1) * (INTERVAL_MS[target] // INTERVAL_MS[base])
+              for target, b in RESAMPLE_BASE.items() if b == base)
+    for base in sorted(set(RESAMPLE_BASE.values()))
+}
+
+# ✅ Binance klines limit cap (-1130 above it); larger base windows are never fetched at once
+MAX_KLINES_PER_REQUEST = 1500
+
+KLINE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume', 'quote_volume', 'num_trades', 'taker_base_vol', 'taker_quote_vol']
+
+_EPOCH = pd.Timestamp(0, tz='UTC')
+
+# Resampled column -> (source column, aggregation)
+_AGGREGATIONS = {
+    'open': ('open', 'first'),
+    'high': ('high', 'max'),
+    'low': ('low', 'min'),
+    'close': ('close', 'last'),
+    'volume': ('volume', 'sum'),
+    'quote_volume': ('quote_volume', 'sum'),
+    'num_trades': ('num_trades', 'sum'),
+    'taker_base_vol': ('taker_base_vol', 'sum'),
+    'taker_quote_vol': ('taker_quote_vol', 'sum'),
+    '_first_ms': ('_ms', 'min'),
+    '_last_ms': ('_ms', 'max'),
+}
+
+
+def _to_ms(times):
+    return (times - _EPOCH) // pd.Timedelta(milliseconds=1)
+
+
+def _latest_closed_open_ms(interval_ms, now_ms=None):
+    """Open time of the most recently closed bar (same rule as olab_is_data_up_to_date)."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return now_ms - (now_ms % interval_ms) - interval_ms
+
+
+def resample_klines(base_df, base_interval, target_interval):
+    """
+    Aggregate closed base bars into epoch-aligned target bars (Binance boundaries).
+    Buckets not fully covered by base bars (leading or trailing) are dropped.
+    """
+    if base_df is None or base_df.empty:
+        return pd.DataFrame(columns=KLINE_COLUMNS)
+
+    base_ms = INTERVAL_MS[base_interval]
+    target_ms = INTERVAL_MS[target_interval]
+
+    df = base_df.copy()
+    df['_ms'] = _to_ms(df['time'])
+    buckets = df['_ms'] - (df['_ms'] % target_ms)
+    out = df.groupby(buckets, sort=True).agg(**_AGGREGATIONS)
+
+    starts = out.index.to_series()
+    complete = (out['_first_ms'] == starts) & (out['_last_ms'] == starts + target_ms - base_ms)
+    out = out[complete]
+
+    out.insert(0, 'time', pd.to_datetime(out.index, unit='ms', utc=True))
+    return out[KLINE_COLUMNS].reset_index(drop=True)
+
+
+class KlineResampler:
+    """
+    In-memory base-bar cache per (symbol, base interval) with incrementally
+    maintained higher-timeframe frames. When new base bars arrive, only the
+    target buckets from the first changed bar onwards are recomputed.
+    """
+
+    def __init__(self, resample_base=None, base_retention=None):
+        self.resample_base = dict(RESAMPLE_BASE if resample_base is None else resample_base)
+        self.base_retention = dict(BASE_RETENTION if base_retention is None else base_retention)
+        self._base = {}      # (symbol, base) -> DataFrame of closed base bars
+        self._frames = {}    # (symbol, target) -> DataFrame of resampled bars
+        self._dirty = {}     # (symbol, target) -> earliest changed base ms since last build
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "ingested_bars": 0}
+
+    def base_for(self, interval):
+        return self.resample_base.get(interval)
+
+    def is_base(self, interval):
+        return interval in self.base_retention
+
+    def ratio(self, interval):
+        base = self.base_for(interval)
+        return INTERVAL_MS[interval] // INTERVAL_MS[base] if base else 1
+
+    def ingest(self, symbol, base_interval, df):
+        """Merge closed base bars (fetch_data_safe format) into the cache."""
+        if df is None or df.empty or not self.is_base(base_interval) or 'time' not in df.columns:
+            return
+        new = df[[c for c in KLINE_COLUMNS if c in df.columns]].copy()
+        new['time'] = pd.to_datetime(new['time'], utc=True)
+        for col in KLINE_COLUMNS[1:]:
+            if col in new.columns:
+                new[col] = pd.to_numeric(new[col], errors='coerce')
+
+        key = (symbol, base_interval)
+        with self._lock:
+            current = self._base.get(key)
+            if current is not None and not current.empty:
+                last_time = current['time'].iloc[-1]
+                # Nothing newer and nothing outside the cached range -> no-op
+                if new['time'].max() <= last_time and new['time'].min() >= current['time'].iloc[0]:
+                    return
+                merged = pd.concat([current, new], ignore_index=True)
+            else:
+                merged = new
+            merged = (merged.drop_duplicates(subset='time', keep='last')
+                            .sort_values('time')
+                            .tail(self.base_retention[base_interval])
+                            .reset_index(drop=True))
+            self._base[key] = merged
+            self.stats["ingested_bars"] += len(new)
+
+            changed_ms = int(_to_ms(new['time']).min())
+            for target, base in self.resample_base.items():
+                if base != base_interval:
+                    continue
+                tkey = (symbol, target)
+                previous = self._dirty.get(tkey)
+                self._dirty[tkey] = changed_ms if previous is None else min(previous, changed_ms)
+
+    def _build(self, symbol, target):
+        """Bring the target frame up to date, recomputing from the first dirty bucket."""
+        tkey = (symbol, target)
+        changed_ms = self._dirty.pop(tkey, None)
+        frame = self._frames.get(tkey)
+        if changed_ms is None and frame is not None:
+            return frame
+
+        base = self.base_for(target)
+        base_df = self._base.get((symbol, base))
+        if base_df is None or base_df.empty:
+            return None
+
+        target_ms = INTERVAL_MS[target]
+        if frame is not None and not frame.empty and changed_ms is not None:
+            from_ms = changed_ms - (changed_ms % target_ms)
+            keep = frame[_to_ms(frame['time']) < from_ms]
+            if not keep.empty:
+                tail = resample_klines(base_df[_to_ms(base_df['time']) >= from_ms], base, target)
+                frame = pd.concat([keep, tail], ignore_index=True)
+            else:
+                frame = resample_klines(base_df, base, target)
+        else:
+            frame = resample_klines(base_df, base, target)
+
+        # Drop target bars whose base bars have aged out of the cache
+        frame = frame[frame['time'] >= base_df['time'].iloc[0]].reset_index(drop=True)
+        self._frames[tkey] = frame
+        return frame
+
+    def oldest_ms(self, symbol, base_interval):
+        """Open time (ms) of the oldest cached base bar, or None."""
+        with self._lock:
+            current = self._base.get((symbol, base_interval))
+            if current is None or current.empty:
+                return None
+            return int(_to_ms(current['time']).iloc[0])
+
+    def base_bars_needed(self, symbol, interval, limit):
+        """
+        Closed base bars to fetch so that `limit` bars of interval can be served.
+        If the cached history is already deep enough, only the gap after the
+        newest cached bar is needed; otherwise the whole window, worst-case
+        bucket alignment included.
+        """
+        base = self.base_for(interval)
+        ratio = self.ratio(interval)
+        full = limit * ratio + ratio - 1
+        base_ms = INTERVAL_MS[base]
+        with self._lock:
+            current = self._base.get((symbol, base))
+            if current is None or current.empty:
+                return full
+            cached = len(current)
+            last_ms = int(_to_ms(current['time']).iloc[-1])
+        gap = max(0, (_latest_closed_open_ms(base_ms) - last_ms) // base_ms)
+        if min(cached + gap, self.base_retention[base]) >= full:
+            return max(gap, 1)
+        return full
+
+    def get(self, symbol, interval, limit):
+        """
+        Return the last `limit` resampled bars if the cache covers them and the
+        newest bar is the most recently closed one; otherwise None.
+        """
+        if self.base_for(interval) is None:
+            return None
+        with self._lock:
+            frame = self._build(symbol, interval)
+            if (frame is None or len(frame) < limit
+                    or int(_to_ms(frame['time']).iloc[-1]) < _latest_closed_open_ms(INTERVAL_MS[interval])):
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return frame.tail(limit).reset_index(drop=True).copy()
+
+
+kline_resampler = KlineResampler()
+
+# (symbol, interval) -> epoch seconds until which resampling is not retried
+# (base history too short, e.g. a newly listed pair or an API-only fetch)
+_fallback_until = {}
+
+
+def _seed_from_history(symbol, base, need, history):
+    """Load the base bars older than the cache, up to `need` closed bars back, from history."""
+    base_ms = INTERVAL_MS[base]
+    start_ms = _latest_closed_open_ms(base_ms) - (need - 1) * base_ms
+    end_ms = kline_resampler.oldest_ms(symbol, base)
+    if end_ms is None or end_ms <= start_ms:
+        return
+    kline_resampler.ingest(symbol, base, history(symbol, base, pd.Timestamp(start_ms, unit='ms', tz='UTC'),
+                                                 pd.Timestamp(end_ms, unit='ms', tz='UTC')))
+
+
+def fetch_data_resampled(symbol, interval, limit, fetcher, history=None):
+    """
+    Drop-in wrapper around fetch_data_safe(symbol, interval, limit).
+    Derived timeframes are served from memory when possible. On a miss the
+    newest base bars are fetched (only the missing ones when the cache is
+    already deep) and resampled. Windows deeper than one klines request are
+    completed from history(symbol, base, start, end), e.g. fetch_history_db_range
+    over the kline tables, which costs no Binance weight. Anything not covered
+    falls back to fetcher(symbol, interval, limit) unchanged; the base cache
+    still fills up over time from the base-interval reads.
+    """
+    try:
+        if kline_resampler.is_base(interval):
+            df = fetcher(symbol, interval, limit)
+            kline_resampler.ingest(symbol, interval, df)
+            return df
+
+        base = kline_resampler.base_for(interval)
+        if base is not None and _fallback_until.get((symbol, interval), 0) <= time.time():
+            df = kline_resampler.get(symbol, interval, limit)
+            if df is not None:
+                return df
+            need = kline_resampler.base_bars_needed(symbol, interval, limit)
+            # fetch_data_safe drops the still-open candle, so ask for one more than needed
+            recent = min(need, MAX_KLINES_PER_REQUEST - 1)
+            if recent == need or history is not None:
+                kline_resampler.ingest(symbol, base, fetcher(symbol, base, recent + 1))
+                if need > recent:
+                    _seed_from_history(symbol, base, need, history)
+                df = kline_resampler.get(symbol, interval, limit)
+                if df is not None:
+                    return df
+            _fallback_until[(symbol, interval)] = time.time() + INTERVAL_MS[interval] / 1000
+    except Exception as e:
+        print(f"⚠️ fetch_data_resampled fallback for {symbol}-{interval}: {e}")
+
+    return fetcher(symbol, interval, limit)
@@ -0,0 +1,187 @@
+# utils/log_queue.py
+
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from sqlalchemy import text
+
+from utils.Final_olab_database import sql_helper, olab_log_db_error
+
+# ✅ Write-behind settings
+MAX_QUEUE_SIZE = 20000     # rows held in memory before new rows are dropped
+FLUSH_INTERVAL_MS = 500    # how often the flusher wakes up
+MAX_BATCH_ROWS = 500       # rows per multi-row INSERT
+
+# Target tables and their column order
+TABLE_COLUMNS = {
+    "bot_event_log": (
+        "uid", "source", "pl_after_comm", "plain_message", "json_message", "timestamp", "machine_id",
+    ),
+    "enhancederrorlogs": (
+        "error_level", "error_category", "symbol", "source_function", "error_message",
+        "line_number", "stack_trace", "machine_id", "timestamp", "json_context",
+    ),
+}
+
+FILE_TARGET = "__file__"
+
+
+class LogWriteBehind:
+    """
+    Bounded write-behind queue for event/error logging.
+    Producers take a short lock to append to a deque and never wait on I/O; when the
+    queue is full the new row is dropped and counted. A background flusher batches
+    rows into one multi-row INSERT per table and one open() per file.
+    The same lock guards stats, so the counters are exact across threads.
+    """
+
+    def __init__(self, max_size=MAX_QUEUE_SIZE, flush_interval_ms=FLUSH_INTERVAL_MS, max_batch_rows=MAX_BATCH_ROWS):
+        self.max_size = max_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_depth": 0,
+        }
+
+    # ---------- producer side ----------
+
+    def enqueue(self, target, row, prepare=None):
+        """
+        Queue a row for target (a table in TABLE_COLUMNS or FILE_TARGET).
+        prepare, if given, runs on the flusher thread to finish building the row
+        (e.g. JSON serialisation) so the caller does not pay for it.
+        Returns False when the row was dropped because the queue is full.
+        """
+        self._ensure_started()
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                self.stats["dropped"] += 1
+                return False
+            self._queue.append((target, row, prepare))
+            depth = len(self._queue)
+            self.stats["enqueued"] += 1
+            if depth > self.stats["max_depth"]:
+                self.stats["max_depth"] = depth
+        if depth >= self.max_batch_rows:
+            self._wakeup.set()
+        return True
+
+    def depth(self):
+        return len(self._queue)
+
+    def snapshot(self):
+        """Consistent copy of stats plus the current depth."""
+        with self._lock:
+            out = dict(self.stats)
+            out["depth"] = len(self._queue)
+        return out
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    # ---------- flusher side ----------
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="LogWriteBehind")
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def _drain(self):
+        with self._lock:
+            items, self._queue = self._queue, deque()
+        batches = {}
+        for target, row, prepare in items:
+            if prepare is not None:
+                try:
+                    row = prepare(row)
+                except Exception as e:
+                    self._count("failed")
+                    print(f"❌ LogWriteBehind prepare failed: {e}")
+                    continue
+            batches.setdefault(target, []).append(row)
+        return batches
+
+    def flush(self):
+        """Write everything queued so far. Safe to call from any thread."""
+        start_time = time.time()
+        batches = self._drain()
+        if not batches:
+            return
+        for target, rows in batches.items():
+            if target == FILE_TARGET:
+                self._write_files(rows)
+            else:
+                for i in range(0, len(rows), self.max_batch_rows):
+                    self._insert_rows(target, rows[i:i + self.max_batch_rows])
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = (time.time() - start_time) * 1000
+
+    def _insert_rows(self, table, rows):
+        columns = TABLE_COLUMNS[table]
+        params = {}
+        values_sql = []
+        for i, row in enumerate(rows):
+            placeholders = []
+            for j, col in enumerate(columns):
+                key = f"p{i}_{j}"
+                params[key] = row.get(col)
+                placeholders.append(f":{key}")
+            values_sql.append(f"({', '.join(placeholders)})")
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join(values_sql)}"
+        if sql_helper.execute_safe(query, params, autocommit=True, retries=2, delay=0.5, tag=f"log_queue_{table}"):
+            self._count("written", len(rows))
+        else:
+            self._count("failed", len(rows))
+            olab_log_db_error(Exception(f"Dropped {len(rows)} queued rows for {table}"), "LogWriteBehind._insert_rows", table)
+
+    def _write_files(self, rows):
+        by_path = {}
+        for row in rows:
+            by_path.setdefault(row["path"], []).append(row["content"])
+        for path, contents in by_path.items():
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(contents))
+                self._count("written", len(contents))
+            except Exception as e:
+                self._count("failed", len(contents))
+                print(f"❌ LogWriteBehind file write failed for {path}: {e}")
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+log_queue = LogWriteBehind()
+atexit.register(log_queue.stop)
@@ -0,0 +1,198 @@
+# utils/market_data_client.py
+"""
+Asyncio market-data client for Binance USDT-M futures public endpoints.
+
+One pooled keep-alive session per client (no per-error client rebuilds), bounded
+concurrency, gzip, per-request timeouts, and weight accounting through the
+process-shared binance_weight_limiter (charged before each call, reconciled from
+X-MBX-USED-WEIGHT-1M after it). Uses aiohttp when installed, otherwise a pooled
+requests.Session driven from worker threads.
+"""
+import asyncio
+import pandas as pd
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+    import requests
+    from requests.adapters import HTTPAdapter
+
+from utils.weight_limiter import binance_weight_limiter, klines_weight, endpoint_weight
+from utils.retry_policy import retry_after_seconds
+from utils.endpoints import FUTURES_REST_URL
+
+BASE_URL = FUTURES_REST_URL
+MAX_CONCURRENCY = 16
+REQUEST_TIMEOUT_SEC = 10
+KEEPALIVE_SEC = 30
+
+KLINE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume', 'quote_volume', 'num_trades', 'taker_base_vol', 'taker_quote_vol']
+
+
+class BinanceHTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = self.status_code = status
+        self.headers = dict(headers or {})
+        # Seconds or HTTP-date, parsed the same way as the retry policy does
+        self.retry_after = retry_after_seconds(self)
+
+
+def closed_klines(klines):
+    """Raw REST rows minus the still-open last bar (insert_klines format)."""
+    return [k[:11] for k in klines[:-1]] if len(klines) > 1 else []
+
+
+def klines_to_df(klines):
+    """Closed bars only, in fetch_data_safe format (same processing as olab_fetch_data_safe)."""
+    closed = closed_klines(klines)
+    if not closed:
+        return None
+    df = pd.DataFrame(closed, columns=[
+        'time', 'open', 'high', 'low', 'close', 'volume',
+        'close_time', 'quote_volume', 'num_trades', 'taker_base_vol', 'taker_quote_vol'
+    ])
+    for col in ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'taker_base_vol', 'taker_quote_vol']:
+        df[col] = pd.to_numeric(df[col])
+    df['num_trades'] = df['num_trades'].astype(int)
+    df['time'] = pd.to_datetime(df['time'], unit='ms', utc=True)
+    return df[KLINE_COLUMNS]
+
+
+class AsyncMarketDataClient:
+    """
+    Usage:
+        async with AsyncMarketDataClient() as md:
+            frames = await md.fetch_many_klines(symbols, '15m', 500)
+    """
+
+    def __init__(self, base_url=BASE_URL, max_concurrency=MAX_CONCURRENCY,
+                 timeout=REQUEST_TIMEOUT_SEC, limiter=binance_weight_limiter):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = limiter
+        self._semaphore = None
+        self._session = None
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self._session is not None:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        headers = {"Accept-Encoding": "gzip"}
+        if aiohttp is not None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=KEEPALIVE_SEC, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        else:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+            session.mount("https://", adapter)
+            session.headers.update(headers)
+            self._session = session
+
+    async def close(self):
+        if self._session is None:
+            return
+        if aiohttp is not None:
+            await self._session.close()
+        else:
+            self._session.close()
+        self._session = None
+
+    def _raise_for_status(self, status, headers, body):
+        if status < 400:
+            return
+        if status in (418, 429):
+            self.stats["throttled"] += 1
+        raise BinanceHTTPError(status, body, headers)
+
+    def _get_blocking(self, url, params):
+        resp = self._session.get(url, params=params, timeout=self.timeout)
+        self.limiter.reconcile_headers(resp.headers)
+        self._raise_for_status(resp.status_code, resp.headers, resp.text)
+        return resp.json()
+
+    async def get(self, path, params=None, weight=1):
+        """GET a public endpoint once the shared weight budget allows it."""
+        if self._session is None:
+            await self.open()
+        await self.limiter.acquire_async(weight)
+        url = f"{self.base_url}{path}"
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            try:
+                if aiohttp is None:
+                    return await asyncio.to_thread(self._get_blocking, url, params)
+                async with self._session.get(url, params=params) as resp:
+                    self.limiter.reconcile_headers(resp.headers)
+                    if resp.status >= 400:
+                        self._raise_for_status(resp.status, resp.headers, await resp.text())
+                    return await resp.json(content_type=None)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    # ---------- endpoints ----------
+
+    async def klines(self, symbol, interval, limit=500):
+        return await self.get("/fapi/v1/klines",
+                              {"symbol": symbol, "interval": interval, "limit": limit},
+                              weight=klines_weight(limit))
+
+    async def klines_df(self, symbol, interval, limit=500):
+        return klines_to_df(await self.klines(symbol, interval, limit))
+
+    async def mark_price(self, symbol=None):
+        params = {"symbol": symbol} if symbol else None
+        return await self.get("/fapi/v1/premiumIndex", params, weight=endpoint_weight("mark_price", symbol))
+
+    async def exchange_info(self):
+        return await self.get("/fapi/v1/exchangeInfo", weight=endpoint_weight("exchange_info"))
+
+    async def fetch_many_klines(self, symbols, interval, limit=500, on_result=None, store=None):
+        """
+        Fetch klines for many symbols concurrently. Returns {symbol: DataFrame or None}.
+        on_result(symbol, df), if given, runs as each symbol completes. store(symbol,
+        interval, closed_rows), e.g. insert_klines, writes the raw closed bars off the loop.
+        """
+        async def one(symbol):
+            try:
+                klines = await self.klines(symbol, interval, limit)
+                df = klines_to_df(klines)
+            except Exception as e:
+                print(f"❌ async klines failed for {symbol}-{interval}: {e}")
+                df = None
+            if store is not None and df is not None:
+                try:
+                    await asyncio.to_thread(store, symbol, interval, closed_klines(klines))
+                except Exception as e:
+                    print(f"❌ store failed for {symbol}-{interval}: {e}")
+            if on_result is not None and df is not None:
+                try:
+                    on_result(symbol, df)
+                except Exception as e:
+                    print(f"❌ on_result failed for {symbol}-{interval}: {e}")
+            return symbol, df
+
+        results = await asyncio.gather(*(one(s) for s in symbols))
+        return dict(results)
+
+
+def refresh_klines(symbols, interval, limit=500, on_result=None, store=None, max_concurrency=MAX_CONCURRENCY):
+    """Synchronous entry point for scripts and worker threads without a running loop."""
+    async def run():
+        async with AsyncMarketDataClient(max_concurrency=max_concurrency) as md:
+            return await md.fetch_many_klines(symbols, interval, limit, on_result, store)
+    return asyncio.run(run())
@@ -0,0 +1,543 @@
+# utils/mock_exchange.py
+"""
+Local mock of the Binance USDT-M futures API for load and latency testing.
+
+Serves the REST endpoints the bot uses (klines, ticker price, premium index,
+exchange info, orders incl. batch and algo orders, position risk, balance,
+income, listen key) and the websocket streams (!markPrice@arr, <symbol>@markPrice,
+<symbol>@kline_<interval>, the user-data stream, SUBSCRIBE/UNSUBSCRIBE) on one port.
+
+- Latency: every REST response is delayed by uniform(latency_ms).
+- Weight: X-MBX-USED-WEIGHT-1M is returned per request; going over weight_limit
+  returns 429 with Retry-After, like Binance.
+- Fault injection: throttle_rate randomly answers 429, inject(status, count)
+  scripts the next N responses (429 / 418 / 5xx).
+- Prices: price_paths scripts each symbol's mark price tick by tick (held at the
+  last value when exhausted); other symbols follow a seeded random walk.
+
+Point the bot at it with BINANCE_FUTURES_REST_URL / BINANCE_FUTURES_WS_URL (utils/endpoints.py).
+Run: python -m utils.mock_exchange --port 8900 --symbols BTCUSDT,ETHUSDT --latency-ms 5,20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+
+from aiohttp import web, WSMsgType
+
+from utils.weight_limiter import MAX_WEIGHT_1M, endpoint_weight
+
+# ✅ Defaults
+DEFAULT_PORT = 8900
+DEFAULT_SYMBOLS = {"BTCUSDT": 60000.0, "ETHUSDT": 3000.0, "XRPUSDT": 0.6}
+DEFAULT_BALANCE = 10000.0
+TICK_SEC = 1.0                  # markPrice / kline push interval
+TAKER_FEE = 0.0004
+THROTTLE_RETRY_AFTER_SEC = 5
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+
+# REST path -> weight_limiter endpoint name
+_WEIGHT_NAMES = {
+    "/fapi/v1/exchangeInfo": "exchange_info", "/fapi/v2/ticker/price": "ticker_price",
+    "/fapi/v1/ticker/price": "ticker_price", "/fapi/v1/premiumIndex": "mark_price",
+    "/fapi/v3/balance": "balance", "/fapi/v2/balance": "balance",
+    "/fapi/v3/positionRisk": "get_position_risk", "/fapi/v2/positionRisk": "get_position_risk",
+    "/fapi/v1/openOrders": "get_orders", "/fapi/v1/order": "new_order",
+    "/fapi/v1/batchOrders": "new_batch_order", "/fapi/v1/allOpenOrders": "cancel_open_orders",
+    "/fapi/v1/leverage": "change_leverage", "/fapi/v1/income": "income",
+}
+
+
+def _precision(price):
+    if price >= 1000:
+        return 1, 3
+    if price >= 10:
+        return 2, 2
+    if price >= 1:
+        return 3, 1
+    return 4, 0
+
+
+class MockExchange:
+    def __init__(self, symbols=None, price_paths=None, latency_ms=(0, 0), weight_limit=MAX_WEIGHT_1M,
+                 throttle_rate=0.0, balance=DEFAULT_BALANCE, tick_sec=TICK_SEC, seed=7):
+        self.symbols = dict(symbols or DEFAULT_SYMBOLS)
+        self.prices = dict(self.symbols)
+        self.price_paths = {s: list(p) for s, p in (price_paths or {}).items()}
+        self.latency_ms = latency_ms
+        self.weight_limit = weight_limit
+        self.throttle_rate = throttle_rate
+        self.tick_sec = tick_sec
+        self._rng = random.Random(seed)
+        self._seed = seed
+        self._step = 0
+        self._injected = []                 # [(status, retry_after)]
+        self._weight_minute = 0
+        self._used_weight = 0
+        self.wallet_balance = balance
+        self.positions = {}                 # (symbol, positionSide) -> {"amt", "entry"}
+        self.orders = {}                    # orderId -> order dict (resting LIMIT orders)
+        self.algo_orders = {}               # algoId -> algo order dict
+        self.income = []
+        self._ids = itertools.count(1)
+        self.listen_keys = set()
+        self._mark_sockets = {}             # ws -> set of subscribed stream names
+        self._user_sockets = set()
+        self.stats = {"requests": 0, "throttled": 0, "injected": 0, "orders": 0, "ws_messages": 0}
+
+    # ---------- control ----------
+
+    def inject(self, status, count=1, retry_after=None):
+        """Answer the next `count` REST requests with `status` (429, 418, 500, 503...)."""
+        self._injected.extend([(status, retry_after)] * count)
+
+    def set_price(self, symbol, price):
+        self.prices[symbol] = float(price)
+
+    def advance(self):
+        """One price tick: scripted path value, else a seeded random walk."""
+        self._step += 1
+        for symbol in self.prices:
+            path = self.price_paths.get(symbol)
+            if path:
+                self.prices[symbol] = float(path[min(self._step, len(path) - 1)])
+            else:
+                self.prices[symbol] *= 1 + self._rng.gauss(0, 0.0005)
+
+    # ---------- market data ----------
+
+    def _kline(self, symbol, interval, open_time):
+        """Deterministic candle for (symbol, interval, open_time); the live bar closes at the mark price."""
+        step = INTERVAL_MS[interval]
+        rng = random.Random(f"{self._seed}:{symbol}:{interval}:{open_time}")
+        anchor = self.symbols.get(symbol, 1.0)
+        wave = 1 + 0.02 * math.sin(open_time / (step * 50.0))
+        o = anchor * wave * (1 + rng.gauss(0, 0.002))
+        c = anchor * (1 + 0.02 * math.sin((open_time + step) / (step * 50.0))) * (1 + rng.gauss(0, 0.002))
+        if open_time + step > time.time() * 1000:
+            c = self.prices.get(symbol, c)
+        h = max(o, c) * (1 + abs(rng.gauss(0, 0.001)))
+        low = min(o, c) * (1 - abs(rng.gauss(0, 0.001)))
+        v = abs(rng.gauss(1000, 200))
+        n = int(v / 3)
+        price_precision, _ = _precision(anchor)
+        fmt = lambda x: f"{x:.{price_precision}f}"
+        return [open_time, fmt(o), fmt(h), fmt(low), fmt(c), f"{v:.3f}", open_time + step - 1,
+                f"{v * c:.2f}", n, f"{v / 2:.3f}", f"{v * c / 2:.2f}", "0"]
+
+    def klines(self, symbol, interval, limit=500, start_time=None, end_time=None):
+        step = INTERVAL_MS[interval]
+        limit = min(int(limit or 500), 1500)
+        now_ms = int(time.time() * 1000)
+        if start_time is not None:
+            first = int(start_time) // step * step
+        else:
+            last = (int(end_time) if end_time is not None else now_ms) // step * step
+            first = last - (limit - 1) * step
+        rows = []
+        t = first
+        while len(rows) < limit and t <= now_ms and (end_time is None or t <= int(end_time)):
+            rows.append(self._kline(symbol, interval, t))
+            t += step
+        return rows
+
+    def exchange_info(self):
+        symbols = []
+        for symbol, anchor in self.symbols.items():
+            price_precision, qty_precision = _precision(anchor)
+            tick = f"{10 ** -price_precision:.{price_precision}f}"
+            step = f"{10 ** -qty_precision:.{qty_precision}f}" if qty_precision else "1"
+            symbols.append({
+                "symbol": symbol, "pair": symbol, "contractType": "PERPETUAL", "status": "TRADING",
+                "baseAsset": symbol[:-4], "quoteAsset": "USDT", "marginAsset": "USDT",
+                "pricePrecision": price_precision, "quantityPrecision": qty_precision,
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": tick, "minPrice": tick, "maxPrice": "1000000"},
+                    {"filterType": "LOT_SIZE", "stepSize": step, "minQty": step, "maxQty": "100000"},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": step, "minQty": step, "maxQty": "10000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": "5"},
+                ],
+            })
+        return {"timezone": "UTC", "serverTime": int(time.time() * 1000), "rateLimits": [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": self.weight_limit},
+        ], "symbols": symbols}
+
+    def _mark(self, symbol):
+        return {"e": "markPriceUpdate", "E": int(time.time() * 1000), "s": symbol,
+                "p": f"{self.prices[symbol]:.8f}", "i": f"{self.prices[symbol]:.8f}",
+                "P": f"{self.prices[symbol]:.8f}", "r": "0.00010000", "T": int(time.time() // 28800 + 1) * 28800000}
+
+    # ---------- account ----------
+
+    def _fill(self, order):
+        """Fill a MARKET order at the mark price and update position, balance and income."""
+        symbol, side = order["symbol"], order["side"]
+        qty = float(order["quantity"])
+        price = self.prices[symbol]
+        pos_side = order.get("positionSide", "BOTH")
+        signed = qty if side == "BUY" else -qty
+        pos = self.positions.setdefault((symbol, pos_side), {"amt": 0.0, "entry": 0.0})
+        realized = 0.0
+        if pos["amt"] == 0 or (pos["amt"] > 0) == (signed > 0):
+            total = pos["amt"] + signed
+            pos["entry"] = (pos["entry"] * abs(pos["amt"]) + price * qty) / abs(total)
+            pos["amt"] = total
+        else:
+            closed = min(abs(signed), abs(pos["amt"]))
+            realized = (price - pos["entry"]) * closed * (1 if pos["amt"] > 0 else -1)
+            pos["amt"] += signed
+            if abs(pos["amt"]) < 1e-12:
+                pos["amt"], pos["entry"] = 0.0, 0.0
+            elif (pos["amt"] > 0) == (signed > 0):
+                pos["entry"] = price
+        fee = price * qty * TAKER_FEE
+        self.wallet_balance += realized - fee
+        now = int(time.time() * 1000)
+        if realized:
+            self.income.append({"symbol": symbol, "incomeType": "REALIZED_PNL", "income": f"{realized:.8f}",
+                                "asset": "USDT", "time": now, "tranId": next(self._ids), "info": ""})
+        self.income.append({"symbol": symbol, "incomeType": "COMMISSION", "income": f"{-fee:.8f}",
+                            "asset": "USDT", "time": now, "tranId": next(self._ids), "info": ""})
+        order.update({"status": "FILLED", "executedQty": order["quantity"], "avgPrice": f"{price:.8f}"})
+        self._push_user({"e": "ORDER_TRADE_UPDATE", "E": now, "T": now, "o": {
+            "s": symbol, "c": order["clientOrderId"], "S": side, "o": "MARKET", "q": order["quantity"],
+            "ap": f"{price:.8f}", "X": "FILLED", "x": "TRADE", "i": order["orderId"], "l": order["quantity"],
+            "z": order["quantity"], "L": f"{price:.8f}", "n": f"{fee:.8f}", "N": "USDT", "T": now,
+            "rp": f"{realized:.8f}", "ps": pos_side}})
+        self._push_user({"e": "ACCOUNT_UPDATE", "E": now, "T": now, "a": {
+            "m": "ORDER",
+            "B": [{"a": "USDT", "wb": f"{self.wallet_balance:.8f}", "cw": f"{self.wallet_balance:.8f}", "bc": "0"}],
+            "P": [{"s": symbol, "pa": f"{pos['amt']:.8f}", "ep": f"{pos['entry']:.8f}", "bep": f"{pos['entry']:.8f}",
+                   "cr": "0", "up": f"{self._unrealized(symbol, pos):.8f}", "mt": "cross", "iw": "0", "ps": pos_side}]}})
+
+    def _unrealized(self, symbol, pos):
+        return (self.prices[symbol] - pos["entry"]) * pos["amt"] if pos["amt"] else 0.0
+
+    def new_order(self, params):
+        symbol = params.get("symbol")
+        if symbol not in self.prices:
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        try:
+            qty = float(params.get("quantity", 0))
+        except ValueError:
+            return 400, {"code": -1111, "msg": "Precision is over the maximum defined for this asset."}
+        order_type = params.get("type", "MARKET")
+        if order_type in ("STOP_MARKET", "TAKE_PROFIT_MARKET"):
+            return 400, {"code": -4120, "msg": "Order type not supported for this endpoint. Please use the Algo Order API endpoints instead."}
+        if qty <= 0:
+            return 400, {"code": -4003, "msg": "Quantity less than or equal to zero."}
+        order_id = next(self._ids)
+        now = int(time.time() * 1000)
+        order = {
+            "orderId": order_id, "symbol": symbol, "status": "NEW",
+            "clientOrderId": params.get("newClientOrderId") or uuid.uuid4().hex[:22],
+            "price": params.get("price", "0"), "avgPrice": "0", "origQty": params["quantity"],
+            "quantity": params["quantity"], "executedQty": "0", "cumQuote": "0", "timeInForce": params.get("timeInForce", "GTC"),
+            "type": order_type, "reduceOnly": params.get("reduceOnly") == "true", "side": params.get("side"),
+            "positionSide": params.get("positionSide", "BOTH"), "updateTime": now,
+        }
+        self.stats["orders"] += 1
+        if order_type == "MARKET":
+            self._fill(order)
+        else:
+            self.orders[order_id] = order
+        return 200, {k: v for k, v in order.items() if k != "quantity"}
+
+    def position_risk(self, symbol=None):
+        """Hedge-mode LONG/SHORT entries per symbol, plus BOTH once a one-way order has been filled."""
+        out = []
+        for s in ([symbol] if symbol else self.prices):
+            sides = ("LONG", "SHORT", "BOTH") if (s, "BOTH") in self.positions else ("LONG", "SHORT")
+            for pos_side in sides:
+                pos = self.positions.get((s, pos_side), {"amt": 0.0, "entry": 0.0})
+                out.append({
+                    "symbol": s, "positionSide": pos_side, "positionAmt": f"{pos['amt']:.8f}",
+                    "entryPrice": f"{pos['entry']:.8f}", "breakEvenPrice": f"{pos['entry']:.8f}",
+                    "markPrice": f"{self.prices[s]:.8f}", "unRealizedProfit": f"{self._unrealized(s, pos):.8f}",
+                    "liquidationPrice": "0", "isolatedMargin": "0", "notional": f"{pos['amt'] * self.prices[s]:.8f}",
+                    "marginAsset": "USDT", "isolatedWallet": "0", "initialMargin": "0", "maintMargin": "0",
+                    "updateTime": int(time.time() * 1000),
+                })
+        return out
+
+    def balance(self):
+        unrealized = sum(self._unrealized(s, p) for (s, _), p in self.positions.items())
+        margin = sum(abs(p["amt"]) * self.prices[s] for (s, _), p in self.positions.items()) / 10
+        return [{"accountAlias": "mock", "asset": "USDT", "balance": f"{self.wallet_balance:.8f}",
+                 "crossWalletBalance": f"{self.wallet_balance:.8f}", "crossUnPnl": f"{unrealized:.8f}",
+                 "availableBalance": f"{self.wallet_balance + unrealized - margin:.8f}",
+                 "maxWithdrawAmount": f"{self.wallet_balance - margin:.8f}", "marginAvailable": True,
+                 "updateTime": int(time.time() * 1000)}]
+
+    # ---------- REST plumbing ----------
+
+    def _charge(self, path, params):
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute, self._used_weight = minute, 0
+        if path.endswith("lines"):
+            weight = endpoint_weight("klines", limit=params.get("limit"))
+        else:
+            weight = endpoint_weight(_WEIGHT_NAMES.get(path, ""), params.get("symbol"))
+        self._used_weight += weight
+        return self._used_weight
+
+    def _error(self, status, code, msg, headers, retry_after=None):
+        if retry_after is not None:
+            headers["Retry-After"] = str(retry_after)
+        return web.json_response({"code": code, "msg": msg}, status=status, headers=headers)
+
+    async def handle_rest(self, request):
+        self.stats["requests"] += 1
+        lo, hi = self.latency_ms
+        if hi:
+            await asyncio.sleep(self._rng.uniform(lo, hi) / 1000.0)
+        params = dict(request.query)
+        if request.can_read_body:
+            body = await request.post()
+            params.update({k: v for k, v in body.items() if isinstance(v, str)})
+        used = self._charge(request.path, params)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(used)}
+        if self._injected:
+            status, retry_after = self._injected.pop(0)
+            self.stats["injected"] += 1
+            if status >= 500:
+                return web.Response(status=status, text="Internal error; unable to process your request.", headers=headers)
+            return self._error(status, -1003, "Way too many requests; IP banned." if status == 418 else "Too many requests.",
+                               headers, retry_after if retry_after is not None else THROTTLE_RETRY_AFTER_SEC)
+        if used > self.weight_limit or (self.throttle_rate and self._rng.random() < self.throttle_rate):
+            self.stats["throttled"] += 1
+            return self._error(429, -1003, "Too many requests; current limit is %d request weight per 1 MINUTE." % self.weight_limit,
+                               headers, 60 - int(time.time()) % 60 if used > self.weight_limit else THROTTLE_RETRY_AFTER_SEC)
+        try:
+            status, payload = self.route(request.method, request.path, params)
+        except KeyError as e:
+            status, payload = 400, {"code": -1102, "msg": f"Mandatory parameter {e} was not sent."}
+        return web.json_response(payload, status=status, headers=headers)
+
+    def route(self, method, path, params):
+        symbol = params.get("symbol")
+        if path in ("/fapi/v1/ping",):
+            return 200, {}
+        if path == "/fapi/v1/time":
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if path == "/fapi/v1/exchangeInfo":
+            return 200, self.exchange_info()
+        if path in ("/fapi/v1/klines", "/fapi/v1/continuousKlines", "/fapi/v1/markPriceKlines"):
+            symbol = symbol or params.get("pair")
+            if symbol not in self.symbols:
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+            return 200, self.klines(symbol, params["interval"], params.get("limit"), params.get("startTime"), params.get("endTime"))
+        if path in ("/fapi/v1/ticker/price", "/fapi/v2/ticker/price"):
+            now = int(time.time() * 1000)
+            rows = [{"symbol": s, "price": f"{p:.8f}", "time": now} for s, p in self.prices.items() if not symbol or s == symbol]
+            return 200, rows[0] if symbol else rows
+        if path == "/fapi/v1/premiumIndex":
+            rows = [{"symbol": s, "markPrice": f"{p:.8f}", "indexPrice": f"{p:.8f}", "lastFundingRate": "0.0001",
+                     "nextFundingTime": 0, "time": int(time.time() * 1000)} for s, p in self.prices.items() if not symbol or s == symbol]
+            return 200, rows[0] if symbol else rows
+        if path in ("/fapi/v3/positionRisk", "/fapi/v2/positionRisk"):
+            return 200, self.position_risk(symbol)
+        if path in ("/fapi/v3/balance", "/fapi/v2/balance"):
+            return 200, self.balance()
+        if path == "/fapi/v1/income":
+            rows = [r for r in self.income if (not symbol or r["symbol"] == symbol)
+                    and (not params.get("incomeType") or r["incomeType"] == params["incomeType"])]
+            return 200, rows[-int(params.get("limit", 100)):]
+        if path == "/fapi/v1/leverage":
+            return 200, {"symbol": symbol, "leverage": int(params.get("leverage", 10)), "maxNotionalValue": "1000000"}
+        if path == "/fapi/v1/order":
+            if method == "POST":
+                return self.new_order(params)
+            order = self.orders.get(int(params.get("orderId", 0)))
+            if order is None:
+                return 400, {"code": -2011 if method == "DELETE" else -2013, "msg": "Unknown order sent."}
+            if method == "DELETE":
+                order = self.orders.pop(order["orderId"])
+                order["status"] = "CANCELED"
+            return 200, order
+        if path == "/fapi/v1/batchOrders" and method == "POST":
+            results = []
+            for order in json.loads(params["batchOrders"])[:5]:
+                status, payload = self.new_order(order)
+                results.append(payload)
+            return 200, results
+        if path == "/fapi/v1/allOpenOrders" and method == "DELETE":
+            for order_id in [i for i, o in self.orders.items() if o["symbol"] == symbol]:
+                del self.orders[order_id]
+            return 200, {"code": 200, "msg": "The operation of cancel all open order is done."}
+        if path in ("/fapi/v1/openOrders", "/fapi/v1/openOrder"):
+            return 200, [o for o in self.orders.values() if not symbol or o["symbol"] == symbol]
+        if path == "/fapi/v1/algoOrder":
+            if method == "POST":
+                algo_id = next(self._ids)
+                self.algo_orders[algo_id] = dict(params, algoId=algo_id, algoStatus="NEW")
+                return 200, self.algo_orders[algo_id]
+            algo = self.algo_orders.pop(int(params.get("algoId", 0)), None)
+            if algo is None:
+                return 400, {"code": -2011, "msg": "Unknown order sent."}
+            return 200, dict(algo, algoStatus="CANCELED")
+        if path == "/fapi/v1/openAlgoOrders":
+            return 200, [a for a in self.algo_orders.values() if not symbol or a["symbol"] == symbol]
+        if path == "/fapi/v1/listenKey":
+            if method == "POST":
+                key = uuid.uuid4().hex * 2
+                self.listen_keys.add(key)
+                return 200, {"listenKey": key}
+            if method == "DELETE":
+                self.listen_keys.discard(params.get("listenKey"))
+            return 200, {}
+        return 404, {"code": -5000, "msg": f"Path {path} not supported by mock exchange."}
+
+    # ---------- websockets ----------
+
+    async def _send(self, ws, payload):
+        try:
+            await ws.send_str(json.dumps(payload))
+            self.stats["ws_messages"] += 1
+        except Exception:
+            pass
+
+    def _push_user(self, event):
+        for ws in list(self._user_sockets):
+            asyncio.ensure_future(self._send(ws, event))
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse(heartbeat=20)
+        await ws.prepare(request)
+        combined = request.path == "/stream"
+        if combined:
+            streams = set(filter(None, request.query.get("streams", "").split("/")))
+        else:
+            streams = {request.match_info.get("stream", "")}
+        if streams & self.listen_keys:
+            self._user_sockets.add(ws)
+            streams -= self.listen_keys
+        self._mark_sockets[ws] = (streams, combined)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    req = json.loads(msg.data)
+                except ValueError:
+                    continue
+                method, names = req.get("method"), set(req.get("params") or [])
+                if method == "SUBSCRIBE":
+                    streams |= names
+                elif method == "UNSUBSCRIBE":
+                    streams -= names
+                elif method == "LIST_SUBSCRIPTIONS":
+                    await self._send(ws, {"result": sorted(streams), "id": req.get("id")})
+                    continue
+                await self._send(ws, {"result": None, "id": req.get("id")})
+        finally:
+            self._mark_sockets.pop(ws, None)
+            self._user_sockets.discard(ws)
+        return ws
+
+    def _stream_events(self, streams, now_ms):
+        """(stream name, payload) pairs for one tick."""
+        for name in streams:
+            if name == "!markPrice@arr" or name.startswith("!markPrice@arr@"):
+                yield name, [self._mark(s) for s in self.prices]
+                continue
+            symbol, _, kind = name.partition("@")
+            symbol = symbol.upper()
+            if symbol not in self.prices:
+                continue
+            if kind.startswith("markPrice"):
+                yield name, self._mark(symbol)
+            elif kind.startswith("kline_"):
+                interval = kind[len("kline_"):]
+                step = INTERVAL_MS.get(interval)
+                if step is None:
+                    continue
+                open_time = now_ms // step * step
+                # The bar that just finished is sent once more with x=true
+                if now_ms - open_time < self.tick_sec * 1000:
+                    yield name, self._kline_event(symbol, interval, open_time - step, closed=True)
+                yield name, self._kline_event(symbol, interval, open_time, closed=False)
+
+    def _kline_event(self, symbol, interval, open_time, closed):
+        row = self._kline(symbol, interval, open_time)
+        return {"e": "kline", "E": int(time.time() * 1000), "s": symbol, "k": {
+            "t": row[0], "T": row[6], "s": symbol, "i": interval, "o": row[1], "c": row[4], "h": row[2],
+            "l": row[3], "v": row[5], "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10]}}
+
+    async def _ticker(self):
+        while True:
+            await asyncio.sleep(self.tick_sec)
+            self.advance()
+            now_ms = int(time.time() * 1000)
+            for ws, (streams, combined) in list(self._mark_sockets.items()):
+                for name, payload in self._stream_events(streams, now_ms):
+                    await self._send(ws, {"stream": name, "data": payload} if combined else payload)
+
+    # ---------- app ----------
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/ws/{stream}", self.handle_ws)
+        app.router.add_get("/stream", self.handle_ws)
+        app.router.add_route("*", "/fapi/{tail:.*}", self.handle_rest)
+
+        async def start_ticker(app):
+            app["ticker"] = asyncio.create_task(self._ticker())
+
+        async def stop_ticker(app):
+            app["ticker"].cancel()
+        app.on_startup.append(start_ticker)
+        app.on_cleanup.append(stop_ticker)
+        return app
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Start serving on the running loop; returns the AppRunner (await runner.cleanup() to stop)."""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def _load_price_paths(path):
+    """JSON file: {"BTCUSDT": [60000, 60010, ...], ...}"""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Binance USDT-M futures exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--symbols", default=",".join(DEFAULT_SYMBOLS), help="comma separated; SYMBOL=price to set the start price")
+    parser.add_argument("--price-paths", help="JSON file with scripted mark prices per symbol")
+    parser.add_argument("--latency-ms", default="0,0", help="min,max added latency per REST call")
+    parser.add_argument("--weight-limit", type=int, default=MAX_WEIGHT_1M)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of REST calls answered with 429")
+    parser.add_argument("--tick-sec", type=float, default=TICK_SEC)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    symbols = {}
+    for item in filter(None, args.symbols.split(",")):
+        name, _, price = item.partition("=")
+        symbols[name.upper()] = float(price) if price else DEFAULT_SYMBOLS.get(name.upper(), 1.0)
+    lo, _, hi = args.latency_ms.partition(",")
+    exchange = MockExchange(symbols, _load_price_paths(args.price_paths), (float(lo), float(hi or lo)),
+                            args.weight_limit, args.throttle_rate, tick_sec=args.tick_sec, seed=args.seed)
+    print(f"✅ Mock exchange on http://{args.host}:{args.port} (ws://{args.host}:{args.port}) for {len(symbols)} symbols")
+    web.run_app(exchange.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
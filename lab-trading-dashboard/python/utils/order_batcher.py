@@ -0,0 +1,141 @@
+# utils/order_batcher.py
+"""
+Order batching for one Binance futures account.
+
+Orders submitted from different threads within BATCH_WINDOW_SEC are sent together
+through POST /fapi/v1/batchOrders (max 5 per request), and each caller gets back
+its own entry of the batch response. submit_many() sends a group of legs at once
+without waiting for the window.
+
+Every leg gets a newClientOrderId. Callers wait until their batch has resolved,
+and if the whole request fails (timeout, 5xx, lost connection) each leg is looked
+up by that id before it is reported as failed, since it may still have filled.
+
+Only regular orders (MARKET / LIMIT) can be batched; STOP_MARKET / TAKE_PROFIT_MARKET
+go through the algo-order endpoint and are placed individually.
+"""
+import uuid
+import threading
+from concurrent.futures import Future
+
+# ✅ Binance limits and batching window
+MAX_BATCH_ORDERS = 5
+BATCH_WINDOW_SEC = 0.02
+CLIENT_ORDER_ID_PREFIX = "olab_"
+
+
+def new_client_order_id():
+    """Unique newClientOrderId (Binance allows up to 36 characters)."""
+    return CLIENT_ORDER_ID_PREFIX + uuid.uuid4().hex[:24]
+
+
+def _encode(order):
+    """batchOrders entries are sent as strings, without None values."""
+    return {k: (("true" if v else "false") if isinstance(v, bool) else str(v))
+            for k, v in order.items() if v is not None}
+
+
+def _result_for(entry):
+    """Batch entry -> order dict, or the {"ok": False, "message"} shape used by main_binance."""
+    if isinstance(entry, dict) and "code" in entry and "orderId" not in entry:
+        return {"ok": False, "message": entry.get("msg", str(entry)), "code": entry.get("code")}
+    return entry
+
+
+class OrderBatcher:
+    """
+    submit_batch(list_of_orders) must call client.new_batch_order and return its
+    response: a list with one entry per order, or an error dict for the whole batch.
+    query_order(symbol, client_order_id) returns the order dict if it exists, used
+    to resolve the legs of a batch that failed as a whole.
+    """
+
+    def __init__(self, submit_batch, query_order=None, window=BATCH_WINDOW_SEC, max_batch=MAX_BATCH_ORDERS):
+        self._submit_batch = submit_batch
+        self._query_order = query_order
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []          # [(order, Future)]
+        self._lock = threading.Lock()
+        self._timer = None
+        self.stats = {"orders": 0, "batches": 0, "batch_errors": 0, "order_errors": 0, "recovered": 0}
+
+    def submit(self, order):
+        """Queue one order and block until its batch has resolved. Returns the order result."""
+        return self._enqueue([order])[0].result()
+
+    def submit_many(self, orders):
+        """Send several legs (e.g. entry + hedge) immediately. Results are in input order."""
+        futures = self._enqueue(list(orders), flush_now=True)
+        return [f.result() for f in futures]
+
+    def _enqueue(self, orders, flush_now=False):
+        orders = [dict(order) for order in orders]
+        for order in orders:
+            if not order.get("newClientOrderId"):
+                order["newClientOrderId"] = new_client_order_id()
+        futures = [Future() for _ in orders]
+        with self._lock:
+            self._pending.extend(zip(orders, futures))
+            self.stats["orders"] += len(orders)
+            ready = flush_now or len(self._pending) >= self.max_batch
+            if not ready and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if ready:
+            self.flush()
+        return futures
+
+    def flush(self):
+        """Send everything pending, max_batch orders per request."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for i in range(0, len(pending), self.max_batch):
+            chunk = pending[i:i + self.max_batch]
+            try:
+                self._send(chunk)
+            except Exception as e:
+                # Never leave a caller waiting on an unresolved future
+                for _, future in chunk:
+                    if not future.done():
+                        future.set_result({"ok": False, "message": str(e)})
+
+    def _send(self, chunk):
+        orders = [_encode(order) for order, _ in chunk]
+        try:
+            response = self._submit_batch(orders)
+        except Exception as e:
+            response = {"ok": False, "message": str(e)}
+        self.stats["batches"] += 1
+        if isinstance(response, list) and len(response) == len(chunk):
+            for (_, future), entry in zip(chunk, response):
+                result = _result_for(entry)
+                if isinstance(result, dict) and result.get("ok") is False:
+                    self.stats["order_errors"] += 1
+                future.set_result(result)
+            return
+        self.stats["batch_errors"] += 1
+        error = response if isinstance(response, dict) else {"ok": False, "message": f"Unexpected batch response: {response}"}
+        if error.get("ok") is not False:
+            error = {"ok": False, "message": error.get("msg", str(error))}
+        for order, future in chunk:
+            future.set_result(self._resolve(order, error))
+
+    def _resolve(self, order, error):
+        """The whole batch failed, but the order may still have reached the exchange: look it up."""
+        client_order_id = order["newClientOrderId"]
+        if self._query_order is None:
+            return dict(error, clientOrderId=client_order_id)
+        try:
+            found = self._query_order(order["symbol"], client_order_id)
+        except Exception as e:
+            found = {"ok": False, "message": str(e)}
+        if isinstance(found, dict) and "orderId" in found:
+            self.stats["recovered"] += 1
+            return found
+        self.stats["order_errors"] += 1
+        return dict(error, clientOrderId=client_order_id)
@@ -0,0 +1,59 @@
+# utils/price_source.py
+
+import time
+import threading
+
+PRICE_MAX_AGE_SEC = 5.0   # websocket prices older than this fall back to REST
+
+
+class PriceSource:
+    """
+    Latest streamed mark price per symbol. The websocket handler calls update();
+    order sizing calls get(), which serves the streamed price while it is fresh
+    and only then falls back to the given REST fetcher.
+    """
+
+    def __init__(self, max_age=PRICE_MAX_AGE_SEC):
+        self.max_age = max_age
+        self._prices = {}   # symbol -> (price, received_at)
+        self._lock = threading.Lock()
+        self.stats = {"stream_hits": 0, "rest_fallbacks": 0}
+
+    def update(self, symbol, price):
+        self.update_many(((symbol, price),))
+
+    def update_many(self, items):
+        """items: iterable of (symbol, price), e.g. one !markPrice@arr frame."""
+        now = time.monotonic()
+        with self._lock:
+            for symbol, price in items:
+                try:
+                    price = float(price)
+                except (TypeError, ValueError):
+                    continue
+                if symbol and price > 0:
+                    self._prices[symbol] = (price, now)
+
+    def latest(self, symbol, max_age=None):
+        """Streamed price if newer than max_age seconds, else None."""
+        entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        price, received_at = entry
+        limit = self.max_age if max_age is None else max_age
+        return price if time.monotonic() - received_at <= limit else None
+
+    def get(self, symbol, fallback=None, max_age=None):
+        price = self.latest(symbol, max_age)
+        if price is not None:
+            self.stats["stream_hits"] += 1
+            return price
+        if fallback is None:
+            return None
+        self.stats["rest_fallbacks"] += 1
+        price = float(fallback(symbol))
+        self.update(symbol, price)
+        return price
+
+
+mark_prices = PriceSource()
@@ -0,0 +1,267 @@
+# utils/retry_policy.py
+"""
+Shared retry policy for Binance and database calls.
+
+- Exponential backoff with decorrelated jitter, so workers that fail together do
+  not retry together.
+- Retry-After / HTTP 418 awareness: the wait the exchange asks for is honoured,
+  and a ban longer than max_delay opens the circuit instead of sleeping.
+- Per-target retry budget (token bucket): retries are only spent while the target
+  is mostly succeeding, so an outage does not triple the load on it.
+- Per-target circuit breaker: after breaker_threshold consecutive failed calls the
+  target is short-circuited for breaker_reset seconds, then probed by one call.
+"""
+import functools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# ✅ Defaults
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY_SEC = 1.0
+DEFAULT_MAX_DELAY_SEC = 10.0
+DEFAULT_BUDGET_RATIO = 0.2         # retry tokens earned per successful call
+DEFAULT_BUDGET_CAP = 10.0          # max banked retry tokens
+DEFAULT_BREAKER_THRESHOLD = 5      # consecutive failed calls that open the circuit
+DEFAULT_BREAKER_RESET_SEC = 30.0
+BAN_DEFAULT_SEC = 300              # 418 without Retry-After
+
+# Binance 4xx codes that are transient and worth retrying
+_RETRYABLE_BINANCE_CODES = (-1001, -1003, -1007, -1021)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the target while its circuit is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} circuit open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _headers(exc):
+    headers = getattr(exc, "header", None) or getattr(exc, "headers", None)
+    if headers is None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+    return headers or {}
+
+
+def retry_after_seconds(exc):
+    """Seconds the server asked us to wait (Retry-After, or the 418 ban default), else None."""
+    value = _headers(exc).get("Retry-After")
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            # HTTP-date form
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            pass
+    if getattr(exc, "status_code", None) == 418:
+        return float(BAN_DEFAULT_SEC)
+    return None
+
+
+def is_retryable(exc):
+    """
+    Default classifier: network errors, timeouts, 5xx, 408/418/429 and transient
+    Binance codes are retried; other 4xx (bad precision, margin, params) are not.
+    """
+    status = getattr(exc, "status_code", None)
+    if status is None or status >= 500 or status in (408, 418, 429):
+        return True
+    return getattr(exc, "error_code", None) in _RETRYABLE_BINANCE_CODES
+
+
+class RetryPolicy:
+    def __init__(self, name, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY_SEC,
+                 max_delay=DEFAULT_MAX_DELAY_SEC, retryable=is_retryable, no_retry=(),
+                 budget_ratio=DEFAULT_BUDGET_RATIO, budget_cap=DEFAULT_BUDGET_CAP,
+                 breaker_threshold=DEFAULT_BREAKER_THRESHOLD, breaker_reset=DEFAULT_BREAKER_RESET_SEC,
+                 on_circuit_open=None, sleep=time.sleep):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable
+        self.no_retry = tuple(no_retry)    # failures that count against the breaker but are not retried
+        self.budget_ratio = budget_ratio
+        self.budget_cap = budget_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.on_circuit_open = on_circuit_open
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = budget_cap
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0, "retries": 0,
+                      "budget_exhausted": 0, "short_circuited": 0, "circuit_opens": 0,
+                      "retry_after_waits": 0}
+
+    # ---------- backoff ----------
+
+    def next_delay(self, previous, base=None):
+        """Decorrelated jitter: uniform(base, 3 * previous), capped at max_delay."""
+        base = self.base_delay if base is None else base
+        return min(self.max_delay, random.uniform(base, max(base, previous * 3)))
+
+    # ---------- budget / breaker ----------
+
+    def _admit(self):
+        """Check the breaker before a call; half-open lets a single probe through."""
+        with self._lock:
+            now = time.time()
+            if self._open_until > now:
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(self.name, self._open_until - now)
+            if self._open_until and self._probing:
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(self.name, 0.0)
+            if self._open_until:
+                self._probing = True
+            self.stats["calls"] += 1
+
+    def _spend_retry_token(self):
+        with self._lock:
+            if self._tokens < 1.0:
+                self.stats["budget_exhausted"] += 1
+                return False
+            self._tokens -= 1.0
+            self.stats["retries"] += 1
+            return True
+
+    def _open(self, seconds):
+        with self._lock:
+            until = time.time() + seconds
+            opened = until > self._open_until
+            self._open_until = max(self._open_until, until)
+            self._probing = False
+            if opened:
+                self.stats["circuit_opens"] += 1
+        if opened:
+            print(f"⛔ {self.name} circuit open for {seconds:.0f}s")
+            if self.on_circuit_open is not None:
+                self.on_circuit_open(self.name, seconds)
+
+    def _succeeded(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._tokens = min(self.budget_cap, self._tokens + self.budget_ratio)
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._probing = False
+
+    def _rejected(self):
+        with self._lock:
+            self.stats["rejected"] += 1
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._probing = False
+
+    def _failed(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            trip = self._probing or self._consecutive_failures >= self.breaker_threshold
+        if trip:
+            self._open(self.breaker_reset)
+
+    def circuit_open(self):
+        return self._open_until > time.time()
+
+    # ---------- calls ----------
+
+    def call(self, fn, *args, max_attempts=None, base_delay=None, on_retry=None, **kwargs):
+        """
+        fn(*args, **kwargs) under this policy. on_retry(attempt, max_attempts, exc, delay)
+        is called before each backoff sleep. Raises the last error, or CircuitOpenError.
+        """
+        attempts = max_attempts or self.max_attempts
+        base = self.base_delay if base_delay is None else base_delay
+        self._admit()
+        delay = base
+        for attempt in range(1, attempts + 1):
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                wait = retry_after_seconds(e)
+                if wait is not None and wait > self.max_delay:
+                    # Banned / long throttle: stop hammering the target until it lifts
+                    self._open(wait)
+                    self._failed()
+                    raise
+                if isinstance(e, self.no_retry):
+                    self._failed()
+                    raise
+                if not self.retryable(e):
+                    # The target answered; the request itself was bad
+                    self._rejected()
+                    raise
+                if attempt >= attempts or not self._spend_retry_token():
+                    self._failed()
+                    raise
+                if wait is not None:
+                    with self._lock:
+                        self.stats["retry_after_waits"] += 1
+                    delay = max(wait, base)
+                else:
+                    delay = self.next_delay(delay, base)
+                if on_retry is not None:
+                    on_retry(attempt, attempts, e, delay)
+                self._sleep(delay)
+                continue
+            self._succeeded()
+            return result
+
+    def wrap(self, fn=None, **call_kwargs):
+        """Decorator form of call()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.call(func, *args, **call_kwargs, **kwargs)
+            return wrapper
+        return decorator(fn) if fn is not None else decorator
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self.stats)
+            snap["tokens"] = round(self._tokens, 2)
+            snap["circuit_open_sec"] = round(max(0.0, self._open_until - time.time()), 1)
+        return snap
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(name, **defaults):
+    """Process-wide policy per target name; defaults only apply on first creation."""
+    policy = _policies.get(name)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(name)
+            if policy is None:
+                policy = _policies[name] = RetryPolicy(name, **defaults)
+    return policy
+
+
+def retry_stats():
+    """{target: counters} for every policy created in this process."""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {p.name: p.snapshot() for p in policies}
+
+
+def retry_stats_line():
+    """One-line summary for periodic health logs."""
+    parts = []
+    for name, s in retry_stats().items():
+        state = " OPEN" if s["circuit_open_sec"] else ""
+        parts.append(f"{name}: {s['retries']} retries/{s['calls']} calls, {s['failures']} failed{state}")
+    return " | ".join(parts)
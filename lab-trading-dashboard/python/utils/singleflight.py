@@ -0,0 +1,108 @@
+# utils/singleflight.py
+"""
+Request coalescing for identical concurrent fetches.
+
+Threads asking for the same key while a fetch is in flight wait for that fetch
+and share its result instead of issuing their own. With process_shared=True the
+leader also holds a per-key file lock, so leaders in other processes queue behind
+it and then find the freshly inserted klines in the DB instead of calling Binance.
+"""
+import os
+import hashlib
+import tempfile
+import threading
+import functools
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread-level coalescing only
+    fcntl = None
+
+_default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+LOCK_DIR = os.environ.get("SINGLEFLIGHT_LOCK_DIR", _default_dir)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=LOCK_DIR):
+        self.lock_dir = lock_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def _lock_path(self, key):
+        digest = hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.lock_dir, f"olab_sf_{digest}.lock")
+
+    def _run_process_locked(self, key, fn, args, kwargs):
+        if fcntl is None:
+            return fn(*args, **kwargs)
+        fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def do(self, key, fn, *args, process_shared=False, **kwargs):
+        """Run fn once per in-flight key. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            if process_shared:
+                call.result = self._run_process_locked(key, fn, args, kwargs)
+            else:
+                call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+
+singleflight = SingleFlight()
+
+
+def coalesced(fn, process_shared=False, group=None):
+    """
+    Wrap fn(*args) so identical concurrent calls share one execution. Waiters get
+    a copy of DataFrame results, since callers add indicator columns in place.
+    """
+    group = group or singleflight
+    name = getattr(fn, "__qualname__", repr(fn))
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        result, shared = group.do(key, fn, *args, process_shared=process_shared, **kwargs)
+        if shared and hasattr(result, "copy"):
+            return result.copy()
+        return result
+    return wrapper
@@ -0,0 +1,77 @@
+# utils/stream_subscriptions.py
+"""
+Live SUBSCRIBE / UNSUBSCRIBE management for one Binance futures websocket.
+
+sync(ws, symbols) makes the connection's stream set equal to one stream per
+symbol (by default <symbol>@markPrice@1s), sending only the difference. Frames
+are paced under Binance's limit of 10 incoming messages per second, and the set
+is capped at 200 streams per connection.
+"""
+import asyncio
+import json
+
+# ✅ Binance websocket limits
+MAX_STREAMS_PER_CONNECTION = 200
+MAX_PARAMS_PER_FRAME = 50
+FRAME_INTERVAL_SEC = 0.2          # 5 frames/s, half the 10 msg/s limit
+
+
+def mark_price_stream(symbol):
+    return f"{symbol.lower()}@markPrice@1s"
+
+
+class StreamSubscriptions:
+    def __init__(self, stream_for=mark_price_stream, max_streams=MAX_STREAMS_PER_CONNECTION):
+        self._stream_for = stream_for
+        self.max_streams = max_streams
+        self.active = set()
+        self._next_id = 1
+        self.stats = {"subscribed": 0, "unsubscribed": 0, "frames": 0, "errors": 0, "dropped": 0}
+
+    def reset(self):
+        """New connection: nothing is subscribed yet."""
+        self.active = set()
+
+    def wanted(self, symbols):
+        streams = sorted({self._stream_for(s) for s in symbols if s})
+        if len(streams) > self.max_streams:
+            self.stats["dropped"] = len(streams) - self.max_streams
+            print(f"⚠️ {len(streams)} streams requested, only {self.max_streams} fit on one connection")
+            streams = streams[:self.max_streams]
+        return set(streams)
+
+    def frames(self, symbols):
+        """JSON frames that move the active set to the wanted one (UNSUBSCRIBE first)."""
+        wanted = self.wanted(symbols)
+        remove = sorted(self.active - wanted)
+        add = sorted(wanted - self.active)
+        out = []
+        for method, names in (("UNSUBSCRIBE", remove), ("SUBSCRIBE", add)):
+            for i in range(0, len(names), MAX_PARAMS_PER_FRAME):
+                out.append(json.dumps({"method": method, "params": names[i:i + MAX_PARAMS_PER_FRAME], "id": self._next_id}))
+                self._next_id += 1
+        self.stats["unsubscribed"] += len(remove)
+        self.stats["subscribed"] += len(add)
+        self.active = wanted
+        return out
+
+    async def sync(self, ws, symbols):
+        """Send the frames for symbols over ws. Returns the number of frames sent."""
+        frames = self.frames(symbols)
+        for i, frame in enumerate(frames):
+            if i:
+                await asyncio.sleep(FRAME_INTERVAL_SEC)
+            await ws.send(frame)
+            self.stats["frames"] += 1
+        return len(frames)
+
+    def handle_reply(self, data):
+        """True if data is a SUBSCRIBE/UNSUBSCRIBE reply (and not a market event)."""
+        if not isinstance(data, dict) or "id" not in data or "e" in data or "stream" in data:
+            return False
+        if data.get("error"):
+            self.stats["errors"] += 1
+            print(f"❌ Stream subscription error: {data['error']}")
+            # Unknown which streams took effect: resend the full set on the next sync
+            self.reset()
+        return True
@@ -0,0 +1,145 @@
+# utils/symbol_metadata.py
+
+import time
+import threading
+
+# ✅ Refresh policy
+METADATA_TTL_SEC = 3600          # full exchange_info reload interval
+MISS_REFRESH_INTERVAL_SEC = 60   # unknown symbol (new listing) forces a reload at most this often
+DB_FALLBACK_TTL_SEC = 3600       # pairstatus values cached when exchange info is unavailable
+FIRST_LOAD_WAIT_SEC = 10         # lookups before the first load wait this long for it
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_symbol(elem):
+    """Flatten one exchange_info()['symbols'] entry into the fields order code needs."""
+    filters = {f.get('filterType'): f for f in elem.get('filters', [])}
+    price_filter = filters.get('PRICE_FILTER', {})
+    lot_size = filters.get('LOT_SIZE', {})
+    market_lot_size = filters.get('MARKET_LOT_SIZE', {})
+    min_notional = filters.get('MIN_NOTIONAL', {})
+    return {
+        'symbol': elem['symbol'],
+        'price_precision': elem.get('pricePrecision'),
+        'qty_precision': elem.get('quantityPrecision'),
+        'tick_size': _float(price_filter.get('tickSize')),
+        'step_size': _float(lot_size.get('stepSize')),
+        'min_qty': _float(lot_size.get('minQty')),
+        'max_qty': _float(lot_size.get('maxQty')),
+        'market_max_qty': _float(market_lot_size.get('maxQty')),
+        'min_notional': _float(min_notional.get('notional', min_notional.get('minNotional'))),
+        'status': elem.get('status'),
+    }
+
+
+class SymbolMetadataCache:
+    """
+    Symbol -> metadata dict built from one exchange_info() download.
+    Lookups are dict hits; the payload is reloaded after METADATA_TTL_SEC, on an
+    unknown symbol (rate-limited), or after invalidate() (e.g. a precision error).
+    The download runs outside the lock: lookups keep reading the previous payload
+    until the new one is swapped in.
+    """
+
+    def __init__(self, loader=None, ttl=METADATA_TTL_SEC, miss_refresh_interval=MISS_REFRESH_INTERVAL_SEC):
+        self._loader = loader
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._symbols = {}
+        self._loaded_at = 0.0
+        self._last_attempt = 0.0
+        self._db_values = {}   # (field, symbol) -> (value, stored_at)
+        self._loading = False
+        self._lock = threading.Condition()
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "db_fallbacks": 0}
+
+    def set_loader(self, loader):
+        """loader() must return the exchange_info() payload."""
+        self._loader = loader
+
+    def refresh(self, force=False):
+        """Reload exchange info if stale (or forced). Returns True if data is available."""
+        with self._lock:
+            now = time.time()
+            if not force and self._symbols and now - self._loaded_at < self.ttl:
+                return True
+            if self._loading:
+                # Another thread is downloading: use the current payload, or wait for the first one
+                if not self._symbols:
+                    self._lock.wait(FIRST_LOAD_WAIT_SEC)
+                return bool(self._symbols)
+            # Forced reloads and retries after a failed load are rate-limited
+            if self._loader is None or now - self._last_attempt < self.miss_refresh_interval:
+                return bool(self._symbols)
+            self._last_attempt = now
+            self._loading = True
+            loader = self._loader
+
+        symbols, error = {}, None
+        try:
+            for elem in loader().get('symbols', []):
+                meta = parse_symbol(elem)
+                symbols[meta['symbol']] = meta
+        except Exception as e:
+            error = e
+            print(f"⚠️ Symbol metadata refresh failed: {e}")
+
+        with self._lock:
+            self._loading = False
+            if symbols:
+                self._symbols = symbols
+                self._loaded_at = now
+                self.stats["refreshes"] += 1
+            elif error is not None:
+                self.stats["refresh_errors"] += 1
+            self._lock.notify_all()
+            return bool(self._symbols)
+
+    def invalidate(self):
+        """Force a reload on the next lookup (still subject to the miss rate limit)."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def get(self, symbol):
+        """Metadata dict for symbol, or None if Binance does not list it."""
+        symbol = symbol.upper()
+        self.refresh()
+        meta = self._symbols.get(symbol)
+        if meta is None and self.refresh(force=True):
+            meta = self._symbols.get(symbol)
+        self.stats["hits" if meta is not None else "misses"] += 1
+        return meta
+
+    def field(self, symbol, field, db_fetch=None):
+        """
+        One metadata field. When exchange info cannot answer, db_fetch(symbol)
+        (e.g. fetch_qty_precision_from_db) is used and its value cached as well.
+        """
+        meta = self.get(symbol)
+        if meta is not None and meta.get(field) is not None:
+            return meta[field]
+        if db_fetch is None:
+            return None
+        key = (field, symbol.upper())
+        cached = self._db_values.get(key)
+        if cached is not None and time.time() - cached[1] < DB_FALLBACK_TTL_SEC:
+            return cached[0]
+        value = db_fetch(symbol)
+        self.stats["db_fallbacks"] += 1
+        self._db_values[key] = (value, time.time())
+        return value
+
+    def price_precision(self, symbol, db_fetch=None):
+        return self.field(symbol, 'price_precision', db_fetch)
+
+    def qty_precision(self, symbol, db_fetch=None):
+        return self.field(symbol, 'qty_precision', db_fetch)
+
+
+symbol_metadata = SymbolMetadataCache()
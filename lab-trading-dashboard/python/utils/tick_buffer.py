@@ -0,0 +1,88 @@
+# utils/tick_buffer.py
+"""
+Conflation buffer between the websocket reader and price dispatch.
+
+The reader only decodes frames and put()s (symbol, price, event_time) ticks; a
+dispatcher thread drain()s the newest tick per symbol. If dispatch falls behind,
+older ticks for a symbol are overwritten instead of queueing, so decisions always
+use the latest price. Lag (exchange event -> dispatch) and coalesced ticks are
+kept in stats.
+"""
+import json
+import threading
+import time
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+
+def extract_ticks(items):
+    """markPriceUpdate events -> [(symbol, price_str, event_ms)], only s/p/E."""
+    ticks = []
+    for item in items:
+        symbol = item.get("s")
+        price = item.get("p")
+        if symbol and price is not None:
+            ticks.append((symbol, price, item.get("E") or 0))
+    return ticks
+
+
+class TickBuffer:
+    def __init__(self):
+        self._pending = {}      # symbol -> (price_str, event_ms), not yet dispatched
+        self._latest = {}       # symbol -> (price, event_ms), newest ever seen
+        self._cond = threading.Condition()
+        self.stats = {"messages": 0, "ticks": 0, "coalesced": 0, "dispatched": 0,
+                      "last_lag_ms": 0, "max_lag_ms": 0}
+
+    def put_many(self, ticks):
+        with self._cond:
+            self.stats["messages"] += 1
+            for symbol, price, event_ms in ticks:
+                if symbol in self._pending:
+                    self.stats["coalesced"] += 1
+                self._pending[symbol] = (price, event_ms)
+                self.stats["ticks"] += 1
+            if self._pending:
+                self._cond.notify()
+
+    def drain(self, timeout=None):
+        """Block until ticks are pending (or timeout). Returns {symbol: (price, event_ms)}."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            pending, self._pending = self._pending, {}
+        batch = {}
+        for symbol, (price, event_ms) in pending.items():
+            try:
+                batch[symbol] = (float(price), event_ms)
+            except (TypeError, ValueError):
+                continue
+        if batch:
+            self._latest.update(batch)
+            self.stats["dispatched"] += len(batch)
+            oldest = min(event_ms for _, event_ms in batch.values())
+            if oldest:
+                lag = max(0, int(time.time() * 1000) - oldest)
+                self.stats["last_lag_ms"] = lag
+                if lag > self.stats["max_lag_ms"]:
+                    self.stats["max_lag_ms"] = lag
+        return batch
+
+    def latest(self, symbol):
+        """Newest dispatched price for symbol, or None."""
+        entry = self._latest.get(symbol)
+        return entry[0] if entry else None
+
+    def snapshot(self):
+        out = dict(self.stats)
+        out["pending"] = len(self._pending)
+        out["decoder"] = "orjson" if orjson else "json"
+        return out
+
+
+tick_buffer = TickBuffer()
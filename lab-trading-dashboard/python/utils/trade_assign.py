@@ -0,0 +1,221 @@
+# utils/trade_assign.py
+
+import json
+import threading
+from decimal import Decimal
+from datetime import datetime, timezone
+from dateutil import parser
+from sqlalchemy import text
+
+from utils.Final_olab_database import (
+    sql_helper,
+    olab_log_db_error,
+    olab_clean_timestamp_values,
+)
+from utils.timestamp_fix import apply_timestamp_fix_to_document
+
+# ✅ Columns written for a newly assigned trade (machine table and alltraderecords)
+ASSIGN_COLUMNS = (
+    "machineid", "unique_id", "candel_time", "fetcher_trade_time", "operator_trade_time",
+    "operator_close_time", "pair", "investment", "interval", "stop_price", "save_price",
+    "min_comm", "hedge", "action", "buy_qty", "buy_price", "buy_pl", "sell_qty", "sell_price",
+    "sell_pl", "commission", "pl_after_comm", "close_price", "commision_journey",
+    "profit_journey", "min_profit", "hedge_order_size", "hedge_1_1_bool", "added_qty",
+    "min_comm_after_hedge", "type", "min_close", "signalfrom", "macd_action", "swing1",
+    "swing2", "swing3", "hedge_swing_high_point", "hedge_swing_low_point", "hedge_buy_pl",
+    "hedge_sell_pl", "temp_high_point", "temp_low_point",
+)
+
+_COLUMN_SQL = ", ".join(ASSIGN_COLUMNS)
+
+# One server-side call: duplicate checks, least-loaded machine selection, both inserts
+# and the machinetradecount bump run in a single transaction. An advisory lock on
+# (pair, action, signalfrom, interval) closes the race between scanner workers.
+ASSIGN_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION olab_assign_trade(doc jsonb, force_machine text DEFAULT NULL)
+RETURNS TABLE (assigned_machine text, assigned_uid text, is_duplicate boolean) AS $$
+DECLARE
+    _machine text;
+    _counter bigint;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(concat_ws('|', doc->>'pair', doc->>'action', doc->>'signalfrom', doc->>'interval')));
+
+    IF EXISTS (SELECT 1 FROM alltraderecords a WHERE a.unique_id = doc->>'unique_id')
+       OR EXISTS (
+            SELECT 1 FROM alltraderecords a
+            WHERE a.pair = doc->>'pair' AND a.action = doc->>'action'
+              AND a.signalfrom = doc->>'signalfrom' AND a.interval = doc->>'interval'
+              AND a.type NOT IN ('close', 'hedge_close', 'hedge_hold', 'hedge_release')
+              AND a.hedge = 0
+       ) THEN
+        RETURN QUERY SELECT NULL::text, doc->>'unique_id', true;
+        RETURN;
+    END IF;
+
+    -- machines.active is 0/1 (same test as _olab_assign_trade_to_machine); ::int keeps a boolean column working too
+    SELECT m.machineid, mtc.totaltradecounter INTO _machine, _counter
+    FROM machines m
+    INNER JOIN machinetradecount mtc ON m.machineid = mtc.machineid
+    WHERE m.active::int = 1 AND mtc.declinecounter < 5
+    ORDER BY mtc.totaltradecounter ASC, m.machineid ASC
+    LIMIT 1
+    FOR UPDATE OF mtc;
+
+    IF _machine IS NULL THEN
+        RETURN QUERY SELECT NULL::text, doc->>'unique_id', false;
+        RETURN;
+    END IF;
+
+    IF force_machine IS NOT NULL THEN
+        _machine := force_machine;
+    END IF;
+    doc := jsonb_set(doc, '{{machineid}}', to_jsonb(_machine));
+
+    BEGIN
+        EXECUTE format(
+            'INSERT INTO %I ({_COLUMN_SQL}) SELECT {_COLUMN_SQL} FROM jsonb_populate_record(NULL::%I, $1)',
+            lower(_machine), lower(_machine)
+        ) USING doc;
+        INSERT INTO alltraderecords ({_COLUMN_SQL})
+        SELECT {_COLUMN_SQL} FROM jsonb_populate_record(NULL::alltraderecords, doc);
+        UPDATE machinetradecount SET totaltradecounter = COALESCE(_counter, 0) + 1
+        WHERE machineid = _machine;
+    EXCEPTION WHEN unique_violation THEN
+        RETURN QUERY SELECT NULL::text, doc->>'unique_id', true;
+        RETURN;
+    END;
+
+    RETURN QUERY SELECT _machine, doc->>'unique_id', false;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+_function_ready = False
+_function_lock = threading.Lock()
+
+
+def olab_ensure_assign_trade_function():
+    """Install (or refresh) the olab_assign_trade server-side function once per process."""
+    global _function_ready
+    if _function_ready:
+        return True
+    with _function_lock:
+        if _function_ready:
+            return True
+        try:
+            with sql_helper.connection_lock:
+                with sql_helper._get_connection_with_retry() as conn:
+                    with conn.begin():
+                        conn.execute(text(ASSIGN_FUNCTION_SQL))
+            _function_ready = True
+        except Exception as e:
+            olab_log_db_error(e, "olab_ensure_assign_trade_function", "olab_assign_trade")
+            print(f"❌ olab_ensure_assign_trade_function error: {e}")
+    return _function_ready
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "item"):  # numpy scalars
+        return obj.item()
+    return str(obj)
+
+
+def _build_trade_document(df, symbol, interval, stopPrice, action, signalFrom, closes3, min_profit, invest, candle_type):
+    """Build the new-trade document exactly as _olab_assign_trade_to_machine does (machineid filled server-side)."""
+    time_now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    candel_time = str(df.index[-1])
+    unique_id_parts = [symbol, action, candel_time, str(signalFrom)]
+    if candle_type:
+        unique_id_parts.append(str(candle_type))
+    unique_id_parts = [str(x) if x is not None else 'UNKNOWN' for x in unique_id_parts]
+    unique_id = "".join(unique_id_parts)
+
+    dt = parser.parse(candel_time)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    else:
+        dt = dt.replace(tzinfo=timezone.utc)
+    formatted_time = dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    last_close = df['close'].iloc[-1]
+    swing_multiplier = 1 if action == "BUY" else -1
+
+    # Normalize closes3 so it is always a list (length 0..3)
+    if closes3 is None:
+        closes3 = []
+    elif isinstance(closes3, (int, float)):
+        closes3 = [closes3]
+    else:
+        try:
+            closes3 = list(closes3)
+        except TypeError:
+            closes3 = [closes3]
+
+    swing1 = closes3[0] if len(closes3) >= 1 and closes3[0] is not None else last_close + (last_close * 0.00015 * swing_multiplier)
+    swing2 = closes3[1] if len(closes3) >= 2 and closes3[1] is not None else swing1 + (swing1 * 0.0002 * swing_multiplier)
+    swing3 = closes3[2] if len(closes3) >= 3 and closes3[2] is not None else swing2 + (swing2 * 0.0003 * swing_multiplier)
+
+    document = {
+        "machineid": None, "unique_id": unique_id, "candel_time": formatted_time,
+        "fetcher_trade_time": time_now, "operator_trade_time": "NONE", "operator_close_time": "NONE",
+        "pair": symbol, "investment": invest, "interval": interval, "stop_price": stopPrice,
+        "save_price": 0, "min_comm": 0, "hedge": 0, "action": action, "buy_qty": 0,
+        "buy_price": 0, "buy_pl": 0, "sell_qty": 0, "sell_price": 0, "sell_pl": 0,
+        "commission": 0, "pl_after_comm": 0, "close_price": 0, "commision_journey": 0,
+        "profit_journey": 0, "min_profit": min_profit, "hedge_order_size": 0, "hedge_1_1_bool": 0,
+        "added_qty": 0, "min_comm_after_hedge": 0, "type": "assign", "min_close": "NOT_ACTIVE",
+        "signalfrom": signalFrom, "macd_action": 'Active', "swing1": swing1, "swing2": swing2,
+        "swing3": swing3, "hedge_swing_high_point": 0, "hedge_swing_low_point": 0,
+        "hedge_buy_pl": 0, "hedge_sell_pl": 0, "temp_high_point": 0, "temp_low_point": 0
+    }
+    return unique_id, apply_timestamp_fix_to_document(olab_clean_timestamp_values(document))
+
+
+def olab_assign_trade_to_machine_atomic(df, symbol, interval, stopPrice, action, signalFrom, closes3, min_profit, invest, candle_type=None):
+    """
+    Single-round-trip replacement for _olab_assign_trade_to_machine.
+    Returns (unique_id, None) on success, (unique_id, "Already exists") for duplicates,
+    and (None or unique_id, error message) otherwise — same contract as the original.
+    """
+    unique_id = None
+    try:
+        try:
+            unique_id, document = _build_trade_document(
+                df, symbol, interval, stopPrice, action, signalFrom, closes3, min_profit, invest, candle_type
+            )
+        except Exception as e:
+            olab_log_db_error(e, f"Error building trade document for {symbol}", symbol)
+            return unique_id, f"Error building trade document: {e}"
+
+        if not olab_ensure_assign_trade_function():
+            return None, "olab_assign_trade function unavailable"
+
+        force_machine = 'M9' if candle_type == 'BT' else None
+        with sql_helper.connection_lock:
+            with sql_helper._get_connection_with_retry() as conn:
+                with conn.begin():
+                    row = conn.execute(
+                        text("SELECT * FROM olab_assign_trade(CAST(:doc AS jsonb), :force_machine)"),
+                        {"doc": json.dumps(document, default=_json_default), "force_machine": force_machine},
+                    ).fetchone()
+
+        if row is None:
+            return None, "No machine row processed"
+        assigned_machine, assigned_uid, is_duplicate = row
+        if is_duplicate:
+            msg = f"Record already found for {assigned_uid}. Skipping insert."
+            print(msg)
+            return assigned_uid, "Already exists"
+        if assigned_machine is None:
+            return None, "No active machine available"
+        return assigned_uid, None
+
+    except Exception as e:
+        olab_log_db_error(e, f"Unhandled error in olab_assign_trade_to_machine_atomic: {e}", symbol)
+        return None, f"Unhandled error: {e}"
+
+
+def olab_AssignTradeToMachineLAB_atomic(df, symbol, interval, stopPrice, action, signalFrom, closes3, min_profit, invest, candle_type):
+    return olab_assign_trade_to_machine_atomic(df, symbol, interval, stopPrice, action, signalFrom, closes3, min_profit, invest, candle_type)
@@ -0,0 +1,117 @@
+# utils/trade_meta.py
+"""
+In-memory caches that keep DB reads off the per-tick path.
+
+trade_meta holds slow-changing per-UID columns (updated_at, candel_time,
+signalfrom) as last seen in the DB. BotManager refreshes it from the rows it
+already polls every second, so readers such as setlastpairPrice no longer query
+the machine table per tick; a direct DB fetch only happens on a cache miss.
+
+trade_aggregates is a short-TTL cache for machine-wide queries (loss-streak
+checks, running-trade counts) that every UID used to run separately.
+"""
+import threading
+import time
+
+# ✅ Cached columns and aggregate TTL
+META_FIELDS = ("updated_at", "candel_time", "signalfrom")
+AGGREGATE_TTL_SEC = 30
+
+
+class TradeMetaCache:
+    def __init__(self):
+        self._meta = {}             # uid -> {field: value}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loaded": 0}
+
+    def load(self, uid, row):
+        """Cache the metadata columns of a DB row for uid."""
+        meta = {field: row.get(field) for field in META_FIELDS}
+        with self._lock:
+            self._meta[uid] = meta
+            self.stats["loaded"] += 1
+
+    def refresh(self, rows):
+        """rows: {uid: db_row}, e.g. DataHandler.load_running_uids()."""
+        for uid, row in rows.items():
+            self.load(uid, row)
+
+    def get(self, uid, field, fetch=None):
+        """
+        Cached field for uid. On a miss, fetch(uid) -> {field: value} (one DB read)
+        fills the cache; without fetch a miss returns None.
+        """
+        meta = self._meta.get(uid)
+        if meta is not None:
+            self.stats["hits"] += 1
+            return meta.get(field)
+        self.stats["misses"] += 1
+        if fetch is None:
+            return None
+        row = fetch(uid)
+        if not row:
+            return None
+        self.load(uid, row)
+        return row.get(field)
+
+    def set(self, uid, **fields):
+        """Record a local write (e.g. updated_at after adding investment) before the DB catches up."""
+        with self._lock:
+            meta = self._meta.get(uid)
+            if meta is not None:
+                meta.update(fields)
+
+    def invalidate(self, uid):
+        with self._lock:
+            self._meta.pop(uid, None)
+
+
+class AggregateCache:
+    """
+    get(key, fetch) returns fetch() at most once per ttl seconds per key.
+    Concurrent misses on one key wait for a single fetch; other keys are not
+    blocked by it.
+    """
+
+    def __init__(self, ttl=AGGREGATE_TTL_SEC):
+        self.ttl = ttl
+        self._values = {}           # key -> (value, fetched_at)
+        self._key_locks = {}        # key -> lock held while that key is fetched
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fetches": 0}
+
+    def _fresh(self, key):
+        entry = self._values.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.stats["hits"] += 1
+            return entry
+        return None
+
+    def get(self, key, fetch):
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry[0]
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = threading.Lock()
+        with key_lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry[0]
+            value = fetch()
+            with self._lock:
+                self._values[key] = (value, time.monotonic())
+                self.stats["fetches"] += 1
+            return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+
+trade_meta = TradeMetaCache()
+trade_aggregates = AggregateCache()
@@ -0,0 +1,392 @@
+# utils/trade_state.py
+
+from threading import Lock
+
+
+def _float(value, default=0.0):
+    """DB numerics arrive as Decimal / str / None; hot-path readers want float."""
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _bool(value):
+    """DB flags arrive as bool / 0-1 / "true"-"false" strings; bool("0") would be True."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "t", "yes", "y", "on")
+    return bool(value)
+
+
+class TradeState:
+    """
+    Typed, slotted view of one all_pairs row for hot-path readers:
+    attribute access instead of .get() chains, numerics converted once.
+
+    Built by TrackedTrade.state() and cached until the row changes, so readers
+    must treat it as read-only; writes still go through all_pairs[uid][key].
+    """
+    __slots__ = (
+        "uid", "pair", "interval", "action", "type", "signalfrom", "macd_action", "min_close",
+        "hedge", "hedge_1_1_bool", "profit_journey", "commision_journey", "updated_at", "candel_time",
+        # float
+        "investment", "buy_price", "sell_price", "close_price", "buy_qty", "sell_qty", "added_qty",
+        "pl_after_comm", "min_profit",
+        # float or None (not set yet)
+        "stop_price",
+    )
+
+    def __init__(self, uid, row):
+        get = row.get
+        self.uid = uid
+        self.pair = get("pair")
+        self.interval = get("interval")
+        self.action = get("action")
+        self.type = get("type")
+        self.signalfrom = get("signalfrom")
+        self.macd_action = get("macd_action")
+        self.min_close = get("min_close")
+        self.hedge = int(_float(get("hedge"), 0))
+        self.hedge_1_1_bool = _bool(get("hedge_1_1_bool", False))
+        self.profit_journey = _bool(get("profit_journey", False))
+        self.commision_journey = _bool(get("commision_journey", False))
+        self.updated_at = get("updated_at")
+        self.candel_time = get("candel_time")
+        self.investment = _float(get("investment"))
+        self.buy_price = _float(get("buy_price"))
+        self.sell_price = _float(get("sell_price"))
+        self.close_price = _float(get("close_price"))
+        self.buy_qty = _float(get("buy_qty"))
+        self.sell_qty = _float(get("sell_qty"))
+        self.added_qty = _float(get("added_qty"))
+        self.pl_after_comm = _float(get("pl_after_comm"))
+        self.min_profit = _float(get("min_profit"), 20.0)
+        self.stop_price = _float(get("stop_price"), None)
+
+    def __repr__(self):
+        return f"TradeState({self.uid!r}, pair={self.pair!r}, type={self.type!r}, action={self.action!r})"
+
+
+class AnalysisState:
+    """
+    Per-UID analysis_tracker entry (see utils.utils.get_default_analysis_tracker).
+
+    Known fields are slots; Current_Price is kept as float. The dict methods
+    make it a drop-in for the old dict while callers migrate to attributes
+    (tracker["Current_Price"] and tracker.Current_Price are the same field).
+    Keys outside the known set (e.g. NeedsDBUpdate) go to an overflow dict.
+    """
+    # dict key -> attribute ("1min_Check_IMACD" is not an identifier)
+    _FIELDS = {
+        "SinglePostionDecision": "SinglePostionDecision",
+        "SinglePostionWarning": "SinglePostionWarning",
+        "Buy_Activate_loss_5_percent": "Buy_Activate_loss_5_percent",
+        "Sell_Activate_loss_5_percent": "Sell_Activate_loss_5_percent",
+        "1min_Check_IMACD": "Check_IMACD_1min",
+        "Current_Price": "Current_Price",
+        "StopPriceHedge": "StopPriceHedge",
+        "Candle_Time": "Candle_Time",
+        "signal_data": "signal_data",
+        "Candle_High": "Candle_High",
+        "Candle_Low": "Candle_Low",
+        "Decision": "Decision",
+        "SuperTrend": "SuperTrend",
+    }
+    __slots__ = tuple(_FIELDS.values()) + ("_extra",)
+
+    def __init__(self, **values):
+        self.SinglePostionDecision = None        # core/setlastpairPrice.py (set)
+        self.SinglePostionWarning = False        # core/setlastpairPrice.py (set/get)
+        self.Buy_Activate_loss_5_percent = False  # core/setlastpairPrice.py (set/get)
+        self.Sell_Activate_loss_5_percent = False # core/setlastpairPrice.py (set/get)
+        self.Check_IMACD_1min = False            # "1min_Check_IMACD", core/setlastpairPrice.py (set/get)
+        self.Current_Price = 0.0                 # core/ws_handler.py (set/get), core/signal_engine.py (set)
+        self.StopPriceHedge = None               # core/signal_engine.py (set)
+        self.Candle_Time = None                  # core/signal_engine.py (set)
+        self.signal_data = None                  # core/signal_engine.py (set)
+        self.Candle_High = None                  # core/check_and_release_hedge.py (get)
+        self.Candle_Low = None                   # core/check_and_release_hedge.py (get)
+        self.Decision = None                     # core/check_and_release_hedge.py, core/setlastpairPrice.py, core/signal_engine.py
+        self.SuperTrend = False
+        self._extra = {}
+        self.update(values)
+
+    # ---------- dict compatibility ----------
+
+    def __getitem__(self, key):
+        attr = self._FIELDS.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        attr = self._FIELDS.get(key)
+        if attr is None:
+            self._extra[key] = value
+        elif attr == "Current_Price":
+            self.Current_Price = _float(value)
+        else:
+            setattr(self, attr, value)
+
+    def __delitem__(self, key):
+        if key in self._FIELDS:
+            raise KeyError(f"{key} is a fixed AnalysisState field")
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in self._FIELDS or key in self._extra
+
+    def __iter__(self):
+        yield from self._FIELDS
+        yield from self._extra
+
+    def __len__(self):
+        return len(self._FIELDS) + len(self._extra)
+
+    def get(self, key, default=None):
+        attr = self._FIELDS.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        return self._extra.get(key, default)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self._FIELDS:
+            raise KeyError(f"{key} is a fixed AnalysisState field")
+        return self._extra.pop(key, *default)
+
+    def copy(self):
+        """Plain dict snapshot (JSON-serialisable like the old tracker dict)."""
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (AnalysisState, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"AnalysisState({self.copy()!r})"
+
+
+class TrackedTrade(dict):
+    """
+    Per-UID trade row. Behaves like the plain dict it replaces, but every write
+    that actually changes a value is recorded as dirty in the owning TradeStore.
+    state() returns a cached TradeState view, rebuilt after the row changes.
+    """
+    __slots__ = ("_uid", "_store", "_state")
+
+    def __init__(self, uid, store, row=None):
+        dict.__init__(self, row or {})
+        self._uid = uid
+        self._store = store
+        self._state = None
+
+    def state(self):
+        state = self._state
+        if state is None:
+            state = self._state = TradeState(self._uid, self)
+        return state
+
+    def _changed(self, keys, previous_pair=None):
+        self._state = None
+        # A row replaced in or removed from the store no longer feeds dirty
+        # tracking or the symbol index; only the current row does.
+        store = self._store
+        if dict.get(store, self._uid) is not self:
+            return
+        store.mark_dirty(self._uid, *keys)
+        if "pair" in keys:
+            store._reindex(self._uid, previous_pair, dict.get(self, "pair"))
+
+    def __setitem__(self, key, value):
+        if key in self:
+            try:
+                if dict.__getitem__(self, key) == value:
+                    return
+            except Exception:
+                pass  # uncomparable values are treated as changed
+        previous = dict.get(self, key)
+        dict.__setitem__(self, key, value)
+        self._changed((key,), previous)
+
+    def __delitem__(self, key):
+        previous = dict.__getitem__(self, key)
+        dict.__delitem__(self, key)
+        self._changed((key,), previous)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = dict.pop(self, key)
+        self._changed((key,), value)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._changed((key,), value)
+        return key, value
+
+    def clear(self):
+        keys = tuple(self)
+        previous_pair = dict.get(self, "pair")
+        dict.clear(self)
+        if keys:
+            self._changed(keys, previous_pair)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class TradeStore(dict):
+    """
+    Container for all_pairs: UID -> TrackedTrade.
+    Records which fields of which UIDs changed since the last drain_dirty(),
+    so DBUpdater only writes dirty UIDs and dirty columns, and keeps a
+    symbol -> UIDs index so price updates only touch the UIDs trading that symbol.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._dirty = {}
+        self._dirty_lock = Lock()
+        self._by_symbol = {}
+        self._index_lock = Lock()
+
+    def __setitem__(self, uid, row):
+        # Assigning a whole row (new trade / replaced trade) marks every field dirty
+        tracked = TrackedTrade(uid, self, row)
+        self._replace(uid, tracked)
+        with self._dirty_lock:
+            self._dirty.setdefault(uid, set()).update(tracked.keys())
+
+    def __delitem__(self, uid):
+        row = dict.__getitem__(self, uid)
+        dict.__delitem__(self, uid)
+        self._reindex(uid, row.get("pair"), None)
+        with self._dirty_lock:
+            self._dirty.pop(uid, None)
+
+    def pop(self, uid, *default):
+        with self._dirty_lock:
+            self._dirty.pop(uid, None)
+        row = dict.pop(self, uid, *default)
+        if isinstance(row, TrackedTrade):
+            self._reindex(uid, row.get("pair"), None)
+        return row
+
+    def popitem(self):
+        uid, row = dict.popitem(self)
+        self._reindex(uid, row.get("pair"), None)
+        with self._dirty_lock:
+            self._dirty.pop(uid, None)
+        return uid, row
+
+    def clear(self):
+        dict.clear(self)
+        with self._index_lock:
+            self._by_symbol.clear()
+        with self._dirty_lock:
+            self._dirty.clear()
+
+    def update(self, *args, **kwargs):
+        for uid, row in dict(*args, **kwargs).items():
+            self[uid] = row
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, uid, row=None):
+        if not dict.__contains__(self, uid):
+            self[uid] = row
+        return dict.__getitem__(self, uid)
+
+    def load(self, uid, row):
+        """Store a row freshly read from the DB without marking it dirty."""
+        self._replace(uid, TrackedTrade(uid, self, row))
+        with self._dirty_lock:
+            self._dirty.pop(uid, None)
+
+    # ---------- symbol index ----------
+
+    def _replace(self, uid, tracked):
+        previous = dict.get(self, uid)
+        dict.__setitem__(self, uid, tracked)
+        self._reindex(uid, previous.get("pair") if previous is not None else None, tracked.get("pair"))
+
+    def _reindex(self, uid, old_symbol, new_symbol):
+        with self._index_lock:
+            if old_symbol is not None and old_symbol != new_symbol:
+                uids = self._by_symbol.get(old_symbol)
+                if uids is not None:
+                    uids.discard(uid)
+                    if not uids:
+                        del self._by_symbol[old_symbol]
+            if new_symbol is not None:
+                self._by_symbol.setdefault(new_symbol, set()).add(uid)
+
+    def uids_for_symbol(self, symbol):
+        """UIDs whose row has pair == symbol (a snapshot, safe to iterate)."""
+        with self._index_lock:
+            uids = self._by_symbol.get(symbol)
+            return tuple(uids) if uids else ()
+
+    def symbols(self):
+        """Symbols with at least one tracked UID."""
+        with self._index_lock:
+            return list(self._by_symbol)
+
+    def mark_dirty(self, uid, *fields):
+        with self._dirty_lock:
+            self._dirty.setdefault(uid, set()).update(fields)
+
+    def mark_clean(self, uid):
+        """Forget pending changes for a UID (e.g. after a full-row write)."""
+        with self._dirty_lock:
+            self._dirty.pop(uid, None)
+
+    def drain_dirty(self):
+        """Atomically take and reset the dirty map: {uid: set(fields)}."""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        return {uid: fields for uid, fields in dirty.items() if dict.__contains__(self, uid)}
+
+    def restore_dirty(self, dirty):
+        """Re-queue fields from a drain whose write did not succeed."""
+        with self._dirty_lock:
+            for uid, fields in dirty.items():
+                if dict.__contains__(self, uid):
+                    self._dirty.setdefault(uid, set()).update(fields)
+
+    def dirty_count(self):
+        with self._dirty_lock:
+            return len(self._dirty)
@@ -0,0 +1,267 @@
+# utils/trade_sync.py
+
+import re
+import json
+import time
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+from utils.Final_olab_database import (
+    sql_helper,
+    olab_log_db_error,
+    olab_log_performance_metric,
+)
+from utils.global_store import shutdown_event
+from machine_id import get_machine_id
+
+# ✅ Columns copied from machine tables into alltraderecords (same set as olab_update_all_trade_table)
+ALL_TRADE_SYNC_COLUMNS = (
+    "operator_trade_time", "candel_time", "fetcher_trade_time", "operator_close_time",
+    "investment", "interval", "stop_price", "save_price", "min_comm", "hedge", "action",
+    "buy_qty", "buy_price", "buy_pl", "sell_qty", "sell_price", "sell_pl", "commission",
+    "pl_after_comm", "close_price", "commision_journey", "profit_journey", "min_profit",
+    "hedge_order_size", "hedge_1_1_bool", "added_qty", "min_comm_after_hedge", "type",
+    "min_close", "signalfrom", "macd_action", "swing1", "swing2", "swing3",
+    "hedge_swing_high_point", "hedge_swing_low_point", "hedge_buy_pl", "hedge_sell_pl",
+    "temp_high_point", "temp_low_point", "updated_at",
+)
+
+CHANGE_LOG_TABLE = "trade_change_log"
+DEFAULT_BATCH_SIZE = 500
+SYNC_INTERVAL_SEC = 10          # ✅ Pause between sync rounds once the backlog is drained
+MAX_BATCHES_PER_ROUND = 20      # ✅ Cap per round so one machine does not hold the log
+TRIGGER_CHECK_SEC = 60          # ✅ How often new or re-activated machine tables are picked up
+
+# trg_<table>_change_<kind> -> trigger definition
+_CHANGE_TRIGGERS = {
+    "insert": "AFTER INSERT ON {table} FOR EACH ROW EXECUTE FUNCTION olab_log_trade_change()",
+    "update": ("AFTER UPDATE ON {table} FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) "
+               "EXECUTE FUNCTION olab_log_trade_change()"),
+}
+
+_TABLE_NAME_RE = re.compile(r"^[a-z0-9_]+$")
+
+# Last sync metrics (in-process), refreshed by olab_incremental_update_all_trade_table
+sync_stats = {
+    "last_run": None,
+    "last_batch_size": 0,
+    "last_synced_rows": 0,
+    "last_lag_seconds": 0.0,
+    "backlog": 0,
+    "total_synced": 0,
+    "last_duration_ms": 0.0,
+}
+
+
+def _active_machine_tables():
+    # active::int: fetch_all rewrites "active = 1" to "active = true" (olab_optimize_sql_query)
+    rows = sql_helper.fetch_all("SELECT machineid FROM machines WHERE active::int = 1")
+    return [row[0].lower() for row in rows if row[0] and _TABLE_NAME_RE.match(row[0].lower())]
+
+
+def olab_ensure_trade_change_log():
+    """
+    Create the trade_change_log table and the trigger function that feeds it.
+    Safe to call repeatedly; triggers are attached by olab_ensure_change_triggers.
+    """
+    try:
+        with sql_helper.connection_lock:
+            with sql_helper._get_connection_with_retry() as conn:
+                with conn.begin():
+                    conn.execute(text(f"""
+                        CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (
+                            id BIGSERIAL PRIMARY KEY,
+                            machine_table TEXT NOT NULL,
+                            unique_id TEXT NOT NULL,
+                            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                    """))
+                    conn.execute(text(f"""
+                        CREATE OR REPLACE FUNCTION olab_log_trade_change() RETURNS trigger AS $$
+                        BEGIN
+                            INSERT INTO {CHANGE_LOG_TABLE} (machine_table, unique_id)
+                            VALUES (TG_TABLE_NAME, NEW.unique_id);
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql
+                    """))
+        return True
+    except Exception as e:
+        olab_log_db_error(e, "olab_ensure_trade_change_log", CHANGE_LOG_TABLE)
+        print(f"❌ olab_ensure_trade_change_log error: {e}")
+        return False
+
+
+def olab_ensure_change_triggers():
+    """
+    Attach the change-capture triggers to every active machine table that lacks
+    them. Existing triggers are looked up in pg_trigger and left alone, so this is
+    cheap to repeat and picks up machines created or activated later.
+    Returns the active machine tables that do not exist, or None on error.
+    """
+    try:
+        tables = _active_machine_tables()
+        if not tables:
+            return []
+        installed = []
+        with sql_helper.connection_lock:
+            with sql_helper._get_connection_with_retry() as conn:
+                with conn.begin():
+                    rows = conn.execute(text("""
+                        SELECT c.relname, array_remove(array_agg(t.tgname::text), NULL)
+                        FROM pg_class AS c
+                        LEFT JOIN pg_trigger AS t ON t.tgrelid = c.oid AND NOT t.tgisinternal
+                        WHERE c.relkind IN ('r', 'p') AND pg_table_is_visible(c.oid)
+                              AND c.relname = ANY(:tables)
+                        GROUP BY c.relname
+                    """), {"tables": tables}).fetchall()
+                    existing = {table: set(triggers) for table, triggers in rows}
+                    for table, triggers in existing.items():
+                        for kind, definition in _CHANGE_TRIGGERS.items():
+                            name = f"trg_{table}_change_{kind}"
+                            if name not in triggers:
+                                conn.execute(text(f"CREATE TRIGGER {name} {definition.format(table=table)}"))
+                                installed.append(name)
+        if installed:
+            print(f"✅ trade_change_log triggers installed: {', '.join(installed)}")
+        return [table for table in tables if table not in existing]
+    except Exception as e:
+        olab_log_db_error(e, "olab_ensure_change_triggers", CHANGE_LOG_TABLE)
+        print(f"❌ olab_ensure_change_triggers error: {e}")
+        return None
+
+
+def olab_incremental_update_all_trade_table(batch_size=DEFAULT_BATCH_SIZE, machine_id=None):
+    """
+    Incremental replacement for olab_update_all_trade_table.
+    Consumes up to batch_size entries from trade_change_log and copies only those
+    trades from their machine table into alltraderecords, in one transaction.
+    Returns the sync_stats dict (batch size, synced rows, lag, remaining backlog).
+    """
+    start_time = time.time()
+    try:
+        with sql_helper.connection_lock:
+            with sql_helper._get_connection_with_retry() as conn:
+                with conn.begin():
+                    entries = conn.execute(text(f"""
+                        SELECT id, machine_table, unique_id, changed_at
+                        FROM {CHANGE_LOG_TABLE}
+                        ORDER BY id
+                        LIMIT :batch_size
+                        FOR UPDATE SKIP LOCKED
+                    """), {"batch_size": batch_size}).fetchall()
+
+                    synced_rows = 0
+                    lag_seconds = 0.0
+                    if entries:
+                        uids_by_table = {}
+                        for _, table, uid, _ in entries:
+                            if _TABLE_NAME_RE.match(table or ""):
+                                uids_by_table.setdefault(table, set()).add(uid)
+
+                        set_sql = ", ".join(f"{col} = src.{col}" for col in ALL_TRADE_SYNC_COLUMNS)
+                        for table, uids in uids_by_table.items():
+                            result = conn.execute(text(f"""
+                                UPDATE alltraderecords AS target SET {set_sql}
+                                FROM {table} AS src
+                                WHERE target.unique_id = src.unique_id
+                                      AND src.unique_id = ANY(:uids)
+                            """), {"uids": list(uids)})
+                            synced_rows += result.rowcount
+
+                        conn.execute(text(f"DELETE FROM {CHANGE_LOG_TABLE} WHERE id = ANY(:ids)"),
+                                     {"ids": [entry[0] for entry in entries]})
+
+                        oldest = min(entry[3] for entry in entries)
+                        lag_seconds = (datetime.now(timezone.utc) - oldest).total_seconds()
+
+                    backlog = conn.execute(text(f"SELECT COUNT(*) FROM {CHANGE_LOG_TABLE}")).scalar() or 0
+
+        duration_ms = (time.time() - start_time) * 1000
+        sync_stats.update({
+            "last_run": datetime.now(timezone.utc),
+            "last_batch_size": len(entries),
+            "last_synced_rows": synced_rows,
+            "last_lag_seconds": lag_seconds,
+            "backlog": backlog,
+            "total_synced": sync_stats["total_synced"] + synced_rows,
+            "last_duration_ms": duration_ms,
+        })
+
+        if entries:
+            olab_log_performance_metric(
+                "trade_sync", "alltraderecords_lag", lag_seconds, "seconds",
+                None, None, len(entries), machine_id, datetime.now(timezone.utc),
+                json.dumps({"synced_rows": synced_rows, "backlog": backlog, "duration_ms": round(duration_ms, 2)}),
+            )
+
+    except Exception as e:
+        olab_log_db_error(e, "olab_incremental_update_all_trade_table", "SQL execution issue")
+        print(f"❌ Error in incremental AllTradeRecords sync: {e}")
+
+    return sync_stats
+
+
+class TradeSync:
+    """
+    Periodic alltraderecords sync for a bot process: installs the change log once,
+    re-checks the machine-table triggers every trigger_check_sec, and drains
+    trade_change_log in batches every interval.
+    Several machines may run it at once; SKIP LOCKED splits the backlog between them.
+    """
+
+    def __init__(self, interval_seconds=SYNC_INTERVAL_SEC, batch_size=DEFAULT_BATCH_SIZE, machine_id=None,
+                 trigger_check_sec=TRIGGER_CHECK_SEC):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self.machine_id = machine_id
+        self.trigger_check_sec = trigger_check_sec
+        self.running = True
+        self.ready = False
+        self.missing_tables = set()
+        self._next_trigger_check = 0.0
+
+    def stop(self):
+        self.running = False
+
+    def check_triggers(self):
+        """Attach triggers to new active machine tables; warn once per table that does not exist."""
+        missing = olab_ensure_change_triggers()
+        if missing is None:
+            return False
+        new = set(missing) - self.missing_tables
+        if new:
+            print(f"⚠️ TradeSync: active machine tables not found, their changes are not captured: {', '.join(sorted(new))}")
+        self.missing_tables = set(missing)
+        return True
+
+    def sync_once(self):
+        """One round: batches until the backlog is empty (or the per-round cap). Returns rows synced."""
+        if not self.ready:
+            self.ready = olab_ensure_trade_change_log()
+            if not self.ready:
+                return 0
+        now = time.monotonic()
+        if now >= self._next_trigger_check and self.check_triggers():
+            self._next_trigger_check = now + self.trigger_check_sec
+        synced = 0
+        for _ in range(MAX_BATCHES_PER_ROUND):
+            before, last_run = sync_stats["total_synced"], sync_stats["last_run"]
+            stats = olab_incremental_update_all_trade_table(self.batch_size, self.machine_id or get_machine_id())
+            if stats["last_run"] is last_run:
+                break  # the batch failed (already logged); retry next round
+            synced += stats["total_synced"] - before
+            if stats["last_batch_size"] < self.batch_size or not stats["backlog"]:
+                break
+        return synced
+
+    def run(self):
+        print("📤 TradeSync thread started...")
+        while self.running and not shutdown_event.is_set():
+            try:
+                self.sync_once()
+            except Exception as e:
+                olab_log_db_error(e, "TradeSync.run", CHANGE_LOG_TABLE)
+                print(f"❌ TradeSync error: {e}")
+            shutdown_event.wait(self.interval)
+        print("📤 TradeSync thread finished.")
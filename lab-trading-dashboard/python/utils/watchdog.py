@@ -0,0 +1,51 @@
+# utils/watchdog.py
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from utils.logger import log_info, log_error
+from utils.global_store import last_heartbeat
+from core.position_scheduler import position_scheduler
+
+WATCHDOG_INTERVAL = 60  # seconds
+HEARTBEAT_TIMEOUT = 120  # seconds
+
+# Stub for alerting (e.g., email, Telegram)
+def send_alert(uid, message):
+    # Integrate with your alerting/notification system
+    pass
+
+def start_watchdog():
+    def watchdog_loop():
+        log_info("🔒 Watchdog started. Monitoring heartbeats...")
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                for uid, last_time in list(last_heartbeat.items()):
+                    # Handle both float and datetime heartbeats
+                    if isinstance(last_time, float):
+                        delta = time.time() - last_time
+                    elif isinstance(last_time, datetime):
+                        delta = (now - last_time).total_seconds()
+                    else:
+                        log_error(Exception("Invalid heartbeat"), f"[Watchdog] Invalid heartbeat format for {uid}: {last_time}")
+                        continue
+
+                    if delta > HEARTBEAT_TIMEOUT:
+                        log_error(Exception("HEARTBEAT_TIMEOUT"), f"[Watchdog] No heartbeat from {uid} in {delta:.0f}s. Thread might be frozen.")
+
+                        send_alert(uid, f"No heartbeat from {uid} in {delta:.0f}s. Attempting restart.")
+                        # Workers run on the position scheduler; restart it if its timer died
+                        if not position_scheduler.is_alive():
+                            position_scheduler.start()
+                            log_info(f"✅ Watchdog restarted position scheduler ({uid} heartbeat stale)")
+
+            except Exception as e:
+                log_error(e, "watchdog_loop")
+
+            time.sleep(WATCHDOG_INTERVAL)
+
+    # Start watchdog thread
+    t = threading.Thread(target=watchdog_loop, daemon=True)
+    t.start()
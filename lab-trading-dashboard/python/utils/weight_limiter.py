@@ -0,0 +1,262 @@
+# utils/weight_limiter.py
+"""
+Process-shared Binance request-weight limiter.
+
+Binance enforces 2400 weight per minute per IP across every process on the host,
+so the budget lives in a small memory-mapped state file guarded by an flock:
+all ProcessPoolExecutor workers, the operator and api_signals.py charge the same
+counter. The counter follows Binance's fixed UTC-minute window and is pulled up
+to X-MBX-USED-WEIGHT-1M whenever a response header is seen (capture_headers()
+hooks a UMFutures client so every response is reconciled).
+
+The file is reopened in each process: a forked worker must not share the
+parent's open file description (flock would not exclude it) or its thread lock.
+"""
+import os
+import time
+import mmap
+import struct
+import asyncio
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: falls back to a per-process limiter
+    fcntl = None
+
+MAX_WEIGHT_1M = 2400
+WEIGHT_HEADROOM = 0.85          # stop short of the hard limit (same margin as weight_threshold)
+MAX_REQUESTS_PER_SEC = 10       # host-wide request pacing on top of the weight budget
+
+_default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+STATE_PATH = os.environ.get("BINANCE_WEIGHT_STATE", os.path.join(_default_dir, "olab_binance_weight.bin"))
+
+# window_minute, used_weight, second, requests_in_second, header_weight, header_ts_ms
+_STATE = struct.Struct("<qqqqqq")
+
+# ✅ Request weights for the endpoints this codebase calls (USDT-M futures)
+ENDPOINT_WEIGHTS = {
+    "ping": 1,
+    "time": 1,
+    "exchange_info": 1,
+    "ticker_price": 1,            # 2 without symbol
+    "mark_price": 1,              # 10 without symbol
+    "book_ticker": 2,             # 5 without symbol
+    "ticker_24hr_price_change": 1,  # 40 without symbol
+    "balance": 5,
+    "account": 5,
+    "get_position_risk": 5,
+    "get_orders": 1,              # 40 without symbol
+    "get_all_orders": 5,
+    "new_order": 1,
+    "new_batch_order": 5,
+    "cancel_open_orders": 1,
+    "change_leverage": 1,
+}
+
+_NO_SYMBOL_WEIGHTS = {
+    "ticker_price": 2,
+    "mark_price": 10,
+    "book_ticker": 5,
+    "ticker_24hr_price_change": 40,
+    "get_orders": 40,
+}
+
+
+def klines_weight(limit=500):
+    """klines / continuous_klines / mark_price_klines weight scales with limit."""
+    limit = 500 if limit is None else int(limit)
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def endpoint_weight(endpoint, symbol=None, limit=None):
+    if endpoint.endswith("klines"):
+        return klines_weight(limit)
+    if symbol is None and endpoint in _NO_SYMBOL_WEIGHTS:
+        return _NO_SYMBOL_WEIGHTS[endpoint]
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+
+class SharedWeightLimiter:
+    """
+    Cross-process weight budget. acquire() charges the weight up front and waits
+    (sleeping, not failing) until the current minute has room for it.
+    """
+
+    def __init__(self, path=STATE_PATH, max_weight=MAX_WEIGHT_1M, headroom=WEIGHT_HEADROOM,
+                 max_requests_per_sec=MAX_REQUESTS_PER_SEC):
+        self.path = path
+        self.budget = int(max_weight * headroom)
+        self.max_requests_per_sec = max_requests_per_sec
+        self._thread_lock = threading.Lock()
+        self._local_state = [0, 0, 0, 0, 0, 0]
+        self._map = None
+        self._fd = None
+        self._pid = os.getpid()
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "reconciled": 0}
+
+    # ---------- shared state ----------
+
+    def _after_fork(self):
+        """Drop the parent's lock, mapping and fd; _open() reopens the file for this pid."""
+        self._thread_lock = threading.Lock()
+        self._pid = os.getpid()
+        if self._map is not None:
+            try:
+                self._map.close()
+                os.close(self._fd)
+            except (OSError, ValueError):
+                pass
+        self._map = None
+        self._fd = None
+
+    def _open(self):
+        if self._map is not None or fcntl is None:
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        if os.fstat(fd).st_size < _STATE.size:
+            os.ftruncate(fd, _STATE.size)
+        self._map = mmap.mmap(fd, _STATE.size)
+        self._fd = fd
+
+    def _locked(self, update):
+        """Run update(state_list) -> result under the thread lock and the file lock."""
+        if self._pid != os.getpid():
+            self._after_fork()
+        with self._thread_lock:
+            try:
+                self._open()
+            except OSError as e:
+                print(f"⚠️ Shared weight state unavailable ({e}), using per-process limiter")
+                self._map = None
+            if self._map is None:
+                return update(self._local_state)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                state = list(_STATE.unpack_from(self._map, 0))
+                result = update(state)
+                _STATE.pack_into(self._map, 0, *state)
+                return result
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _roll(state, now):
+        minute, second = int(now // 60), int(now)
+        if state[0] != minute:
+            state[0], state[1] = minute, 0
+        if state[2] != second:
+            state[2], state[3] = second, 0
+
+    # ---------- public API ----------
+
+    def try_acquire(self, weight=1):
+        """Charge weight if it fits now. Returns 0 on success, else seconds to wait."""
+        weight = max(1, int(weight))
+
+        def update(state):
+            now = time.time()
+            self._roll(state, now)
+            if state[3] >= self.max_requests_per_sec:
+                return (int(now) + 1) - now
+            # A single oversized request may still run at the start of a fresh minute
+            if state[1] + weight > self.budget and state[1] > 0:
+                return (int(now // 60) + 1) * 60 - now
+            state[1] += weight
+            state[3] += 1
+            return 0
+        return self._locked(update)
+
+    def acquire(self, weight=1, timeout=None):
+        """Block until weight is available. Returns False only if timeout expires."""
+        deadline = None if timeout is None else time.time() + timeout
+        waited = False
+        start = time.time()
+        while True:
+            wait = self.try_acquire(weight)
+            if not wait:
+                self.stats["acquired"] += 1
+                if waited:
+                    self.stats["waited"] += 1
+                    self.stats["wait_seconds"] += time.time() - start
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                return False
+            waited = True
+            time.sleep(min(wait, 1.0) + 0.01)
+
+    async def acquire_async(self, weight=1, timeout=None):
+        """asyncio variant of acquire()."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wait = self.try_acquire(weight)
+            if not wait:
+                self.stats["acquired"] += 1
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                return False
+            await asyncio.sleep(min(wait, 1.0) + 0.01)
+
+    def reconcile(self, used_weight):
+        """Align the shared counter with Binance's X-MBX-USED-WEIGHT-1M (never lowers it)."""
+        if used_weight is None:
+            return
+
+        def update(state):
+            now = time.time()
+            self._roll(state, now)
+            state[1] = max(state[1], int(used_weight))
+            state[4], state[5] = int(used_weight), int(now * 1000)
+        self._locked(update)
+        self.stats["reconciled"] += 1
+
+    def reconcile_headers(self, headers):
+        if not headers:
+            return
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+        if used:
+            self.reconcile(int(used))
+
+    def reconcile_client(self, client):
+        """Reconcile from the client's last response headers, when the client exposes them."""
+        response = getattr(client, "_last_response", None)
+        if response is not None:
+            self.reconcile_headers(getattr(response, "headers", None))
+
+    def used_weight(self):
+        def update(state):
+            self._roll(state, time.time())
+            return state[1]
+        return self._locked(update)
+
+
+binance_weight_limiter = SharedWeightLimiter()
+
+
+def capture_headers(client, limiter=binance_weight_limiter):
+    """
+    Hook client.session.request (as setup_header_capture does) so every response
+    is kept on client._last_response and its used weight reconciled into limiter.
+    """
+    session = getattr(client, "session", None)
+    if session is None:
+        return client
+    original_request = session.request
+
+    def request_with_headers(*args, **kwargs):
+        response = original_request(*args, **kwargs)
+        client._last_response = response
+        try:
+            limiter.reconcile_headers(response.headers)
+        except (TypeError, ValueError):
+            pass
+        return response
+    session.request = request_with_headers
+    return client